@@ -9,8 +9,18 @@ https://docs.djangoproject.com/en/4.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+
+from core.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+# Reads of the book endpoints are async views under ASGI
+os.environ.setdefault('ROOT_URLCONF', 'app.urls_asgi')
+# Connections belong to threads, which ASGI starts for every request,
+# persistent connections would never be reused
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
-application = get_asgi_application()
+# Same as django.core.asgi.get_asgi_application, with the handler
+# streaming responses from the thread of the request
+django.setup(set_prefix=False)
+application = ASGIHandler()
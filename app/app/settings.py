@@ -35,6 +35,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'isbn_field',
@@ -44,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestTimingMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,9 +54,34 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ReplicaReadMiddleware',
 ]
 
-ROOT_URLCONF = 'app.urls'
+# Per request timings, aggregated into histograms of /metrics and sent
+# to staff in the Server-Timing header (see core.timing)
+
+REQUEST_TIMING = os.environ.get('REQUEST_TIMING', '1') == '1'
+
+# Responses of COMPRESSION_CONTENT_TYPES (prefixes) with at least
+# COMPRESSION_MIN_SIZE bytes are compressed with the first of
+# COMPRESSION_ENCODINGS the client accepts (see core.compression),
+# 'br' needs the brotli package. An empty COMPRESSION_ENCODINGS turns
+# compression off, e.g. when a proxy in front of the API compresses.
+
+COMPRESSION_ENCODINGS = [
+    encoding for encoding in
+    os.environ.get('COMPRESSION_ENCODINGS', 'br,gzip').split(',') if encoding
+]
+
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+
+COMPRESSION_CONTENT_TYPES = (
+    'application/json', 'application/x-ndjson', 'text/',
+)
+
+# The ASGI application sets app.urls_asgi (see app.asgi)
+
+ROOT_URLCONF = os.environ.get('ROOT_URLCONF', 'app.urls')
 
 TEMPLATES = [
     {
@@ -75,6 +103,9 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
+# Connections are kept open for DB_CONN_MAX_AGE seconds and checked
+# before a request reuses them. /ready fails when a query of the primary
+# takes longer than READY_MAX_LATENCY_MS.
 
 DATABASES = {
     'default': {
@@ -83,9 +114,116 @@ DATABASES = {
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # Checked by core.signals, natively from Django 4.1 on
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+READY_MAX_LATENCY_MS = int(os.environ.get('READY_MAX_LATENCY_MS', 250))
+
+# Read replicas
+# Safe requests to views with 'replica_reads' read from a replica
+# (see core.routers). DB_REPLICA_HOSTS is a comma separated list of hosts
+# sharing name, user and password with the primary; pointing it at the
+# primary host gives a second alias without any replication, e.g. to try
+# routing out locally. Clients read from the primary for
+# REPLICA_STICKY_SECONDS after they wrote something, whichever worker
+# serves them: writes set the signed REPLICA_STICKY_COOKIE, which is
+# checked without any query. Replicas lagging
+# more than REPLICA_MAX_LAG seconds are skipped, the lag is checked every
+# REPLICA_LAG_CHECK_INTERVAL seconds.
+
+DATABASE_REPLICAS = []
+
+for number, host in enumerate(
+    host for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',')
+    if host
+):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
+REPLICA_STICKY_COOKIE = 'db_primary'
+
+REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 1))
+
+REPLICA_LAG_CHECK_INTERVAL = float(
+    os.environ.get('REPLICA_LAG_CHECK_INTERVAL', 1)
+)
+
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# Catalogue responses have their own cache, local memory is fine for
+# tests and a single process, production should use a shared backend
+# (e.g. django.core.cache.backends.redis.RedisCache), otherwise other
+# workers would not see invalidations.
+
+CATALOGUE_CACHE_ALIAS = 'catalogue'
+
+CATALOGUE_CACHE_TIMEOUT = int(os.environ.get('CATALOGUE_CACHE_TIMEOUT', 3600))
+
+# State every worker has to see (revoked tokens) is kept in the
+# SHARED_CACHE_ALIAS cache. By default
+# it is a table of the database (made by a migration of core),
+# SHARED_CACHE_BACKEND and SHARED_CACHE_LOCATION can point it at e.g.
+# django.core.cache.backends.redis.RedisCache. Culled keys are lost
+# state, the database cache keeps SHARED_CACHE_MAX_ENTRIES.
+
+SHARED_CACHE_ALIAS = 'shared'
+
+SHARED_CACHE_BACKEND = os.environ.get(
+    'SHARED_CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    CATALOGUE_CACHE_ALIAS: {
+        'BACKEND': os.environ.get(
+            'CATALOGUE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CATALOGUE_CACHE_LOCATION', 'catalogue'),
+    },
+    SHARED_CACHE_ALIAS: {
+        'BACKEND': SHARED_CACHE_BACKEND,
+        'LOCATION': os.environ.get('SHARED_CACHE_LOCATION', 'shared_cache'),
+    },
+}
+
+if SHARED_CACHE_BACKEND == 'django.core.cache.backends.db.DatabaseCache':
+    CACHES[SHARED_CACHE_ALIAS]['OPTIONS'] = {
+        'MAX_ENTRIES': int(
+            os.environ.get('SHARED_CACHE_MAX_ENTRIES', 1000000)
+        ),
+    }
+
+# Token authentication cache
+# Resolved tokens are kept in a per process LRU of TOKEN_CACHE_SIZE entries
+# for TOKEN_CACHE_TTL seconds. Revocations are published through the
+# TOKEN_CACHE_ALIAS cache, which has to be shared by all workers. Other
+# workers read it at most every TOKEN_REVOCATION_CHECK_INTERVAL seconds
+# per token, so a revoked token may authenticate that much longer there.
+
+TOKEN_CACHE_ALIAS = SHARED_CACHE_ALIAS
+
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 300))
+
+TOKEN_REVOCATION_CHECK_INTERVAL = float(
+    os.environ.get('TOKEN_REVOCATION_CHECK_INTERVAL', 2)
+)
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -131,3 +269,97 @@ STATIC_ROOT = '/vol/web/static'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
+
+# Django REST framework
+# JSON is rendered and parsed by orjson, or by the standard library when
+# orjson is not installed (see core.renderers). Listing JSONRenderer and
+# JSONParser of rest_framework instead goes back to the latter.
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Book lists and details are read from the denormalized read model of
+# books (see book.read_model), turning it off reads them from books,
+# authors, publishing houses and genres
+
+BOOK_READ_MODEL = os.environ.get('BOOK_READ_MODEL', '1') == '1'
+
+# Pagination of the book endpoints
+# Page size can be changed by the client with '?page_size=',
+# but never above BOOK_MAX_PAGE_SIZE
+
+BOOK_PAGE_SIZE = int(os.environ.get('BOOK_PAGE_SIZE', 50))
+
+BOOK_MAX_PAGE_SIZE = int(os.environ.get('BOOK_MAX_PAGE_SIZE', 500))
+
+# Bulk upsert of books, rows are written in batches of BOOK_BULK_BATCH_SIZE
+
+BOOK_BULK_MAX_ITEMS = int(os.environ.get('BOOK_BULK_MAX_ITEMS', 10000))
+
+BOOK_BULK_BATCH_SIZE = int(os.environ.get('BOOK_BULK_BATCH_SIZE', 1000))
+
+# Filters by ids accept at most FILTER_MAX_IDS comma separated ids
+
+FILTER_MAX_IDS = int(os.environ.get('FILTER_MAX_IDS', 100))
+
+# Exports are read from the database in chunks of EXPORT_CHUNK_SIZE rows
+
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+
+# Cover variants are generated by a pool of COVER_PROCESSING_WORKERS
+# processes (0 processes them inside the request, e.g. for tests),
+# covers above COVER_PROCESSING_MAX_PENDING waiting ones are left to the
+# process_covers command
+
+COVER_PROCESSING_WORKERS = int(os.environ.get('COVER_PROCESSING_WORKERS', 2))
+
+COVER_PROCESSING_MAX_PENDING = int(
+    os.environ.get('COVER_PROCESSING_MAX_PENDING', 100)
+)
+
+# Uploads are hashed while they are received, covers are stored under
+# the hash of their content (see core.storage)
+
+FILE_UPLOAD_HANDLERS = [
+    'core.storage.HashingMemoryFileUploadHandler',
+    'core.storage.HashingTemporaryFileUploadHandler',
+]
+
+# Cover images no book refers to for COVER_GC_GRACE_PERIOD seconds are
+# deleted by the collect_covers command
+
+COVER_GC_GRACE_PERIOD = int(os.environ.get('COVER_GC_GRACE_PERIOD', 86400))
+
+# Search results are ordered by relevance and can not be paged deeper
+# than BOOK_SEARCH_MAX_RESULTS rows
+
+BOOK_SEARCH_MAX_RESULTS = int(os.environ.get('BOOK_SEARCH_MAX_RESULTS', 1000))
+
+# Autocomplete of authors and book titles
+# Queries are cancelled after AUTOCOMPLETE_TIMEOUT_MS milliseconds
+# and responses are cached for AUTOCOMPLETE_CACHE_TIMEOUT seconds
+
+AUTOCOMPLETE_MIN_LENGTH = 2
+
+AUTOCOMPLETE_DEFAULT_RESULTS = 10
+
+AUTOCOMPLETE_MAX_RESULTS = 20
+
+AUTOCOMPLETE_TIMEOUT_MS = int(os.environ.get('AUTOCOMPLETE_TIMEOUT_MS', 100))
+
+AUTOCOMPLETE_CACHE_TIMEOUT = 30
+
+# Async reads of the ASGI application, at most ASYNC_READ_CONCURRENCY
+# requests of a process use the database at once, the others wait in the
+# event loop (see book.async_views)
+
+ASYNC_READ_CONCURRENCY = int(os.environ.get('ASYNC_READ_CONCURRENCY', 10))
@@ -3,7 +3,12 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
+from core import views as core_views
+
 urlpatterns = [
+    path('health', core_views.health, name='health'),
+    path('ready', core_views.ready, name='ready'),
+    path('metrics', core_views.metrics, name='metrics'),
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
     path('api/book/', include('book.urls'))
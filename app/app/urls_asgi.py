@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.conf.urls.static import static
+from django.contrib import admin
+from django.urls import path, include
+
+from core import views as core_views
+
+# URLs of the ASGI application (app.asgi), same routes as app.urls
+# with async views of the book read endpoints
+
+urlpatterns = [
+    path('health', core_views.health, name='health'),
+    path('ready', core_views.ready, name='ready'),
+    path('metrics', core_views.metrics, name='metrics'),
+    path('admin/', admin.site.urls),
+    path('api/user/', include('user.urls')),
+    path('api/book/', include('book.urls_async'))
+] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
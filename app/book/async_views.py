@@ -0,0 +1,102 @@
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.urls import URLPattern, URLResolver
+
+# Async views of the read endpoints, served by the ASGI application
+# (app.asgi, app.urls_asgi). A request waiting for the database is a
+# coroutine parked in the event loop, not a worker process or a thread:
+# at most ASYNC_READ_CONCURRENCY reads of a process hold a database
+# connection at once, the others wait for a slot without one. The work
+# of a slot, from authentication to the rendered body, is the unchanged
+# viewset run through sync_to_async in the thread of the request.
+#
+# Writes and every other route fall back to the sync views.
+
+READ_METHODS = ('GET', 'HEAD')
+
+_slots = weakref.WeakKeyDictionary()
+
+
+def _semaphore():
+    # Semaphores belong to an event loop, every loop gets its own
+    loop = asyncio.get_running_loop()
+    semaphore = _slots.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(settings.ASYNC_READ_CONCURRENCY)
+        _slots[loop] = semaphore
+
+    return semaphore
+
+
+@asynccontextmanager
+async def read_slot():
+    # Wait in the event loop until a database slot is free
+    async with _semaphore():
+        yield
+
+
+def _rendered(view):
+    # Render in the same thread, serializers may still touch the database
+    def render(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+
+        return response
+
+    return render
+
+
+def as_async_view(viewset, actions, **initkwargs):
+    # Async view of a viewset route, GET and HEAD wait for a read slot,
+    # other methods are handed to the sync view as they are
+    sync_view = viewset.as_view(actions, **initkwargs)
+    read = sync_to_async(_rendered(sync_view))
+    write = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        if request.method not in READ_METHODS:
+            return await write(request, *args, **kwargs)
+
+        async with read_slot():
+            return await read(request, *args, **kwargs)
+
+    view.cls = viewset
+    view.initkwargs = initkwargs
+    view.actions = actions
+    view.csrf_exempt = True
+
+    return view
+
+
+def async_patterns(patterns, reads):
+    # Copy of the url patterns where routes of the viewsets in 'reads'
+    # reading with one of the given actions get async views
+    result = []
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            pattern = URLResolver(
+                pattern.pattern,
+                async_patterns(pattern.url_patterns, reads),
+                pattern.default_kwargs,
+                pattern.app_name,
+                pattern.namespace,
+            )
+        else:
+            callback = pattern.callback
+            actions = getattr(callback, 'actions', None) or {}
+            viewset = getattr(callback, 'cls', None)
+            if actions.get('get') in reads.get(viewset, ()):
+                pattern = URLPattern(
+                    pattern.pattern,
+                    as_async_view(viewset, actions, **callback.initkwargs),
+                    pattern.default_args,
+                    pattern.name,
+                )
+        result.append(pattern)
+
+    return result
@@ -0,0 +1,89 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from book import read_model
+from core.models import Book, BookInstance
+
+# Denormalized counters of book copies, stored on Book so lists can show
+# and filter by availability without counting BookInstance rows.
+# Counter of every loan status, copies_total counts all copies.
+STATUS_COUNTERS = {
+    'a': 'copies_available',
+    'o': 'copies_on_loan',
+    'r': 'copies_reserved',
+}
+COUNTERS = ('copies_total',) + tuple(STATUS_COUNTERS.values())
+
+
+def change_counts(added=(), removed=()):
+    # Count copies in and out, both are (book id, status) pairs.
+    # Counters are incremented in place, so changes of concurrent
+    # transactions add up instead of overwriting each other.
+    changes = defaultdict(Counter)
+    for sign, copies in ((1, added), (-1, removed)):
+        for book_id, copy_status in copies:
+            changes[book_id]['copies_total'] += sign
+            if copy_status in STATUS_COUNTERS:
+                changes[book_id][STATUS_COUNTERS[copy_status]] += sign
+
+    # Books with the same changes are updated together,
+    # e.g. all books which got one new available copy
+    groups = defaultdict(list)
+    for book_id, deltas in changes.items():
+        deltas = tuple(sorted(
+            (field, delta) for field, delta in deltas.items() if delta
+        ))
+        if deltas:
+            groups[deltas].append(book_id)
+
+    # Counters are part of the book representation
+    now = timezone.now()
+    for deltas, book_ids in groups.items():
+        Book.objects.filter(pk__in=book_ids).update(
+            last_modified=now,
+            **{field: F(field) + delta for field, delta in deltas}
+        )
+        read_model.change_counts(book_ids, deltas, now)
+
+
+def reconcile(book_ids):
+    # Recount copies of the books and fix counters which drifted,
+    # return number of fixed books
+    with transaction.atomic():
+        # Books are locked, counts of copies changed meanwhile by other
+        # transactions are either seen here or applied afterwards
+        books = list(
+            Book.objects.filter(pk__in=book_ids).select_for_update()
+            .order_by('pk').only('pk', *COUNTERS)
+        )
+        counts = {
+            row.pop('book_id'): row
+            for row in BookInstance.objects.filter(
+                book_id__in=[book.pk for book in books]
+            ).values('book_id').annotate(
+                copies_total=Count('pk'),
+                **{
+                    field: Count('pk', filter=Q(status=copy_status))
+                    for copy_status, field in STATUS_COUNTERS.items()
+                }
+            ).order_by()
+        }
+
+        drifted = []
+        now = timezone.now()
+        for book in books:
+            expected = counts.get(book.pk, dict.fromkeys(COUNTERS, 0))
+            if any(getattr(book, field) != expected[field]
+                   for field in COUNTERS):
+                for field in COUNTERS:
+                    setattr(book, field, expected[field])
+                book.last_modified = now
+                drifted.append(book)
+
+        Book.objects.bulk_update(drifted, COUNTERS + ('last_modified',))
+        read_model.refresh([book.pk for book in drifted])
+
+    return len(drifted)
@@ -0,0 +1,113 @@
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from book import read_model
+from core.models import Author, Book, Genre, PublishingHouse
+
+# Book fields written by an upsert, genres are stored separately
+UPSERT_FIELDS = (
+    'name', 'author_id', 'publishing_house_id', 'summary',
+    'number_of_pages', 'year_of_publish',
+)
+
+
+def clean_isbn(isbn):
+    # Same normalization as ISBNField.pre_save, used as the upsert key
+    return isbn.replace(' ', '').replace('-', '').upper()
+
+
+def existing_ids(model, ids):
+    # Return which of given primary keys exist, in a single query
+    return set(
+        model.objects.filter(pk__in=set(ids)).values_list('pk', flat=True)
+    )
+
+
+def relation_errors(rows):
+    # Check author, publishing house and genre ids of all rows with
+    # one query per model, return errors of invalid rows by position
+    authors = existing_ids(Author, [row['author_id'] for row in rows])
+    publishing_houses = existing_ids(
+        PublishingHouse,
+        [row['publishing_house_id'] for row in rows]
+    )
+    genres = existing_ids(
+        Genre,
+        [genre_id for row in rows for genre_id in row['genre']]
+    )
+
+    errors = {}
+    for position, row in enumerate(rows):
+        row_errors = {}
+        if row['author_id'] not in authors:
+            row_errors['author'] = [_('Invalid pk - object does not exist.')]
+        if row['publishing_house_id'] not in publishing_houses:
+            row_errors['publishing_house'] = [
+                _('Invalid pk - object does not exist.')
+            ]
+        missing_genres = set(row['genre']) - genres
+        if missing_genres:
+            row_errors['genre'] = [
+                _('Invalid pk - object does not exist.')
+            ] * len(missing_genres)
+        if row_errors:
+            errors[position] = row_errors
+
+    return errors
+
+
+def _batches(items, batch_size):
+    for start in range(0, len(items), batch_size):
+        yield items[start:start + batch_size]
+
+
+def upsert_books(rows, batch_size):
+    # Create or update books keyed by isbn with set based queries.
+    # Every row holds UPSERT_FIELDS, 'isbn' and a list of 'genre' ids,
+    # relations have to be validated already. Returns (book, created)
+    # pairs in the order of rows.
+    isbns = [clean_isbn(row['isbn']) for row in rows]
+    current = {}
+    for batch in _batches(isbns, batch_size):
+        current.update(
+            Book.objects.filter(isbn__in=batch).values_list('isbn', 'pk')
+        )
+
+    now = timezone.now()
+    results = []
+    to_create = []
+    to_update = []
+    for isbn, row in zip(isbns, rows):
+        book = Book(isbn=isbn, **{
+            field: row[field] for field in UPSERT_FIELDS
+        })
+        book.pk = current.get(isbn)
+        if book.pk is None:
+            to_create.append(book)
+        else:
+            book.last_modified = now
+            to_update.append(book)
+        results.append((book, book.pk is None))
+
+    through = Book.genre.through
+    with transaction.atomic():
+        Book.objects.bulk_create(to_create, batch_size=batch_size)
+        Book.objects.bulk_update(
+            to_update,
+            UPSERT_FIELDS + ('last_modified',),
+            batch_size=batch_size
+        )
+        for batch in _batches([book.pk for book in to_update], batch_size):
+            through.objects.filter(book_id__in=batch).delete()
+        through.objects.bulk_create(
+            [
+                through(book_id=book.pk, genre_id=genre_id)
+                for (book, created), row in zip(results, rows)
+                for genre_id in set(row['genre'])
+            ],
+            batch_size=batch_size
+        )
+        read_model.refresh([book.pk for book, created in results])
+
+    return results
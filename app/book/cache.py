@@ -0,0 +1,103 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Cached list responses are stored under a key containing a version number
+# of the model. Saving or deleting any row bumps the version, so stale
+# entries are never read again and simply expire.
+
+# Hits and misses of list responses counted by this process, without
+# a round trip to the cache, served by the /metrics endpoint
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    # Cache backend configured for catalogue responses
+    return caches[settings.CATALOGUE_CACHE_ALIAS]
+
+
+def _version_key(model):
+    return f'catalogue:version:{model._meta.label_lower}'
+
+
+def _new_version():
+    # Versions start from the current time instead of 1, so an evicted
+    # version key can never make an old entry valid again
+    return time.time_ns()
+
+
+def get_version(model):
+    # Return current version of model data
+    cache = get_cache()
+    key = _version_key(model)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), timeout=None)
+        version = cache.get(key)
+
+    return version
+
+
+def bump_version(model):
+    # Invalidate all cached responses of the model
+    cache = get_cache()
+    try:
+        cache.incr(_version_key(model))
+    except ValueError:
+        cache.set(_version_key(model), _new_version(), timeout=None)
+
+
+def response_key(model, version, query_params):
+    # Build key of a cached response for given query parameters
+    query = '&'.join(
+        f'{name}={value}'
+        for name, values in sorted(query_params.lists())
+        for value in values
+    )
+    digest = hashlib.md5(query.encode()).hexdigest()
+
+    return f'catalogue:{model._meta.label_lower}:{version}:{digest}'
+
+
+def record(model, hit):
+    # Count cache hits and misses of the model
+    with _stats_lock:
+        _stats[model._meta.label_lower, 'hits' if hit else 'misses'] += 1
+
+
+def get_stats(*models):
+    # Return hit and miss counters of the models
+    with _stats_lock:
+        return {
+            model._meta.label_lower: {
+                'hits': _stats[model._meta.label_lower, 'hits'],
+                'misses': _stats[model._meta.label_lower, 'misses'],
+            }
+            for model in models
+        }
+
+
+def render_stats():
+    # Counters in the Prometheus text format
+    name = 'catalogue_cache_requests_total'
+    lines = [
+        f'# HELP {name} Cached list responses by model and result.',
+        f'# TYPE {name} counter',
+    ]
+    with _stats_lock:
+        for (model, result), count in sorted(_stats.items()):
+            lines.append(
+                f'{name}{{model="{model}",result="{result}"}} {count}'
+            )
+
+    return '\n'.join(lines) + '\n'
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,163 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from book import imaging, read_model
+from core.models import Book, CoverImage, cover_variant_file_path
+from core.storage import cover_storage
+
+# Size variants of book covers: (max width, max height), format, extension
+VARIANTS = {
+    'thumbnail': ((160, 240), 'JPEG', 'jpg'),
+    'medium': ((480, 720), 'JPEG', 'jpg'),
+    'webp': ((480, 720), 'WEBP', 'webp'),
+}
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    # Pool is created lazily in every process which needs it. Workers
+    # are spawned, not forked, forking a threaded server is not safe.
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.COVER_PROCESSING_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            _slots = threading.BoundedSemaphore(
+                settings.COVER_PROCESSING_MAX_PENDING
+            )
+
+    return _executor, _slots
+
+
+def acquire(name):
+    # Count one more book referring to the cover image
+    images = CoverImage.objects.filter(name=name)
+    increment = {
+        'ref_count': F('ref_count') + 1,
+        'last_modified': timezone.now(),
+    }
+    if not images.update(**increment):
+        CoverImage.objects.bulk_create(
+            [CoverImage(name=name)], ignore_conflicts=True
+        )
+        images.update(**increment)
+
+
+def release(name):
+    # Count one book less referring to the cover image
+    CoverImage.objects.filter(name=name, ref_count__gt=0).update(
+        ref_count=F('ref_count') - 1,
+        last_modified=timezone.now(),
+    )
+
+
+def variant_names(cover_name):
+    return {
+        variant: cover_variant_file_path(cover_name, variant, ext)
+        for variant, (size, image_format, ext) in VARIANTS.items()
+    }
+
+
+def delete_files(cover_name, since=None):
+    # Delete the cover image and all its variants from storage, with
+    # since (a timestamp) only when the image was not saved again since
+    # then. Return whether it was deleted.
+    if since is None:
+        cover_storage.delete(cover_name)
+    elif not cover_storage.delete_unused(cover_name, since):
+        return False
+    for name in variant_names(cover_name).values():
+        default_storage.delete(name)
+
+    return True
+
+
+def _render_args(book):
+    # Return names of variant files and arguments of render_variants,
+    # variants rendered before for the same image are not rendered again
+    names = variant_names(book.cover.name)
+    targets = [
+        (default_storage.path(names[variant]), size, image_format)
+        for variant, (size, image_format, ext) in VARIANTS.items()
+        if not default_storage.exists(names[variant])
+    ]
+
+    return names, (cover_storage.path(book.cover.name), targets)
+
+
+def _save_result(book_id, cover_name, names):
+    # Store variants, unless another cover was uploaded meanwhile
+    status = 'r' if names is not None else 'f'
+    fields = {
+        f'cover_{variant}': name for variant, name in (names or {}).items()
+    }
+    if Book.objects.filter(pk=book_id, cover=cover_name).update(
+        cover_status=status,
+        last_modified=timezone.now(),
+        **fields
+    ):
+        read_model.refresh([book_id])
+
+
+def process_cover(book):
+    # Generate variants in the current process
+    try:
+        names, args = _render_args(book)
+        if args[1]:
+            imaging.render_variants(*args)
+    except Exception:
+        names = None
+    _save_result(book.pk, book.cover.name, names)
+
+
+def _finish(book_id, cover_name, names, thread_id, slots, future):
+    try:
+        if future.exception() is not None:
+            names = None
+        _save_result(book_id, cover_name, names)
+    finally:
+        slots.release()
+        # Callbacks run in the pool management thread, which would
+        # otherwise keep its own database connection open
+        if threading.get_ident() != thread_id:
+            connection.close()
+
+
+def schedule(book):
+    # Hand cover of the book to the process pool and return at once.
+    # When the pool is full the cover stays pending and is picked up by
+    # the process_covers command. Without workers (e.g. in tests)
+    # or with variants already stored covers are processed right away.
+    names, args = _render_args(book)
+    if settings.COVER_PROCESSING_WORKERS == 0 or not args[1]:
+        process_cover(book)
+        return
+
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        return
+
+    try:
+        future = executor.submit(imaging.render_variants, *args)
+    except Exception:
+        slots.release()
+        _save_result(book.pk, book.cover.name, None)
+        return
+
+    future.add_done_callback(partial(
+        _finish, book.pk, book.cover.name, names,
+        threading.get_ident(), slots
+    ))
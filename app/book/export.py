@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def iter_chunks(queryset, to_row, chunk_size, prefetch=()):
+    # Read queryset with a server side cursor and yield lists of rows.
+    # Relations are prefetched for every chunk separately, so memory
+    # use depends on chunk size only, never on the number of rows.
+    chunk = []
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(obj)
+        if len(chunk) >= chunk_size:
+            yield _to_rows(chunk, to_row, prefetch)
+            chunk = []
+    if chunk:
+        yield _to_rows(chunk, to_row, prefetch)
+
+
+def _to_rows(chunk, to_row, prefetch):
+    if prefetch:
+        prefetch_related_objects(chunk, *prefetch)
+
+    return [to_row(obj) for obj in chunk]
+
+
+def ndjson_lines(chunks):
+    for rows in chunks:
+        yield ''.join(
+            json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in rows
+        )
+
+
+def csv_lines(chunks, fields):
+    # Lists are joined with '|', as expected by import_catalogue
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    writer.writeheader()
+    yield buffer.getvalue()
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            {
+                name: '|'.join(map(str, value))
+                if isinstance(value, list) else value
+                for name, value in row.items()
+            }
+            for row in rows
+        )
+        yield buffer.getvalue()
+
+
+def streaming_response(chunks, export_format, fields, filename):
+    # Build streaming response of given format
+    if export_format == 'csv':
+        lines = csv_lines(chunks, fields)
+    else:
+        lines = ndjson_lines(chunks)
+
+    response = StreamingHttpResponse(
+        lines,
+        content_type=CONTENT_TYPES[export_format]
+    )
+    response['Content-Disposition'] = \
+        f'attachment; filename="{filename}.{export_format}"'
+
+    return response
@@ -0,0 +1,32 @@
+import os
+
+from PIL import Image, ImageOps
+
+# Runs in worker processes of the cover pipeline, so it must not
+# import Django models, only plain paths are passed in.
+
+
+def render_variants(source_path, targets):
+    # Save resized copies of the source image,
+    # targets are (path, (max width, max height), format) tuples
+    largest = (
+        max(size[0] for path, size, image_format in targets),
+        max(size[1] for path, size, image_format in targets),
+    )
+    with Image.open(source_path) as image:
+        # Let JPEG decoder scale down while decoding, much cheaper
+        # than decoding a full size scan and resizing it afterwards
+        image.draft('RGB', largest)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        for path, size, image_format in targets:
+            variant = image.copy()
+            variant.thumbnail(size, Image.Resampling.LANCZOS)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Variants are shared by identical covers, write them
+            # atomically as another worker may render the same one
+            part_path = f'{path}.{os.getpid()}.part'
+            variant.save(part_path, image_format, quality=85, optimize=True)
+            os.replace(part_path, path)
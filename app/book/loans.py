@@ -0,0 +1,228 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from book import availability
+from core.models import Book, BookInstance, Hold
+
+# Borrowing works on books, not on copies: any available copy is taken.
+# Copies are claimed with SELECT ... FOR UPDATE SKIP LOCKED, concurrent
+# borrowers of the same book each lock a different copy instead of
+# waiting for one another, and a copy is never handed out twice.
+#
+# Users waiting for a book hold a place in its queue. Available copies
+# of a book with a queue go to its head only, nobody can borrow or
+# reserve them past it. Returned copies go to the head of the queue in
+# the same transaction, copies which became available otherwise are
+# handed out by the allocate_holds command. Joining a queue and passing
+# a copy on both lock the book row first, so a copy returned while a
+# user joins the queue is seen by one of them.
+
+
+def _first(copies):
+    # First copy without sorting, any of them will do
+    return next(iter(copies.order_by()[:1]), None)
+
+
+def _available_copies(book_id):
+    return BookInstance.objects.select_for_update(
+        skip_locked=True, of=('self',)
+    ).filter(book_id=book_id, status='a').order_by()
+
+
+def _available_copy(book):
+    return _first(_available_copies(book.pk))
+
+
+def _lock_queue(book_id):
+    # Serialize changes of the queue and of copies handed out to it
+    list(Book.objects.select_for_update().filter(pk=book_id).values('pk'))
+
+
+def _head_of_queue(book):
+    # First waiting hold of the book, locked, so allocators skip it
+    return Hold.objects.select_for_update().filter(
+        book=book, status='w'
+    ).order_by('id').first()
+
+
+def _copy_past_queue(book, user, hold_status):
+    # Available copy the user may take: any, when nobody waits for the
+    # book, otherwise only the head of the queue gets one and its hold
+    # changes to hold_status
+    head = _head_of_queue(book)
+    if head is not None and head.user_id != user.pk:
+        return None
+    copy = _available_copy(book)
+    if copy is not None and head is not None:
+        head.status = hold_status
+        head.copy = copy
+        head.save(update_fields=['status', 'copy', 'last_modified'])
+
+    return copy
+
+
+def _copy_of_user(book, user, copy_status):
+    return _first(
+        BookInstance.objects.select_for_update(of=('self',)).filter(
+            book=book, status=copy_status, user=user
+        )
+    )
+
+
+def _set_status(copy, copy_status):
+    # Counters lock the book row, they are updated last,
+    # so the lock is held only until the commit
+    BookInstance.objects.filter(pk=copy.pk).update(status=copy_status)
+    availability.change_counts(
+        added=[(copy.book_id, copy_status)],
+        removed=[(copy.book_id, copy.status)]
+    )
+    copy.status = copy_status
+
+
+def _allocate(book_id, copies):
+    # Reserve locked copies of the book for holds at the head of its
+    # queue, return number of allocated copies. Heads locked by another
+    # allocator are skipped, both are served at the same time.
+    holds = list(
+        Hold.objects.select_for_update(skip_locked=True).filter(
+            book_id=book_id, status='w'
+        ).order_by('id')[:len(copies)]
+    )
+    pairs = list(zip(copies, holds))
+    if not pairs:
+        return 0
+
+    through = BookInstance.user.through
+    through.objects.bulk_create([
+        through(bookinstance_id=copy.pk, user_id=hold.user_id)
+        for copy, hold in pairs
+    ], ignore_conflicts=True)
+    now = timezone.now()
+    for copy, hold in pairs:
+        hold.status = 'r'
+        hold.copy = copy
+        hold.last_modified = now
+    Hold.objects.bulk_update(holds, ['status', 'copy', 'last_modified'])
+    BookInstance.objects.filter(
+        pk__in=[copy.pk for copy, hold in pairs]
+    ).update(status='r')
+    availability.change_counts(
+        added=[(book_id, 'r') for copy, hold in pairs],
+        removed=[(book_id, copy.status) for copy, hold in pairs]
+    )
+    for copy, hold in pairs:
+        copy.status = 'r'
+
+    return len(pairs)
+
+
+def _release(copy):
+    # Pass a copy nobody holds anymore on to the queue
+    _lock_queue(copy.book_id)
+    if not _allocate(copy.book_id, [copy]):
+        _set_status(copy, 'a')
+
+
+def borrow(book, user):
+    # Lend the copy reserved for the user or an available one,
+    # return the copy or None when there is none
+    with transaction.atomic():
+        copy = _copy_of_user(book, user, 'r') or \
+            _copy_past_queue(book, user, 'f')
+        if copy is None:
+            return None
+        copy.user.add(user)
+        Hold.objects.filter(copy=copy, status='r').update(status='f')
+        _set_status(copy, 'o')
+
+    return copy
+
+
+def reserve(book, user):
+    # Put aside an available copy for the user,
+    # return the copy or None when there is none
+    with transaction.atomic():
+        copy = _copy_past_queue(book, user, 'r')
+        if copy is None:
+            return None
+        copy.user.add(user)
+        _set_status(copy, 'r')
+
+    return copy
+
+
+def return_copy(book, user):
+    # Take back a copy of the book lent to the user and give it to the
+    # head of the queue, return the copy or None when the user has none
+    with transaction.atomic():
+        copy = _copy_of_user(book, user, 'o')
+        if copy is None:
+            return None
+        copy.user.remove(user)
+        _release(copy)
+
+    return copy
+
+
+def enqueue(book, user):
+    # Join the queue for the book, a copy available right now goes to
+    # the head of the queue. Return the hold and whether it is new.
+    try:
+        with transaction.atomic():
+            _lock_queue(book.pk)
+            hold = Hold.objects.create(book=book, user=user)
+            _allocate(book.pk, list(_available_copies(book.pk)[:1]))
+    except IntegrityError:
+        # User is in the queue already
+        return Hold.objects.get(
+            book=book, user=user, status__in=['w', 'r']
+        ), False
+
+    hold.refresh_from_db(fields=['status', 'copy'])
+
+    return hold, True
+
+
+def cancel(hold):
+    # Leave the queue, a copy already reserved goes to the next user
+    with transaction.atomic():
+        hold = Hold.objects.select_for_update().get(pk=hold.pk)
+        if hold.status not in ('w', 'r'):
+            return hold
+        copy = None
+        if hold.status == 'r' and hold.copy_id:
+            copy = BookInstance.objects.select_for_update().filter(
+                pk=hold.copy_id, status='r'
+            ).first()
+        hold.status = 'c'
+        hold.save(update_fields=['status', 'last_modified'])
+        if copy is not None:
+            copy.user.remove(hold.user_id)
+            _release(copy)
+
+    return hold
+
+
+def allocate(book_id, batch_size):
+    # Hand out up to batch_size available copies of the book to its
+    # queue in one transaction, return number of allocated copies
+    with transaction.atomic():
+        copies = list(_available_copies(book_id)[:batch_size])
+
+        return _allocate(book_id, copies) if copies else 0
+
+
+def with_positions(holds):
+    # Annotate 1 based queue positions (meaningful for waiting holds).
+    # Only holds ahead are counted, read from the partial queue index,
+    # the rest of the queue is never scanned.
+    ahead = Hold.objects.filter(
+        book=OuterRef('book'), status='w', id__lt=OuterRef('id')
+    ).order_by().values('book').annotate(count=Count('id')).values('count')
+
+    return holds.annotate(
+        queue_position=Coalesce(Subquery(ahead), 0) + 1
+    )
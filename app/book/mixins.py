@@ -0,0 +1,329 @@
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from book import cache as catalogue_cache, export
+from book.rows import compile_rows
+
+
+class PageNotModified(Exception):
+    # The page is current for the client, raised before it is serialized
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+class ConditionalGetMixin:
+    # Answer list and retrieve requests with 304 Not Modified when
+    # the client already has current data. Validators of details and
+    # unpaginated lists are computed with a single aggregate query
+    # (or read from the detail itself, see validates_object),
+    # validators of paginated lists from the rows of the page served.
+    # Both are checked before anything is serialized. Lists get only an
+    # ETag: deleting a row does not move the newest modification of the
+    # rows left, a Last-Modified of a list would stay the same.
+
+    def get_list_validators(self):
+        # Newest modification and number of rows of the filtered list,
+        # the count changes when a row is deleted
+        return self.filter_queryset(self.get_queryset()).aggregate(
+            last_modified=Max('last_modified'),
+            count=Count('pk'),
+        )
+
+    def get_page_validators(self, page):
+        # Rows of the page and their newest modification. Links to the
+        # pages around it change when rows are added or deleted at its
+        # edges, changes of rows of other pages do not matter.
+        modified = [
+            row.last_modified for row in page
+            if row.last_modified is not None
+        ]
+
+        return {
+            'last_modified': max(modified, default=None),
+            'rows': [row.pk if hasattr(row, 'pk') else row.id
+                     for row in page],
+            'next': self.paginator.get_next_link(),
+            'previous': self.paginator.get_previous_link(),
+        }
+
+    def validates_object(self):
+        # Whether validators of the detail are read from the fetched
+        # object (see get_object_validators) instead of an aggregate
+        return False
+
+    def get_object_validators(self, instance):
+        return {'last_modified': instance.last_modified}
+
+    def get_detail_validators(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+
+        return self.get_queryset().filter(**{
+            self.lookup_field: self.kwargs[lookup_url_kwarg]
+        }).aggregate(last_modified=Max('last_modified'))
+
+    def _check_validators(self, request, validators, dated=True):
+        # ETag, Last-Modified (None when not dated) and the 304 response
+        # when the client has current data (None otherwise)
+        modified = [
+            value for name, value in validators.items()
+            if name.endswith('last_modified') and value is not None
+        ]
+        last_modified = int(max(modified).timestamp()) \
+            if modified and dated else None
+        # Same validators give different bodies for other pages,
+        # filters or formats, so they are part of the tag
+        etag_source = '|'.join([
+            request.get_full_path(),
+            request.accepted_media_type or '',
+            repr(sorted(validators.items())),
+        ])
+        etag = quote_etag(hashlib.md5(etag_source.encode()).hexdigest())
+
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified
+        )
+
+        return etag, last_modified, response
+
+    def _set_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+
+        return response
+
+    def _conditional_response(self, request, validators, get_response,
+                              dated=True):
+        etag, last_modified, response = self._check_validators(
+            request, validators, dated
+        )
+        if response is None:
+            response = get_response()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+
+        return self._set_validators(response, etag, last_modified)
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None and self.action == 'list':
+            self._page_validators = self._check_validators(
+                self.request, self.get_page_validators(page), dated=False
+            )
+            if self._page_validators[2] is not None:
+                raise PageNotModified(self._page_validators[2])
+
+        return page
+
+    def list(self, request, *args, **kwargs):
+        if self.paginator is None:
+            return self._conditional_response(
+                request,
+                self.get_list_validators(),
+                lambda: super(ConditionalGetMixin, self).list(
+                    request, *args, **kwargs
+                ),
+                dated=False
+            )
+
+        # Validators are read from the page (see paginate_queryset)
+        self._page_validators = None
+        try:
+            response = super().list(request, *args, **kwargs)
+        except PageNotModified as exc:
+            return self._set_validators(
+                exc.response, *self._page_validators[:2]
+            )
+        if self._page_validators is None or \
+                response.status_code != status.HTTP_200_OK:
+            return response
+
+        return self._set_validators(response, *self._page_validators[:2])
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.validates_object():
+            return self._conditional_response(
+                request,
+                self.get_detail_validators(),
+                lambda: super(ConditionalGetMixin, self).retrieve(
+                    request, *args, **kwargs
+                )
+            )
+
+        # One query: the object is read first, serialized only when
+        # the client does not have it already
+        instance = self.get_object()
+        etag, last_modified, response = self._check_validators(
+            request, self.get_object_validators(instance)
+        )
+        if response is None:
+            response = Response(self.get_serializer(instance).data)
+
+        return self._set_validators(response, etag, last_modified)
+
+
+class CachedListMixin:
+    # Serve list responses from the catalogue cache, entries are
+    # invalidated by bumping model version (see book.signals)
+
+    def _cache_key(self, name):
+        model = self.queryset.model
+
+        return catalogue_cache.response_key(
+            model,
+            f'{catalogue_cache.get_version(model)}:{name}',
+            self.request.query_params
+        )
+
+    def get_cached(self, name, compute):
+        # Return value cached for current model version, or compute it
+        cache = catalogue_cache.get_cache()
+        key = self._cache_key(name)
+        value = cache.get(key)
+        if value is None:
+            value = compute()
+            cache.set(key, value, settings.CATALOGUE_CACHE_TIMEOUT)
+
+        return value
+
+    def list(self, request, *args, **kwargs):
+        model = self.queryset.model
+        cache = catalogue_cache.get_cache()
+        key = self._cache_key('list')
+        data = cache.get(key)
+        hit = data is not None
+        catalogue_cache.record(model, hit)
+
+        if not hit:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(key, data, settings.CATALOGUE_CACHE_TIMEOUT)
+
+        return Response(data, headers={'X-Cache': 'HIT' if hit else 'MISS'})
+
+
+class SparseFieldsMixin:
+    # '?fields=id,name' limits list and retrieve responses to the given
+    # fields of the serializer, '?exclude=summary' leaves fields out.
+    # Columns of other fields are not read and their relations are not
+    # loaded (see book.serializers.SparseFieldsSerializerMixin).
+    sparse_actions = ('list', 'retrieve')
+    # Columns read by the paginator, e.g. its orderings
+    pagination_columns = ()
+
+    def get_sparse_fields(self):
+        # Names of the requested fields, None for all of them
+        params = self.request.query_params
+        if self.action not in self.sparse_actions or \
+                not (params.get('fields') or params.get('exclude')):
+            return None
+
+        available = self.get_serializer_class().Meta.fields
+        names = list(available)
+        for param in ('fields', 'exclude'):
+            if not params.get(param):
+                continue
+            requested = set(params[param].split(','))
+            unknown = requested - set(available)
+            if unknown:
+                raise ValidationError({param: [
+                    _('Unknown fields: %(fields)s.') % {
+                        'fields': ', '.join(sorted(unknown))
+                    }
+                ]})
+            names = [
+                name for name in names
+                if (name in requested) == (param == 'fields')
+            ]
+
+        return names
+
+    def get_sparse_queryset(self, queryset):
+        # Relations and columns of the requested fields only
+        serializer_class = self.get_serializer_class()
+        fields = self.get_sparse_fields()
+        if hasattr(serializer_class, 'setup_eager_loading'):
+            queryset = serializer_class.setup_eager_loading(queryset, fields)
+        if fields is not None:
+            queryset = queryset.only(
+                *serializer_class.sparse_columns(fields),
+                *self.pagination_columns
+            )
+
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_sparse_fields()
+
+        return context
+
+
+class RowListMixin:
+    # Lists are read as plain rows instead of model instances when
+    # the serializer compiles (see book.rows), the output is the same
+
+    def list(self, request, *args, **kwargs):
+        rows = compile_rows(self.get_serializer())
+        if rows is None:
+            return super().list(request, *args, **kwargs)
+        for column in getattr(self, 'pagination_columns', ()):
+            rows.column(column)
+
+        queryset = rows.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(rows.serialize(page))
+
+        return Response(rows.serialize(queryset))
+
+
+class ExportMixin:
+    # Stream the whole filtered list as NDJSON or CSV,
+    # '?export_format=' selects the format ('format' is used by DRF)
+    export_fields = ()
+    export_prefetch = ()
+    export_filename = 'export'
+
+    def get_export_queryset(self):
+        # Relations needed by get_export_row are joined or prefetched
+        # per chunk, prefetching of the serializer is not used
+        return self.filter_queryset(self.get_queryset()).prefetch_related(None)
+
+    def get_export_row(self, obj):
+        raise NotImplementedError
+
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in export.CONTENT_TYPES:
+            return Response(
+                {'detail': _('Unsupported export format.')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        chunks = export.iter_chunks(
+            self.get_export_queryset(),
+            self.get_export_row,
+            settings.EXPORT_CHUNK_SIZE,
+            self.export_prefetch
+        )
+
+        return export.streaming_response(
+            chunks,
+            export_format,
+            self.export_fields,
+            self.export_filename
+        )
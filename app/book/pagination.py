@@ -0,0 +1,221 @@
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination, \
+    _reverse_ordering
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    # Keyset (cursor) pagination, every page is fetched with
+    # 'WHERE id < <last seen id> ORDER BY -id LIMIT n', so page 10 000 costs
+    # the same as page 1. Cursors are opaque base64 tokens built by DRF.
+    # Ordering has to be on a unique, indexed column, or on a few columns
+    # unique together with an index on all of them, e.g.
+    # ('copies_available', 'id'). Position of the cursor has values of all
+    # of them and pages start right after it, 'WHERE (copies_available,
+    # id) > (<last seen>)', without offsets.
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+    # Values of the position, none of them contains it
+    position_separator = ','
+
+    def get_page_size(self, request):
+        # Read page size settings on every request, so they can be
+        # tuned (and overridden in tests) without touching the class
+        self.page_size = settings.BOOK_PAGE_SIZE
+        self.max_page_size = settings.BOOK_MAX_PAGE_SIZE
+
+        return super().get_page_size(request)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Same as CursorPagination.paginate_queryset, but the position
+        # filters by all columns of the ordering, not only the first one
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            try:
+                queryset = queryset.filter(
+                    self._after(current_position, reverse)
+                )
+            except (ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # One row more tells if there is a following page
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            # Rows were read in reverse, the page is shown in order
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def _after(self, position, reverse):
+        # Rows following the position in the order they are read:
+        # (a > x) OR (a = x AND b > y) OR ..., the first column is
+        # also bounded on its own, so the index is scanned from x on
+        values = position.split(
+            self.position_separator, len(self.ordering) - 1
+        )
+        if len(values) != len(self.ordering):
+            raise ValueError(position)
+
+        after = Q()
+        equal = {}
+        for order, value in zip(self.ordering, values):
+            field = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') != reverse else 'gt'
+            after |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        first = self.ordering[0]
+        field = first.lstrip('-')
+        lookup = 'lte' if first.startswith('-') != reverse else 'gte'
+
+        return Q(**{f'{field}__{lookup}': values[0]}) & after
+
+    def _get_position_from_instance(self, instance, ordering):
+        return self.position_separator.join(
+            str(
+                instance[order.lstrip('-')] if isinstance(instance, dict)
+                else getattr(instance, order.lstrip('-'))
+            )
+            for order in ordering
+        )
+
+
+class BookPagination(KeysetPagination):
+    # Pagination for books, follows Book.Meta.ordering unless the client
+    # asks for one of the orderings below with '?ordering='. Orderings
+    # by availability end with the id, so positions are unique
+    # (see book_availability_idx).
+    ordering = '-id'
+    ordering_query_param = 'ordering'
+    orderings = {
+        'available': ('copies_available', 'id'),
+        '-available': ('-copies_available', '-id'),
+    }
+
+    def get_ordering(self, request, queryset, view):
+        ordering = request.query_params.get(self.ordering_query_param)
+        if ordering in self.orderings:
+            return self.orderings[ordering]
+
+        return super().get_ordering(request, queryset, view)
+
+
+class BookInstancePagination(KeysetPagination):
+    # Pagination for book copies, primary key is an uuid so ordering
+    # by it is unique and served from the primary key index
+    ordering = 'id'
+
+
+class SearchPagination(BasePagination):
+    # Pagination for results ordered by relevance. Rank is not unique,
+    # so keyset pagination can not be used, instead pages are read with
+    # LIMIT/OFFSET, but never deeper than BOOK_SEARCH_MAX_RESULTS rows.
+    # Response has the same shape as keyset pages (no total count).
+    page_query_param = 'page'
+    page_size_query_param = 'page_size'
+    invalid_page_message = _('Invalid page.')
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            page_size = settings.BOOK_PAGE_SIZE
+        if page_size <= 0:
+            page_size = settings.BOOK_PAGE_SIZE
+
+        return min(page_size, settings.BOOK_MAX_PAGE_SIZE)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        try:
+            self.page = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+
+        offset = (self.page - 1) * self.page_size
+        if self.page < 1 or offset >= settings.BOOK_SEARCH_MAX_RESULTS:
+            raise NotFound(self.invalid_page_message)
+
+        limit = min(self.page_size, settings.BOOK_SEARCH_MAX_RESULTS - offset)
+        # Fetch one row more to know if there is a next page
+        results = list(queryset[offset:offset + limit + 1])
+        self.has_next = (
+            len(results) > limit and
+            offset + limit < settings.BOOK_SEARCH_MAX_RESULTS
+        )
+
+        return results[:limit]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+
+        return replace_query_param(url, self.page_query_param, self.page + 1)
+
+    def get_previous_link(self):
+        if self.page == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page == 2:
+            return remove_query_param(url, self.page_query_param)
+
+        return replace_query_param(url, self.page_query_param, self.page - 1)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
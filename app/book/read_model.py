@@ -0,0 +1,176 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import Book, BookReadModel
+
+# Book lists and details are read from BookReadModel, one row per book
+# with everything they show. Rows are refreshed in the transaction which
+# changed their sources: by signals of books, authors, publishing houses,
+# genres and genres of books (see book.signals) and by set based writes,
+# which send no signals (bulk upserts, availability counters, cover
+# variants, generated catalogues). rebuild_read_model refreshes all rows,
+# e.g. after books were changed with raw SQL.
+
+# Columns copied from the book as they are
+BOOK_COLUMNS = (
+    'id', 'name', 'author', 'publishing_house', 'summary',
+    'number_of_pages', 'isbn', 'year_of_publish', 'cover', 'cover_status',
+    'cover_thumbnail', 'cover_medium', 'cover_webp', 'copies_total',
+    'copies_available', 'copies_on_loan', 'copies_reserved',
+)
+UPDATED_FIELDS = [
+    field for field in BookReadModel._meta.concrete_fields
+    if not field.primary_key
+]
+
+BATCH_SIZE = 1000
+
+
+def _build(book_ids):
+    # Rows of the books as they are stored now
+    genres = defaultdict(list)
+    for book_id, *genre in Book.genre.through.objects.filter(
+        book_id__in=book_ids
+    ).order_by('book_id', 'genre_id').values_list(
+        'book_id', 'genre_id', 'genre__name', 'genre__last_modified'
+    ):
+        genres[book_id].append(genre)
+
+    rows = []
+    for book in Book.objects.filter(pk__in=book_ids).order_by().values(
+        *BOOK_COLUMNS, 'last_modified',
+        author_first_name=F('author__first_name'),
+        author_last_name=F('author__last_name'),
+        author_last_modified=F('author__last_modified'),
+        publishing_house_name=F('publishing_house__name'),
+        publishing_house_last_modified=F('publishing_house__last_modified'),
+    ):
+        book_genres = genres.get(book['id'], [])
+        modified = [
+            book.pop('last_modified'),
+            book.pop('author_last_modified'),
+            book.pop('publishing_house_last_modified'),
+            *(last_modified for _, _, last_modified in book_genres),
+        ]
+        rows.append(BookReadModel(
+            author_id=book.pop('author'),
+            publishing_house_id=book.pop('publishing_house'),
+            genre=[pk for pk, _, _ in book_genres],
+            genre_names=[name for _, name, _ in book_genres],
+            last_modified=max(
+                (value for value in modified if value is not None),
+                default=None
+            ),
+            **book
+        ))
+
+    return rows
+
+
+def refresh(book_ids):
+    # Rebuild rows of the books from their sources, rows of books
+    # which do not exist anymore are deleted
+    book_ids = sorted(set(book_ids))
+    for start in range(0, len(book_ids), BATCH_SIZE):
+        _refresh(book_ids[start:start + BATCH_SIZE])
+
+
+def _refresh(book_ids):
+    with transaction.atomic():
+        # Rows are locked before their sources are read, so a concurrent
+        # refresh waits for this transaction and then reads its changes
+        existing = {
+            row.pk: _values(row)
+            for row in BookReadModel.objects.select_for_update().filter(
+                pk__in=book_ids
+            ).order_by('pk')
+        }
+        rows = _build(book_ids)
+        # Only rows which differ are written, rebuilds mostly find none
+        BookReadModel.objects.bulk_update(
+            [
+                row for row in rows
+                if row.pk in existing and existing[row.pk] != _values(row)
+            ],
+            [field.name for field in UPDATED_FIELDS],
+            batch_size=100
+        )
+        # Rows of books created meanwhile could be inserted
+        # by their own transaction already
+        BookReadModel.objects.bulk_create(
+            [row for row in rows if row.pk not in existing],
+            ignore_conflicts=True
+        )
+        deleted = existing.keys() - {row.pk for row in rows}
+        if deleted:
+            BookReadModel.objects.filter(pk__in=deleted).delete()
+
+
+def _values(row):
+    return [getattr(row, field.attname) for field in UPDATED_FIELDS]
+
+
+def remove(book_ids):
+    BookReadModel.objects.filter(pk__in=book_ids).delete()
+
+
+def change_counts(book_ids, deltas, now):
+    # Same changes of availability counters as of the books
+    # (see book.availability.change_counts)
+    BookReadModel.objects.filter(pk__in=book_ids).update(
+        last_modified=now,
+        **{field: F(field) + delta for field, delta in deltas}
+    )
+
+
+def rename_author(author):
+    BookReadModel.objects.filter(author=author.pk).update(
+        author_first_name=author.first_name,
+        author_last_name=author.last_name,
+        last_modified=author.last_modified,
+    )
+
+
+def rename_publishing_house(publishing_house):
+    BookReadModel.objects.filter(
+        publishing_house=publishing_house.pk
+    ).update(
+        publishing_house_name=publishing_house.name,
+        last_modified=publishing_house.last_modified,
+    )
+
+
+def genre_book_ids(genre):
+    return list(
+        Book.genre.through.objects.filter(genre_id=genre.pk)
+        .values_list('book_id', flat=True)
+    )
+
+
+def touch_books(book_ids):
+    # Genres are part of the representation of books
+    Book.objects.filter(pk__in=book_ids).update(last_modified=timezone.now())
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    # Refresh rows of all books in batches of ids, each in its own
+    # transaction, then delete rows of books which do not exist.
+    # Yields number of refreshed books after every batch.
+    books = Book.objects.order_by('id').values_list('id', flat=True)
+    refreshed = 0
+    last_id = 0
+    while True:
+        batch = list(books.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        refresh(batch)
+        refreshed += len(batch)
+        last_id = batch[-1]
+        yield refreshed
+
+    BookReadModel.objects.exclude(
+        pk__in=Book.objects.values('pk')
+    ).delete()
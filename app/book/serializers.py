@@ -1,36 +1,108 @@
 from core.models import Author, PublishingHouse, \
-    Genre, Book, BookInstance
-from rest_framework import serializers, request
+    Genre, Book, BookInstance, BookReadModel, Hold
+from isbn_field.validators import ISBNValidator
+from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+from core.timing import TimedListSerializer, TimedSerializerMixin
 from user.serializers import UserSerializer
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(TimedSerializerMixin,
+                      serializers.ModelSerializer):
     # Serializer for genre objects
 
     class Meta:
         model = Genre
+        list_serializer_class = TimedListSerializer
         fields = ('id', 'name')
         read_only_fields = ('id',)
 
 
-class AuthorSerializer(serializers.ModelSerializer):
+class AuthorSerializer(TimedSerializerMixin,
+                       serializers.ModelSerializer):
     # Serializer for author
     class Meta:
         model = Author
+        list_serializer_class = TimedListSerializer
         fields = ('id', 'first_name', 'last_name')
         read_only_fields = ('id',)
 
 
-class PublishingHouseSerializer(serializers.ModelSerializer):
+class PublishingHouseSerializer(TimedSerializerMixin,
+                                serializers.ModelSerializer):
     # Serializer for publishing house
     class Meta:
         model = PublishingHouse
+        list_serializer_class = TimedListSerializer
         fields = ('id', 'name')
         read_only_fields = ('id',)
 
 
-class BookSerializer(serializers.ModelSerializer):
+class CoverSerializerMixin(serializers.Serializer):
+    # Urls of the cover and its generated variants
+    covers = serializers.SerializerMethodField()
+    # Columns of get_covers_from_values, used by lists (see book.rows)
+    covers_columns = (
+        'cover', 'cover_status', 'cover_thumbnail', 'cover_medium',
+        'cover_webp',
+    )
+
+    def get_covers(self, book):
+        return self.get_covers_from_values(
+            book.cover.name, book.cover_status, book.cover_thumbnail.name,
+            book.cover_medium.name, book.cover_webp.name,
+        )
+
+    def get_covers_from_values(self, cover, cover_status, thumbnail,
+                               medium, webp):
+        # File names are resolved by the storage of their field
+        files = {'original': ('cover', cover)}
+        if cover_status == 'r':
+            files.update(
+                thumbnail=('cover_thumbnail', thumbnail),
+                medium=('cover_medium', medium),
+                webp=('cover_webp', webp),
+            )
+        request = self.context.get('request')
+        urls = {}
+        for name, (column, file_name) in files.items():
+            if not file_name:
+                continue
+            url = Book._meta.get_field(column).storage.url(file_name)
+            urls[name] = request.build_absolute_uri(url) if request else url
+
+        return urls
+
+
+class SparseFieldsSerializerMixin(serializers.Serializer):
+    # Only fields listed in context['fields'] are kept, all of them
+    # when it is None (see book.mixins.SparseFieldsMixin)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        names = self.context.get('fields')
+        if names is not None:
+            for name in set(self.fields) - set(names):
+                self.fields.pop(name)
+
+    @classmethod
+    def sparse_columns(cls, names):
+        # Columns of the model read by the fields, method fields declare
+        # theirs in '<name>_columns' (see book.rows). Related ids of
+        # many to many relations are loaded separately.
+        columns = []
+        for name in names:
+            if hasattr(cls, f'{name}_columns'):
+                columns.extend(getattr(cls, f'{name}_columns'))
+            elif not cls.Meta.model._meta.get_field(name).many_to_many:
+                columns.append(name)
+
+        return columns
+
+
+class BookSerializer(TimedSerializerMixin, SparseFieldsSerializerMixin,
+                     CoverSerializerMixin, serializers.ModelSerializer):
     # Serializer for book
     publishing_house = serializers.PrimaryKeyRelatedField(
         many=False,
@@ -47,12 +119,45 @@ class BookSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Book
+        list_serializer_class = TimedListSerializer
         fields = ('id', 'name', 'author',
+                  'publishing_house', 'summary',
+                  'number_of_pages', 'isbn',
+                  'year_of_publish',
+                  'genre', 'cover_status', 'covers',
+                  'copies_total', 'copies_available',
+                  'copies_on_loan', 'copies_reserved')
+        read_only_fields = ('id', 'cover_status')
+
+    @staticmethod
+    def setup_eager_loading(queryset, fields=None):
+        # Author and publishing house are rendered as primary keys
+        # read from the book row, only genres need an extra query.
+        # Ids are ordered, lists read from rows list them the same way.
+        if fields is not None and 'genre' not in fields:
+            return queryset
+
+        return queryset.prefetch_related(
+            Prefetch('genre', queryset=Genre.objects.order_by('pk'))
+        )
+
+
+class BookBulkSerializer(serializers.ModelSerializer):
+    # Serializer for one book of a bulk upsert, relations are plain ids
+    # validated later for the whole request at once and isbn is not
+    # checked for uniqueness, because it is the upsert key
+    author = serializers.IntegerField(source='author_id')
+    publishing_house = serializers.IntegerField(source='publishing_house_id')
+    genre = serializers.ListField(child=serializers.IntegerField())
+
+    class Meta:
+        model = Book
+        fields = ('name', 'author',
                   'publishing_house', 'summary',
                   'number_of_pages', 'isbn',
                   'year_of_publish',
                   'genre')
-        read_only_fields = ('id',)
+        extra_kwargs = {'isbn': {'validators': [ISBNValidator]}}
 
 
 class BookDetailSerializer(BookSerializer):
@@ -61,23 +166,141 @@ class BookDetailSerializer(BookSerializer):
     author = AuthorSerializer(many=False, read_only=True)
     genre = GenreSerializer(many=True, read_only=True)
 
+    @staticmethod
+    def setup_eager_loading(queryset, fields=None):
+        # Nested author and publishing house are joined to the book row,
+        # relations which are not among the fields are not loaded
+        related = [
+            name for name in ('author', 'publishing_house')
+            if fields is None or name in fields
+        ]
+        if related:
+            queryset = queryset.select_related(*related)
+        if fields is None or 'genre' in fields:
+            queryset = queryset.prefetch_related(
+                Prefetch('genre', queryset=Genre.objects.order_by('pk'))
+            )
+
+        return queryset
+
+
+class BookReadModelSerializer(BookSerializer):
+    # Book as stored by its read model (see book.read_model),
+    # represented the same as by BookSerializer
+    genre = serializers.ListField(
+        child=serializers.IntegerField(), read_only=True
+    )
+
+    class Meta(BookSerializer.Meta):
+        model = BookReadModel
+
+    @staticmethod
+    def setup_eager_loading(queryset, fields=None):
+        # Everything is on the row
+        return queryset
+
+    def get_covers(self, book):
+        return self.get_covers_from_values(
+            book.cover, book.cover_status, book.cover_thumbnail,
+            book.cover_medium, book.cover_webp,
+        )
+
+
+class BookDetailReadModelSerializer(BookReadModelSerializer):
+    # Book detail from its read model, nested relations are made of
+    # ids and names stored on the row, as BookDetailSerializer shows them
+    publishing_house = serializers.SerializerMethodField()
+    author = serializers.SerializerMethodField()
+    genre = serializers.SerializerMethodField()
+    # Columns of the methods, used by lists (see book.rows)
+    publishing_house_columns = ('publishing_house', 'publishing_house_name')
+    author_columns = ('author', 'author_first_name', 'author_last_name')
+    genre_columns = ('genre', 'genre_names')
+
+    def get_publishing_house(self, book):
+        return self.get_publishing_house_from_values(
+            book.publishing_house_id, book.publishing_house_name
+        )
+
+    def get_publishing_house_from_values(self, pk, name):
+        return {'id': pk, 'name': name}
+
+    def get_author(self, book):
+        return self.get_author_from_values(
+            book.author_id, book.author_first_name, book.author_last_name
+        )
+
+    def get_author_from_values(self, pk, first_name, last_name):
+        return {'id': pk, 'first_name': first_name, 'last_name': last_name}
+
+    def get_genre(self, book):
+        return self.get_genre_from_values(book.genre, book.genre_names)
+
+    def get_genre_from_values(self, ids, names):
+        return [{'id': pk, 'name': name} for pk, name in zip(ids, names)]
+
 
-class BookInstanceSerializer(serializers.ModelSerializer):
+class BookInstanceSerializer(TimedSerializerMixin,
+                             serializers.ModelSerializer):
     # Serializer for a specific book copy
     user = get_user_model()
     book = Book.objects.all()
 
     class Meta:
         model = BookInstance
+        list_serializer_class = TimedListSerializer
         fields = ('id', 'status',
                   'user', 'book')
-        read_only_fields = ('id',)
+        # Status and borrowers change only through the locking loan
+        # actions of BookInstanceViewSet (see book.loans)
+        read_only_fields = ('id', 'status', 'user')
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        # Users are a many to many relation, load them in one query
+        return queryset.prefetch_related(Prefetch(
+            'user', queryset=get_user_model().objects.order_by('pk')
+        ))
+
+
+class LoanSerializer(serializers.Serializer):
+    # Book to borrow, reserve or return a copy of
+    book = serializers.PrimaryKeyRelatedField(queryset=Book.objects.all())
+
+
+class HoldSerializer(TimedSerializerMixin,
+                     serializers.ModelSerializer):
+    # Serializer for a place in the queue for a book
+    book = serializers.PrimaryKeyRelatedField(queryset=Book.objects.all())
+    # Only waiting holds have a position, 1 is the head of the queue
+    position = serializers.SerializerMethodField()
 
+    class Meta:
+        model = Hold
+        list_serializer_class = TimedListSerializer
+        fields = ('id', 'book', 'status', 'copy', 'position', 'created_date')
+        read_only_fields = ('id', 'status', 'copy', 'created_date')
+
+    def get_position(self, hold):
+        if hold.status != 'w':
+            return None
+
+        return hold.queue_position
 
-class BookImageSerializer(serializers.ModelSerializer):
-    # Serializer for uploading covers to books
+
+class BookImageSerializer(CoverSerializerMixin, serializers.ModelSerializer):
+    # Serializer for uploading covers to books,
+    # variants are generated later (see book.covers)
 
     class Meta:
         model = Book
-        fields = ('id', 'cover')
-        read_only_fields = ('id',)
\ No newline at end of file
+        fields = ('id', 'cover', 'cover_status', 'covers')
+        read_only_fields = ('id', 'cover_status')
+
+    def update(self, instance, validated_data):
+        instance.cover_status = 'p'
+        instance.cover_thumbnail = None
+        instance.cover_medium = None
+        instance.cover_webp = None
+
+        return super().update(instance, validated_data)
@@ -0,0 +1,159 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, \
+    post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from book import availability, cache, covers, read_model
+from core.models import Author, Book, BookInstance, Genre, PublishingHouse
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=PublishingHouse)
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=PublishingHouse)
+def invalidate_catalogue_cache(sender, **kwargs):
+    # Bump version right away and once more after commit, readers
+    # between both bumps could cache data from before the commit
+    cache.bump_version(sender)
+    transaction.on_commit(lambda: cache.bump_version(sender))
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def touch_books_on_genre_change(sender, instance, action, reverse,
+                                pk_set, **kwargs):
+    # Genres are part of the book representation, but changing them
+    # does not save the book, so last_modified used for conditional
+    # requests has to be updated here
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    if not reverse:
+        books = Book.objects.filter(pk=instance.pk)
+    elif action == 'pre_clear':
+        books = instance.books.all()
+    else:
+        books = Book.objects.filter(pk__in=pk_set)
+
+    books.update(last_modified=timezone.now())
+
+
+@receiver(pre_save, sender=Book)
+def remember_replaced_cover(sender, instance, **kwargs):
+    # A new cover file is not stored yet, remember the cover it replaces
+    if not instance.cover or instance.cover._committed:
+        return
+
+    instance._replaced_cover = None
+    if instance.pk:
+        instance._replaced_cover = Book.objects.filter(
+            pk=instance.pk
+        ).values_list('cover', flat=True).first()
+
+
+@receiver(post_save, sender=Book)
+def count_cover_references(sender, instance, **kwargs):
+    # Cover images are shared by books, count references to them
+    if not hasattr(instance, '_replaced_cover'):
+        return
+
+    covers.acquire(instance.cover.name)
+    if instance._replaced_cover:
+        covers.release(instance._replaced_cover)
+    del instance._replaced_cover
+
+
+@receiver(post_delete, sender=Book)
+def release_cover(sender, instance, **kwargs):
+    if instance.cover:
+        covers.release(instance.cover.name)
+
+
+@receiver(pre_save, sender=BookInstance)
+def remember_counted_copy(sender, instance, using, **kwargs):
+    # Book and status the copy is counted with, locked until the end
+    # of the transaction, so concurrent changes can not count it twice
+    instance._counted_as = None
+    if instance._state.adding:
+        return
+
+    copies = BookInstance.objects.using(using).filter(pk=instance.pk)
+    if transaction.get_connection(using).in_atomic_block:
+        copies = copies.select_for_update()
+    instance._counted_as = copies.values_list('book_id', 'status').first()
+
+
+@receiver(post_save, sender=BookInstance)
+def count_copy(sender, instance, **kwargs):
+    counted_as = instance.__dict__.pop('_counted_as', None)
+    availability.change_counts(
+        added=[(instance.book_id, instance.status)],
+        removed=[counted_as] if counted_as else []
+    )
+
+
+@receiver(post_delete, sender=BookInstance)
+def uncount_copy(sender, instance, **kwargs):
+    availability.change_counts(removed=[(instance.book_id, instance.status)])
+
+
+@receiver(post_save, sender=Book)
+def refresh_read_model(sender, instance, **kwargs):
+    read_model.refresh([instance.pk])
+
+
+@receiver(post_delete, sender=Book)
+def remove_read_model(sender, instance, **kwargs):
+    read_model.remove([instance.pk])
+
+
+@receiver(post_save, sender=Author)
+def rename_author_in_read_model(sender, instance, created, **kwargs):
+    if not created:
+        read_model.rename_author(instance)
+
+
+@receiver(post_save, sender=PublishingHouse)
+def rename_publishing_house_in_read_model(sender, instance, created,
+                                          **kwargs):
+    if not created:
+        read_model.rename_publishing_house(instance)
+
+
+@receiver(post_save, sender=Genre)
+def rename_genre_in_read_model(sender, instance, created, **kwargs):
+    if not created:
+        read_model.refresh(read_model.genre_book_ids(instance))
+
+
+@receiver(pre_delete, sender=Genre)
+def remember_books_of_genre(sender, instance, **kwargs):
+    # Links to the genre are deleted with it, without m2m_changed
+    instance._read_model_books = read_model.genre_book_ids(instance)
+    read_model.touch_books(instance._read_model_books)
+
+
+@receiver(post_delete, sender=Genre)
+def remove_genre_from_read_model(sender, instance, **kwargs):
+    read_model.refresh(instance.__dict__.pop('_read_model_books', []))
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def refresh_read_model_on_genre_change(sender, instance, action, reverse,
+                                       pk_set, **kwargs):
+    # Books of a cleared genre are only known before the clear
+    if reverse and action == 'pre_clear':
+        instance._read_model_books = read_model.genre_book_ids(instance)
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        book_ids = [instance.pk]
+    elif action == 'post_clear':
+        book_ids = instance.__dict__.pop('_read_model_books', [])
+    else:
+        book_ids = pk_set
+
+    read_model.refresh(book_ids)
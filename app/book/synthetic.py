@@ -0,0 +1,205 @@
+import itertools
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from book import availability, read_model
+from core.models import Author, Book, BookInstance, Genre, PublishingHouse
+
+# Synthetic catalogue shaped like a real one: popularity of genres,
+# authors and publishing houses follows Zipf's law, so a few of them
+# have most of the books and the long tail has one or two each.
+# Names are numbered, generating again continues where it stopped.
+
+SYNTHETIC_PASSWORD = 'synthetic-pass'
+SYNTHETIC_EMAIL = 'synthetic-{number}@example.com'
+
+# Titles are made of common words, so searches match many books
+TITLE_WORDS = (
+    'the', 'of', 'night', 'city', 'house', 'war', 'love', 'river', 'dark',
+    'last', 'king', 'queen', 'garden', 'winter', 'summer', 'sea', 'stone',
+    'shadow', 'fire', 'silent', 'lost', 'secret', 'golden', 'road', 'wolf',
+    'island', 'dream', 'forest', 'letter', 'empire', 'star', 'glass',
+    'mountain', 'storm', 'blood', 'crown', 'song', 'time', 'memory', 'iron',
+)
+
+# Share of copies by loan status
+COPY_STATUSES = {'a': 70, 'o': 25, 'r': 5}
+
+
+def synthetic_isbn(number):
+    # Valid ISBN-13 in the 979 range, unique for every number
+    digits = f'979{number:09d}'
+    total = sum(
+        int(digit) * (3 if position % 2 else 1)
+        for position, digit in enumerate(digits)
+    )
+
+    return digits + str((10 - total % 10) % 10)
+
+
+class Zipf:
+    # Draw items, the one of rank k with probability proportional
+    # to 1 / k ** exponent (items are given most popular first)
+
+    def __init__(self, items, exponent, rng):
+        self.items = list(items)
+        self.rng = rng
+        self.cum_weights = list(itertools.accumulate(
+            1 / rank ** exponent for rank in range(1, len(self.items) + 1)
+        ))
+
+    def draw(self):
+        return self.rng.choices(self.items, cum_weights=self.cum_weights)[0]
+
+    def draw_distinct(self, count):
+        drawn = set()
+        while len(drawn) < min(count, len(self.items)):
+            drawn.add(self.draw())
+
+        return drawn
+
+
+def _value(row, field):
+    return row[field] if isinstance(row, dict) else getattr(row, field)
+
+
+def _ensure(model, rows, key):
+    # Ids of the rows in the given order, missing rows are created
+    existing = {
+        key(obj): obj.pk for obj in model.objects.all().iterator()
+    }
+    model.objects.bulk_create(
+        [model(**row) for row in rows if key(row) not in existing],
+        batch_size=1000,
+    )
+    existing = {
+        key(obj): obj.pk for obj in model.objects.all().iterator()
+    }
+
+    return [existing[key(row)] for row in rows]
+
+
+def ensure_catalogue(genres, authors, publishing_houses):
+    # Ids of numbered genres, authors and publishing houses
+    genre_ids = _ensure(
+        Genre, [{'name': f'Genre {i}'} for i in range(genres)],
+        key=lambda row: _value(row, 'name'),
+    )
+    author_ids = _ensure(
+        Author,
+        [
+            {'first_name': 'Author', 'last_name': f'No. {i}'}
+            for i in range(authors)
+        ],
+        key=lambda row: (
+            _value(row, 'first_name'), _value(row, 'last_name')
+        ),
+    )
+    publishing_house_ids = _ensure(
+        PublishingHouse,
+        [{'name': f'Publishing house {i}'} for i in range(publishing_houses)],
+        key=lambda row: _value(row, 'name'),
+    )
+
+    return genre_ids, author_ids, publishing_house_ids
+
+
+def synthetic_users():
+    return get_user_model().objects.filter(
+        email__startswith='synthetic-', email__endswith='@example.com'
+    )
+
+
+def generate_users(users, batch_size=10000):
+    # Create numbered users with tokens until there are this many,
+    # yield number of synthetic users after every batch.
+    # All share one password hash, hashing is slow on purpose.
+    model = get_user_model()
+    password = make_password(SYNTHETIC_PASSWORD)
+    created = synthetic_users().count()
+    while created < users:
+        size = min(batch_size, users - created)
+        with transaction.atomic():
+            batch = model.objects.bulk_create([
+                model(
+                    name='Synthetic',
+                    last_name=f'User {created + i}',
+                    email=SYNTHETIC_EMAIL.format(number=created + i),
+                    password=password,
+                )
+                for i in range(size)
+            ])
+            Token.objects.bulk_create([
+                Token(key=Token.generate_key(), user_id=user.pk)
+                for user in batch
+            ])
+        created += size
+        yield created
+
+
+def generate_books(books, genres=20, authors=1000, publishing_houses=50,
+                   max_copies=3, exponent=1.1, seed=0, batch_size=10000):
+    # Create books until there are this many, yield number of books
+    # after every batch. Books get one to three genres and up to
+    # max_copies copies; copies on loan or reserved belong to
+    # synthetic users, when there are any.
+    genre_ids, author_ids, publishing_house_ids = ensure_catalogue(
+        genres, authors, publishing_houses
+    )
+    user_ids = list(synthetic_users().values_list('pk', flat=True))
+    created = Book.objects.count()
+    # Batches differ even when generating is resumed
+    rng = random.Random(f'{seed}:{created}')
+    genre = Zipf(genre_ids, exponent, rng)
+    author = Zipf(author_ids, exponent, rng)
+    publishing_house = Zipf(publishing_house_ids, exponent, rng)
+    statuses = list(COPY_STATUSES)
+    status_weights = list(COPY_STATUSES.values())
+
+    while created < books:
+        size = min(batch_size, books - created)
+        with transaction.atomic():
+            batch = Book.objects.bulk_create([
+                Book(
+                    name=' '.join(
+                        rng.choices(TITLE_WORDS, k=rng.randint(2, 4))
+                    ).capitalize() + f' {created + i}',
+                    author_id=author.draw(),
+                    publishing_house_id=publishing_house.draw(),
+                    summary=' '.join(rng.choices(TITLE_WORDS, k=30)),
+                    number_of_pages=rng.randint(50, 1000),
+                    isbn=synthetic_isbn(created + i),
+                    year_of_publish=f'{rng.randint(1950, 2022)}-01-01',
+                )
+                for i in range(size)
+            ], batch_size=1000)
+            Book.genre.through.objects.bulk_create([
+                Book.genre.through(book_id=book.pk, genre_id=genre_id)
+                for book in batch
+                for genre_id in genre.draw_distinct(rng.randint(1, 3))
+            ], batch_size=1000)
+            copies = BookInstance.objects.bulk_create([
+                BookInstance(
+                    book_id=book.pk,
+                    status=rng.choices(statuses, status_weights)[0]
+                    if user_ids else 'a',
+                )
+                for book in batch
+                for _ in range(rng.randint(0, max_copies))
+            ], batch_size=1000)
+            BookInstance.user.through.objects.bulk_create([
+                BookInstance.user.through(
+                    bookinstance_id=copy.pk, user_id=rng.choice(user_ids)
+                )
+                for copy in copies if copy.status != 'a'
+            ], batch_size=1000)
+            availability.change_counts(
+                added=[(copy.book_id, copy.status) for copy in copies]
+            )
+            read_model.refresh([book.pk for book in batch])
+        created += size
+        yield created
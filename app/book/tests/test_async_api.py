@@ -0,0 +1,180 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import resolve, reverse
+from django.utils.asyncio import async_unsafe
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from book import cache as catalogue_cache
+from core.asgi import ASGIHandler
+from core.models import Book, BookInstance
+from book.tests.test_book_api import BOOK_URL, BOOK_INSTANCE_URL, \
+    complete_book_obj, detail_url
+
+GENRE_URL = reverse('book:genre-list')
+
+
+@override_settings(ROOT_URLCONF='app.urls_asgi')
+class AsyncReadAPITests(TestCase):
+    # Test read endpoints served by async views of the ASGI application
+
+    def setUp(self):
+        catalogue_cache.get_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            name='TestName',
+            email='async@test.com',
+            password='asyncpass',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.book = complete_book_obj()
+        self.copy = BookInstance.objects.create(book=self.book, status='a')
+
+    async def _request(self, method, url, data=None, headers=None):
+        # Extra arguments of AsyncClient are names of ASGI headers
+        request = getattr(self.async_client, method)
+        kwargs = {'authorization': f'Token {self.token.key}'}
+        kwargs.update(headers or {})
+        if data is not None:
+            kwargs.update(data=data, content_type='application/json')
+
+        return await request(url, **kwargs)
+
+    @sync_to_async
+    def _sync_get(self, url):
+        # Same request to the sync view of app.urls
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with override_settings(ROOT_URLCONF='app.urls'):
+            return client.get(url)
+
+    def test_reads_are_async_views(self):
+        for url in [
+            BOOK_URL,
+            detail_url(self.book.id),
+            GENRE_URL,
+            reverse('book:bookinstance-detail', args=[self.copy.id]),
+        ]:
+            func = resolve(url).func
+            self.assertTrue(asyncio.iscoroutinefunction(func), url)
+
+    def test_other_routes_stay_sync(self):
+        func = resolve(reverse('book:book-export')).func
+
+        self.assertFalse(asyncio.iscoroutinefunction(func))
+
+    async def test_book_list_matches_sync_view(self):
+        res = await self._request('get', BOOK_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        sync_res = await self._sync_get(BOOK_URL)
+        self.assertEqual(res.json(), sync_res.json())
+
+    async def test_book_detail_matches_sync_view(self):
+        url = detail_url(self.book.id)
+
+        res = await self._request('get', url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        sync_res = await self._sync_get(url)
+        self.assertEqual(res.json(), sync_res.json())
+
+    async def test_book_detail_not_modified(self):
+        url = detail_url(self.book.id)
+        etag = (await self._request('get', url))['ETag']
+
+        res = await self._request(
+            'get', url, headers={'if-none-match': etag}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_catalogue_list_is_cached(self):
+        first = await self._request('get', GENRE_URL)
+        second = await self._request('get', GENRE_URL)
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.json(), second.json())
+
+    async def test_book_instance_lookup(self):
+        url = reverse('book:bookinstance-detail', args=[self.copy.id])
+
+        res = await self._request('get', url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['id'], str(self.copy.id))
+
+    async def test_book_instance_filter(self):
+        res = await self._request(
+            'get', f'{BOOK_INSTANCE_URL}?book={self.book.id}'
+        )
+
+        self.assertEqual(
+            [copy['id'] for copy in res.json()['results']],
+            [str(self.copy.id)]
+        )
+
+    async def test_reads_require_authentication(self):
+        res = await self.async_client.get(BOOK_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_write_falls_back_to_sync_view(self):
+        payload = {
+            'name': 'Krew elfow',
+            'number_of_pages': 320,
+            'year_of_publish': '1994-01-01',
+            'summary': 'Saga',
+            'isbn': '978-83-7578-064-2',
+            'author': self.book.author_id,
+            'publishing_house': self.book.publishing_house_id,
+            'genre': [],
+        }
+
+        res = await self._request('post', BOOK_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(await sync_to_async(
+            Book.objects.filter(name='Krew elfow').exists
+        )())
+
+    async def test_delete_falls_back_to_sync_view(self):
+        url = reverse('book:bookinstance-detail', args=[self.copy.id])
+
+        res = await self._request('delete', url)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(
+            await sync_to_async(BookInstance.objects.exists)()
+        )
+
+
+class ASGIHandlerTests(SimpleTestCase):
+    # Test streaming of responses by the ASGI application
+
+    async def test_parts_are_produced_outside_of_event_loop(self):
+        @async_unsafe
+        def part(number):
+            # Fails in the event loop, like a database query
+            return f'{number}\n'
+
+        response = StreamingHttpResponse(part(number) for number in range(3))
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await ASGIHandler().send_response(response, send)
+
+        self.assertEqual(messages[0]['status'], status.HTTP_200_OK)
+        self.assertEqual(
+            b''.join(message.get('body', b'') for message in messages[1:]),
+            b'0\n1\n2\n'
+        )
+        self.assertFalse(messages[-1].get('more_body', False))
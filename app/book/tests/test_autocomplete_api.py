@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from book.tests.test_book_api import sample_author, \
+    sample_publishing_house, sample_book
+
+AUTOCOMPLETE_URL = reverse('book:autocomplete')
+
+
+class PublicAutocompleteAPITests(TestCase):
+    # Test the publicly available autocomplete API
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_login_required(self):
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'sap'})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateAutocompleteAPITests(TestCase):
+    # Test autocomplete of authors and book titles
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            name='TestName',
+            email='autocomplete@test.com',
+            password='autocompletepass',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.sapkowski = sample_author()
+        self.lem = sample_author('Stanislaw', 'Lem')
+        self.book = sample_book(
+            name='Solaris',
+            author=self.lem,
+            publishing_house=sample_publishing_house(),
+        )
+
+    def test_short_term_returns_nothing(self):
+        # Test a single letter does not hit the database
+        with self.assertNumQueries(0):
+            res = self.client.get(AUTOCOMPLETE_URL, {'q': 's'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'authors': [], 'books': []})
+
+    def test_prefix_matches_author_and_book(self):
+        # Test prefix of a name is enough
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'sapk'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [author['id'] for author in res.data['authors']],
+            [self.sapkowski.id]
+        )
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'solar'})
+
+        self.assertEqual(
+            [book['id'] for book in res.data['books']],
+            [self.book.id]
+        )
+
+    def test_misspelled_term(self):
+        # Test misspelled fragment is still matched
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'sapkowsky'})
+
+        self.assertEqual(
+            [author['id'] for author in res.data['authors']],
+            [self.sapkowski.id]
+        )
+
+    @override_settings(AUTOCOMPLETE_MAX_RESULTS=2)
+    def test_results_are_capped(self):
+        # Test limit can not exceed AUTOCOMPLETE_MAX_RESULTS
+        for i in range(4):
+            sample_author('Andrzej', f'Sapkowski{i}')
+
+        res = self.client.get(
+            AUTOCOMPLETE_URL, {'q': 'sapkowski', 'limit': 50}
+        )
+
+        self.assertEqual(len(res.data['authors']), 2)
+
+    def test_response_is_cached(self):
+        # Test repeated keystroke is served from cache
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'Sapk'})
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(AUTOCOMPLETE_URL, {'q': ' sapk '})
+
+        self.assertEqual(cached.data, res.data)
+        self.assertIn('max-age', cached['Cache-Control'])
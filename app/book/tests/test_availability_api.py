@@ -0,0 +1,146 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import BookInstance
+from book.tests.test_book_api import BOOK_URL, BOOK_INSTANCE_URL, \
+    detail_url, sample_author, sample_publishing_house, sample_book
+
+
+def book_instance_url(book_instance_id):
+    return reverse('book:bookinstance-detail', args=[book_instance_id])
+
+
+class BookAvailabilityAPITests(TestCase):
+    # Test copy counters of books
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            name='TestName',
+            email='availability@test.com',
+            password='availabilitypass',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.author = sample_author()
+        self.publishing_house = sample_publishing_house()
+        self.book = self._book('9788375780635')
+
+    def _book(self, isbn):
+        return sample_book(
+            isbn=isbn,
+            author=self.author,
+            publishing_house=self.publishing_house
+        )
+
+    def _counters(self, book=None):
+        res = self.client.get(detail_url((book or self.book).id))
+
+        return [
+            res.data[field] for field in (
+                'copies_total', 'copies_available',
+                'copies_on_loan', 'copies_reserved'
+            )
+        ]
+
+    def test_created_copies_are_counted(self):
+        res = self.client.post(BOOK_INSTANCE_URL, {'book': self.book.id})
+        BookInstance.objects.create(book=self.book, status='r')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._counters(), [2, 1, 0, 1])
+
+    def test_status_change_is_counted(self):
+        copy = BookInstance.objects.create(book=self.book, status='a')
+
+        copy.status = 'o'
+        copy.save()
+
+        self.assertEqual(self._counters(), [1, 0, 1, 0])
+
+    def test_status_is_not_writable(self):
+        # Test copies are lent only by the loan actions, a plain
+        # update could hand out a copy someone else got meanwhile
+        copy = BookInstance.objects.create(book=self.book, status='a')
+
+        res = self.client.patch(
+            book_instance_url(copy.id),
+            {'status': 'o', 'user': [self.user.id]}
+        )
+        created = self.client.post(
+            BOOK_INSTANCE_URL,
+            {'book': self.book.id, 'status': 'o', 'user': [self.user.id]}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], 'a')
+        self.assertEqual(res.data['user'], [])
+        self.assertEqual(created.data['status'], 'a')
+        self.assertEqual(created.data['user'], [])
+        self.assertEqual(self._counters(), [2, 2, 0, 0])
+
+    def test_unchanged_status_is_not_counted_again(self):
+        copy = BookInstance.objects.create(book=self.book, status='a')
+
+        copy.save()
+
+        self.assertEqual(self._counters(), [1, 1, 0, 0])
+
+    def test_moved_copy_is_counted_for_both_books(self):
+        other = self._book('9780000000019')
+        copy = BookInstance.objects.create(book=self.book, status='o')
+
+        copy.book = other
+        copy.status = 'a'
+        copy.save()
+
+        self.assertEqual(self._counters(), [0, 0, 0, 0])
+        self.assertEqual(self._counters(other), [1, 1, 0, 0])
+
+    def test_deleted_copy_is_uncounted(self):
+        copy = BookInstance.objects.create(book=self.book, status='r')
+
+        res = self.client.delete(book_instance_url(copy.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self._counters(), [0, 0, 0, 0])
+
+    def test_filter_by_availability(self):
+        other = self._book('9780000000019')
+        BookInstance.objects.create(book=other, status='a')
+        BookInstance.objects.create(book=self.book, status='o')
+
+        available = self.client.get(BOOK_URL, {'available': 'true'})
+        unavailable = self.client.get(BOOK_URL, {'available': 'false'})
+
+        self.assertEqual(
+            [book['id'] for book in available.data['results']], [other.id]
+        )
+        self.assertEqual(
+            [book['id'] for book in unavailable.data['results']],
+            [self.book.id]
+        )
+
+    def test_order_by_availability(self):
+        books = [self._book(isbn) for isbn in ('9780000000019',
+                                               '9780000000026')]
+        for _ in range(2):
+            BookInstance.objects.create(book=books[0], status='a')
+        BookInstance.objects.create(book=books[1], status='a')
+
+        res = self.client.get(
+            BOOK_URL, {'ordering': '-available', 'page_size': 2}
+        )
+        next_page = self.client.get(res.data['next'])
+
+        self.assertEqual(
+            [book['id'] for book in res.data['results']],
+            [books[0].id, books[1].id]
+        )
+        self.assertEqual(
+            [book['id'] for book in next_page.data['results']],
+            [self.book.id]
+        )
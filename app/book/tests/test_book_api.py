@@ -90,7 +90,7 @@ class PrivateBookAPITest(TestCase):
         serializer = BookSerializer(books, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
 
 class PrivateBookInstanceAPITest(TestCase):
@@ -120,4 +120,4 @@ class PrivateBookInstanceAPITest(TestCase):
         serializer = BookInstanceSerializer(book_instances, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
@@ -0,0 +1,161 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Book
+from book.tests.test_book_api import sample_author, sample_genre, \
+    sample_publishing_house, sample_book
+
+BOOK_BULK_URL = reverse('book:book-bulk')
+
+
+def make_isbn(number):
+    # Return valid ISBN-13 with given number
+    digits = f'978{number:09d}'
+    total = sum(
+        int(digit) * (3 if position % 2 else 1)
+        for position, digit in enumerate(digits)
+    )
+
+    return f'{digits}{(10 - total % 10) % 10}'
+
+
+class BookBulkAPITests(TestCase):
+    # Test bulk upsert of books keyed by isbn
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            name='TestName',
+            email='bulk@test.com',
+            password='bulkpass',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.author = sample_author()
+        self.publishing_house = sample_publishing_house()
+        self.genres = [sample_genre('Fantasy'), sample_genre('Horror')]
+
+    def _payload(self, isbn, **params):
+        payload = {
+            'name': 'Wiedzmin',
+            'author': self.author.id,
+            'publishing_house': self.publishing_house.id,
+            'summary': '*jakies streszczenie*',
+            'number_of_pages': 300,
+            'isbn': isbn,
+            'year_of_publish': '2000-11-11',
+            'genre': [genre.id for genre in self.genres],
+        }
+        payload.update(params)
+
+        return payload
+
+    def test_bulk_create(self):
+        payload = [
+            self._payload('978-83-7578-063-5'),
+            self._payload(make_isbn(1), name='Solaris', genre=[]),
+        ]
+
+        res = self.client.post(BOOK_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 2)
+        book = Book.objects.get(id=res.data['results'][0]['id'])
+        self.assertEqual(book.isbn, '9788375780635')
+        self.assertEqual(
+            sorted(book.genre.values_list('id', flat=True)),
+            sorted(genre.id for genre in self.genres)
+        )
+        self.assertEqual(
+            Book.objects.get(name='Solaris').genre.count(), 0
+        )
+
+    def test_bulk_upsert_existing_isbn(self):
+        # Test book with known isbn is updated in place
+        book = sample_book(
+            author=self.author,
+            publishing_house=self.publishing_house
+        )
+        book.genre.set(self.genres)
+        created_date = book.created_date
+
+        payload = [self._payload(
+            '978 83 7578 063 5',
+            name='Krew elfow',
+            genre=[self.genres[1].id]
+        )]
+        res = self.client.post(BOOK_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.data['updated'], 1)
+        self.assertEqual(res.data['results'][0]['id'], book.id)
+        book.refresh_from_db()
+        self.assertEqual(book.name, 'Krew elfow')
+        self.assertEqual(book.created_date, created_date)
+        self.assertGreater(book.last_modified, created_date)
+        self.assertEqual(list(book.genre.all()), [self.genres[1]])
+        self.assertEqual(Book.objects.count(), 1)
+
+    def test_bulk_per_item_errors(self):
+        # Test invalid items are reported, valid ones are saved
+        payload = [
+            self._payload('978-83-7578-063-5'),
+            self._payload('1234567890'),
+            self._payload(make_isbn(1), author=0),
+            self._payload(make_isbn(2), genre=[0]),
+            self._payload('9788375780635'),
+        ]
+
+        res = self.client.post(BOOK_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        statuses = [result['status'] for result in res.data['results']]
+        self.assertEqual(
+            statuses,
+            ['created', 'error', 'error', 'error', 'error']
+        )
+        self.assertIn('isbn', res.data['results'][1]['errors'])
+        self.assertIn('author', res.data['results'][2]['errors'])
+        self.assertIn('genre', res.data['results'][3]['errors'])
+        self.assertIn('isbn', res.data['results'][4]['errors'])
+        self.assertEqual(Book.objects.count(), 1)
+
+    def test_bulk_queries_do_not_grow(self):
+        # Test relations and isbns are checked with set based queries
+        def run(start, count):
+            payload = [
+                self._payload(make_isbn(i))
+                for i in range(start, start + count)
+            ]
+            with CaptureQueriesContext(connection) as context:
+                res = self.client.post(BOOK_BULK_URL, payload, format='json')
+            self.assertEqual(res.data['created'], count)
+
+            return len(context.captured_queries)
+
+        self.assertEqual(run(0, 2), run(100, 40))
+
+    def test_bulk_requires_list(self):
+        res = self.client.post(
+            BOOK_BULK_URL,
+            self._payload('9788375780635'),
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(BOOK_BULK_MAX_ITEMS=1)
+    def test_bulk_size_limit(self):
+        payload = [
+            self._payload('9788375780635'),
+            self._payload(make_isbn(1)),
+        ]
+
+        res = self.client.post(BOOK_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Book.objects.count(), 0)
@@ -0,0 +1,119 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from book import cache
+from core.models import Author, Genre, PublishingHouse
+
+GENRE_URL = reverse('book:genre-list')
+AUTHOR_URL = reverse('book:author-list')
+PUBLISHING_HOUSE_URL = reverse('book:publishinghouse-list')
+
+
+class CatalogueCacheTests(TestCase):
+    # Test caching of catalogue list responses
+
+    def setUp(self):
+        cache.get_cache().clear()
+        cache.reset_stats()
+        self.user = get_user_model().objects.create_user(
+            name='TestName',
+            email='cache@test.com',
+            password='cachepass',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_is_served_from_cache(self):
+        # Test second request does not touch the database
+        Genre.objects.create(name='Fantasy')
+        res = self.client.get(GENRE_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(GENRE_URL)
+
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached['X-Cache'], 'HIT')
+        self.assertEqual(cached.data, res.data)
+
+    def test_save_invalidates_list(self):
+        # Test creating and renaming rows bumps the version
+        author = Author.objects.create(first_name='Stanislaw', last_name='Lem')
+        self.client.get(AUTHOR_URL)
+
+        author.last_name = 'Tarkowski'
+        with self.captureOnCommitCallbacks(execute=True):
+            author.save()
+        res = self.client.get(AUTHOR_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data[0]['last_name'], 'Tarkowski')
+
+    def test_create_through_api_invalidates_list(self):
+        # Test POST is visible in the next list response
+        self.client.get(PUBLISHING_HOUSE_URL)
+        self.client.post(PUBLISHING_HOUSE_URL, {'name': 'SuperNowa'})
+
+        res = self.client.get(PUBLISHING_HOUSE_URL)
+
+        self.assertEqual([item['name'] for item in res.data], ['SuperNowa'])
+
+    def test_delete_invalidates_list(self):
+        genre = Genre.objects.create(name='Fantasy')
+        self.client.get(GENRE_URL)
+
+        genre.delete()
+        res = self.client.get(GENRE_URL)
+
+        self.assertEqual(res.data, [])
+
+    def test_other_models_are_not_invalidated(self):
+        # Test versions are kept per model
+        Genre.objects.create(name='Fantasy')
+        self.client.get(GENRE_URL)
+
+        PublishingHouse.objects.create(name='SuperNowa')
+        res = self.client.get(GENRE_URL)
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+    def test_hit_and_miss_counters(self):
+        self.client.get(GENRE_URL)
+        self.client.get(GENRE_URL)
+        self.client.get(GENRE_URL)
+
+        stats = cache.get_stats(Genre, Author)
+
+        self.assertEqual(stats['core.genre'], {'hits': 2, 'misses': 1})
+        self.assertEqual(stats['core.author'], {'hits': 0, 'misses': 0})
+
+    def test_counters_do_not_touch_the_cache(self):
+        self.client.get(GENRE_URL)
+        with patch.object(cache.get_cache(), 'incr') as incr, \
+                patch.object(cache.get_cache(), 'add') as add:
+            self.client.get(GENRE_URL)
+
+        incr.assert_not_called()
+        add.assert_not_called()
+
+    def test_counters_are_in_metrics(self):
+        self.client.get(GENRE_URL)
+        self.client.get(GENRE_URL)
+
+        res = self.client.get(reverse('metrics'))
+
+        body = res.content.decode()
+        self.assertIn(
+            'catalogue_cache_requests_total'
+            '{model="core.genre",result="hits"} 1', body
+        )
+        self.assertIn(
+            'catalogue_cache_requests_total'
+            '{model="core.genre",result="misses"} 1', body
+        )
@@ -0,0 +1,190 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from book import cache
+from core.models import Book
+from book.tests.test_book_api import BOOK_URL, detail_url, \
+    complete_book_obj, sample_book, sample_genre, sample_publishing_house
+
+GENRE_URL = reverse('book:genre-list')
+
+
+class ConditionalGetAPITests(TestCase):
+    # Test ETag and Last-Modified handling of book endpoints
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            name='TestName',
+            email='conditional@test.com',
+            password='conditionalpass',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.book = complete_book_obj()
+
+    def test_list_not_modified(self):
+        # Test unchanged list is answered with 304 without serialization
+        res = self.client.get(BOOK_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(BOOK_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    def test_list_modified(self):
+        # Test update and delete of a book change the list ETag
+        etag = self.client.get(BOOK_URL)['ETag']
+
+        self.book.name = 'Krew elfow'
+        self.book.save()
+        res = self.client.get(BOOK_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        etag = res['ETag']
+        Book.objects.all().delete()
+        res = self.client.get(BOOK_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(BOOK_READ_MODEL=False)
+    def test_page_not_modified_before_serialization(self):
+        # Test validators are read from the rows of the page, genres
+        # of the books are not prefetched for a 304
+        etag = self.client.get(BOOK_URL)['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(BOOK_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    @override_settings(BOOK_PAGE_SIZE=1)
+    def test_page_validators(self):
+        # Test changes of rows of other pages keep the ETag of a page,
+        # rows deleted next to it change its links
+        older = self.book
+        newer = sample_book(
+            name='Solaris', isbn='9780000000019',
+            author=older.author, publishing_house=older.publishing_house,
+        )
+        first = self.client.get(BOOK_URL)
+        self.assertEqual(first.data['results'][0]['id'], newer.id)
+
+        older.name = 'Krew elfow'
+        older.save()
+        res = self.client.get(BOOK_URL, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # The first page has no next page anymore
+        older.delete()
+        res = self.client.get(BOOK_URL, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data['next'])
+
+    def test_list_modified_by_genre_change(self):
+        # Test changing genres of a book changes the list ETag
+        etag = self.client.get(BOOK_URL)['ETag']
+
+        self.book.genre.add(sample_genre('Fantasy'))
+        res = self.client.get(BOOK_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_etag_depends_on_query(self):
+        # Test filtered list does not share ETag with the full list
+        etag = self.client.get(BOOK_URL)['ETag']
+
+        res = self.client.get(
+            BOOK_URL,
+            {'author': self.book.author_id},
+            HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_if_modified_since(self):
+        res = self.client.get(detail_url(self.book.id))
+
+        res = self.client.get(
+            detail_url(self.book.id),
+            HTTP_IF_MODIFIED_SINCE=res['Last-Modified']
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        res = self.client.get(
+            detail_url(self.book.id), HTTP_IF_MODIFIED_SINCE=http_date(0)
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_is_not_dated(self):
+        # Test deleting a row, which moves no modification time,
+        # can not be missed by clients sending If-Modified-Since
+        sample_book(
+            name='Solaris', isbn='9780000000019',
+            author=self.book.author,
+            publishing_house=self.book.publishing_house,
+        )
+        res = self.client.get(BOOK_URL)
+        self.assertIn('ETag', res)
+        self.assertNotIn('Last-Modified', res)
+
+        self.book.delete()
+        res = self.client.get(
+            BOOK_URL, HTTP_IF_MODIFIED_SINCE=http_date(2 ** 32)
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_detail_not_modified(self):
+        url = detail_url(self.book.id)
+        res = self.client.get(url)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_modified_by_related_objects(self):
+        # Test nested author and publishing house are validated
+        url = detail_url(self.book.id)
+        etag = self.client.get(url)['ETag']
+
+        self.book.author.last_name = 'Lem'
+        self.book.author.save()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        etag = res['ETag']
+        self.book.publishing_house.name = 'Nowa'
+        self.book.publishing_house.save()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_missing_detail(self):
+        res = self.client.get(detail_url(self.book.id + 1))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', res)
+
+    def test_catalogue_list_not_modified(self):
+        # Test cached catalogue list validators need no queries
+        res = self.client.get(GENRE_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(GENRE_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_publishing_house_has_timestamps(self):
+        publishing_house = sample_publishing_house('Nowa')
+
+        self.assertIsNotNone(publishing_house.created_date)
+        self.assertIsNotNone(publishing_house.last_modified)
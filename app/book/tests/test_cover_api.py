@@ -0,0 +1,263 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from book import covers
+from core.models import CoverImage
+from core.storage import cover_storage
+from book.tests.test_book_api import image_upload_url, detail_url, \
+    complete_book_obj, sample_book
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, COVER_PROCESSING_WORKERS=0)
+class BookCoverAPITests(TestCase):
+    # Test uploading covers and generating their variants
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            name='TestName',
+            email='cover@test.com',
+            password='coverpass',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.book = complete_book_obj()
+
+    def _upload(self, size=(1200, 1800), color='red', book=None):
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', size, color).save(image_file, format='JPEG')
+            image_file.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                return self.client.post(
+                    image_upload_url((book or self.book).id),
+                    {'cover': image_file},
+                    format='multipart'
+                )
+
+    def _other_book(self):
+        return sample_book(
+            isbn='9780000000019',
+            author=self.book.author,
+            publishing_house=self.book.publishing_house
+        )
+
+    def test_upload_returns_before_processing(self):
+        res = self._upload()
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['cover_status'], 'p')
+        self.assertEqual(list(res.data['covers']), ['original'])
+
+    def test_variants_are_generated(self):
+        self._upload()
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.cover_status, 'r')
+        with Image.open(self.book.cover_thumbnail.path) as image:
+            self.assertLessEqual(image.size, (160, 240))
+        with Image.open(self.book.cover_webp.path) as image:
+            self.assertEqual(image.format, 'WEBP')
+            self.assertLessEqual(image.size, (480, 720))
+
+    def test_book_exposes_variant_urls(self):
+        self._upload()
+
+        res = self.client.get(detail_url(self.book.id))
+
+        self.assertEqual(res.data['cover_status'], 'r')
+        self.assertEqual(
+            sorted(res.data['covers']),
+            ['medium', 'original', 'thumbnail', 'webp']
+        )
+        self.assertTrue(res.data['covers']['webp'].endswith('.webp'))
+
+    def test_upload_invalid_image(self):
+        res = self.client.post(
+            image_upload_url(self.book.id),
+            {'cover': 'notimage'},
+            format='multipart'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_broken_file_is_marked_failed(self):
+        self._upload()
+        self.book.refresh_from_db()
+        covers.delete_files(self.book.cover.name)
+        self.book.cover_status = 'p'
+        self.book.save()
+
+        call_command('process_covers', stdout=StringIO())
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.cover_status, 'f')
+
+    def test_process_pending_covers_command(self):
+        self._upload()
+        self.book.refresh_from_db()
+        self.book.cover_status = 'p'
+        self.book.cover_thumbnail = None
+        self.book.save()
+
+        out = StringIO()
+        call_command('process_covers', stdout=out)
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.cover_status, 'r')
+        self.assertTrue(os.path.exists(self.book.cover_thumbnail.path))
+        self.assertIn('1 covers processed', out.getvalue())
+
+    def test_cover_is_named_by_content(self):
+        self._upload()
+
+        self.book.refresh_from_db()
+        with open(self.book.cover.path, 'rb') as cover:
+            digest = hashlib.sha256(cover.read()).hexdigest()
+        self.assertEqual(
+            self.book.cover.name,
+            f'upload/cover/{digest[:2]}/{digest}.jpg'
+        )
+
+    def test_identical_covers_are_stored_once(self):
+        other = self._other_book()
+        self._upload()
+        self._upload(book=other)
+
+        self.book.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(other.cover.name, self.book.cover.name)
+        self.assertEqual(other.cover_webp.name, self.book.cover_webp.name)
+        self.assertEqual(other.cover_status, 'r')
+        image = CoverImage.objects.get()
+        self.assertEqual(image.name, self.book.cover.name)
+        self.assertEqual(image.ref_count, 2)
+        stored = os.listdir(os.path.dirname(self.book.cover.path))
+        self.assertEqual(stored, [os.path.basename(self.book.cover.name)])
+
+    def test_replaced_cover_is_released(self):
+        self._upload()
+        self.book.refresh_from_db()
+        old_name = self.book.cover.name
+
+        self._upload(color='blue')
+
+        self.book.refresh_from_db()
+        self.assertNotEqual(self.book.cover.name, old_name)
+        self.assertEqual(CoverImage.objects.get(name=old_name).ref_count, 0)
+        self.assertEqual(
+            CoverImage.objects.get(name=self.book.cover.name).ref_count, 1
+        )
+
+    def test_deleted_book_releases_cover(self):
+        self._upload()
+        self.book.refresh_from_db()
+
+        self.client.delete(detail_url(self.book.id))
+
+        self.assertEqual(
+            CoverImage.objects.get(name=self.book.cover.name).ref_count, 0
+        )
+
+    def _age_images(self):
+        aged = timezone.now() - timedelta(days=2)
+        CoverImage.objects.update(last_modified=aged)
+        for name in CoverImage.objects.values_list('name', flat=True):
+            os.utime(
+                cover_storage.path(name),
+                (aged.timestamp(), aged.timestamp())
+            )
+
+    def test_collect_unreferenced_covers(self):
+        self._upload()
+        self.book.refresh_from_db()
+        self.book.delete()
+        self._age_images()
+
+        out = StringIO()
+        call_command('collect_covers', stdout=out)
+
+        self.assertFalse(CoverImage.objects.exists())
+        self.assertFalse(cover_storage.exists(self.book.cover.name))
+        self.assertFalse(os.path.exists(self.book.cover_thumbnail.path))
+        self.assertIn('1 cover images deleted', out.getvalue())
+
+    def test_collect_keeps_recently_released_covers(self):
+        self._upload()
+        self.book.refresh_from_db()
+        self.book.delete()
+
+        call_command('collect_covers', stdout=StringIO())
+
+        self.assertTrue(cover_storage.exists(self.book.cover.name))
+
+    def test_collect_keeps_referenced_covers(self):
+        # Test wrong counts are corrected instead of deleting the image
+        self._upload()
+        self.book.refresh_from_db()
+        CoverImage.objects.update(ref_count=0)
+        self._age_images()
+
+        call_command('collect_covers', stdout=StringIO())
+
+        self.assertTrue(cover_storage.exists(self.book.cover.name))
+        self.assertEqual(CoverImage.objects.get().ref_count, 1)
+
+    def test_identical_upload_touches_cover(self):
+        self._upload()
+        self.book.refresh_from_db()
+        self._age_images()
+
+        self._upload(book=self._other_book())
+
+        since = (timezone.now() - timedelta(minutes=1)).timestamp()
+        self.assertTrue(cover_storage.saved_since(self.book.cover.name, since))
+
+    def test_collect_keeps_covers_saved_again(self):
+        # Test a file an identical upload reused after its row was
+        # released is kept, the row stays for a later run
+        self._upload()
+        self.book.refresh_from_db()
+        self.book.delete()
+        self._age_images()
+        os.utime(cover_storage.path(self.book.cover.name))
+
+        out = StringIO()
+        call_command('collect_covers', stdout=out)
+
+        self.assertTrue(cover_storage.exists(self.book.cover.name))
+        self.assertTrue(os.path.exists(self.book.cover_thumbnail.path))
+        self.assertEqual(CoverImage.objects.get().ref_count, 0)
+        self.assertIn('0 cover images deleted', out.getvalue())
+
+    def test_delete_unused_keeps_files_saved_since(self):
+        self._upload()
+        self.book.refresh_from_db()
+        name = self.book.cover.name
+        since = timezone.now().timestamp() - 60
+
+        self.assertFalse(cover_storage.delete_unused(name, since))
+        self.assertTrue(cover_storage.exists(name))
+        self.assertTrue(cover_storage.delete_unused(name, since + 3600))
+        self.assertFalse(cover_storage.exists(name))
+        self.assertEqual(
+            os.listdir(os.path.dirname(cover_storage.path(name))), []
+        )
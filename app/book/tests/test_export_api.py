@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import BookInstance
+from book.tests.test_book_api import sample_author, sample_genre, \
+    sample_publishing_house, sample_book
+
+BOOK_EXPORT_URL = reverse('book:book-export')
+BOOK_INSTANCE_EXPORT_URL = reverse('book:bookinstance-export')
+
+
+class ExportAPITests(TestCase):
+    # Test streaming export of books and book copies
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            name='TestName',
+            email='export@test.com',
+            password='exportpass',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.genres = [sample_genre('Fantasy'), sample_genre('Horror')]
+        self.author = sample_author()
+        self.other_author = sample_author('Stanislaw', 'Lem')
+        self.publishing_house = sample_publishing_house()
+        self.books = []
+        for i in range(5):
+            book = sample_book(
+                name=f'Book {i}',
+                isbn=f'978-83-{i:07d}',
+                author=self.author if i % 2 else self.other_author,
+                publishing_house=self.publishing_house,
+            )
+            book.genre.set(self.genres[:i % 3])
+            BookInstance.objects.create(book=book, status='a')
+            self.books.append(book)
+
+    def _content(self, res):
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return b''.join(res.streaming_content).decode()
+
+    def test_export_books_ndjson(self):
+        res = self.client.get(BOOK_EXPORT_URL)
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self._content(res).splitlines()]
+        self.assertEqual(
+            [row['id'] for row in rows],
+            [book.id for book in reversed(self.books)]
+        )
+        self.assertEqual(rows[0]['author_last_name'], 'Lem')
+        self.assertEqual(rows[0]['publishing_house'], 'SuperNowa')
+        self.assertEqual(rows[0]['genres'], ['Fantasy'])
+
+    def test_export_books_csv(self):
+        res = self.client.get(BOOK_EXPORT_URL, {'export_format': 'csv'})
+
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(self._content(res))))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[2]['genres'], 'Fantasy|Horror')
+
+    def test_export_lists_genres_by_primary_key(self):
+        # Test genres come in the order of the serializers,
+        # not in whatever order the database returns them
+        self.books[2].genre.add(sample_genre('Adventure'))
+
+        res = self.client.get(BOOK_EXPORT_URL, {'export_format': 'csv'})
+
+        rows = list(csv.DictReader(io.StringIO(self._content(res))))
+        self.assertEqual(rows[2]['genres'], 'Fantasy|Horror|Adventure')
+
+    def test_export_honours_filters(self):
+        res = self.client.get(BOOK_EXPORT_URL, {'author': self.author.id})
+
+        rows = [json.loads(line) for line in self._content(res).splitlines()]
+        self.assertEqual(
+            [row['id'] for row in rows],
+            [self.books[3].id, self.books[1].id]
+        )
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_export_prefetches_per_chunk(self):
+        # Test genres are loaded with one query per chunk of books
+        res = self.client.get(BOOK_EXPORT_URL)
+
+        with self.assertNumQueries(4):
+            self._content(res)
+
+    def test_export_book_instances(self):
+        res = self.client.get(
+            BOOK_INSTANCE_EXPORT_URL,
+            {'book': self.books[0].id, 'export_format': 'csv'}
+        )
+
+        rows = list(csv.DictReader(io.StringIO(self._content(res))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['name'], 'Book 0')
+        self.assertEqual(rows[0]['status'], 'a')
+
+    def test_export_empty_csv_has_header(self):
+        res = self.client.get(
+            BOOK_EXPORT_URL,
+            {'export_format': 'csv', 'author': 999999}
+        )
+
+        self.assertTrue(self._content(res).startswith('id,isbn,name'))
+
+    def test_export_invalid_format(self):
+        res = self.client.get(BOOK_EXPORT_URL, {'export_format': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
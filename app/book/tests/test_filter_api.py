@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import BookInstance
+from book.tests.test_book_api import BOOK_URL, BOOK_INSTANCE_URL, \
+    sample_author, sample_genre, sample_publishing_house, sample_book
+
+
+class MultiValueFilterAPITests(TestCase):
+    # Test filtering books and book copies by lists of ids
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            name='TestName',
+            email='filter@test.com',
+            password='filterpass',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.fantasy = sample_genre('Fantasy')
+        self.horror = sample_genre('Horror')
+        self.author = sample_author()
+        self.other_author = sample_author('Stanislaw', 'Lem')
+        self.publishing_house = sample_publishing_house()
+        self.other_house = sample_publishing_house('Znak')
+        self.both = sample_book(
+            isbn='9788375780635',
+            author=self.author,
+            publishing_house=self.publishing_house
+        )
+        self.both.genre.set([self.fantasy, self.horror])
+        self.fantasy_only = sample_book(
+            isbn='9780000000019',
+            author=self.other_author,
+            publishing_house=self.other_house
+        )
+        self.fantasy_only.genre.set([self.fantasy])
+
+    def _ids(self, res):
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [item['id'] for item in res.data['results']]
+
+    def test_any_genre_has_no_duplicates(self):
+        res = self.client.get(
+            BOOK_URL, {'genre': f'{self.fantasy.id},{self.horror.id}'}
+        )
+
+        self.assertEqual(
+            self._ids(res), [self.fantasy_only.id, self.both.id]
+        )
+
+    def test_all_genres(self):
+        res = self.client.get(BOOK_URL, {
+            'genre': f'{self.fantasy.id},{self.horror.id}',
+            'genre_mode': 'all',
+        })
+
+        self.assertEqual(self._ids(res), [self.both.id])
+
+    def test_filter_by_publishing_house(self):
+        res = self.client.get(
+            BOOK_URL, {'publishing_house': self.other_house.id}
+        )
+
+        self.assertEqual(self._ids(res), [self.fantasy_only.id])
+
+    def test_invalid_ids(self):
+        for value in ('abc', '1,,2', '-1', '0'):
+            res = self.client.get(BOOK_URL, {'genre': value})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('genre', res.data)
+
+    def test_invalid_mode(self):
+        res = self.client.get(
+            BOOK_URL, {'genre': self.fantasy.id, 'genre_mode': 'some'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(FILTER_MAX_IDS=2)
+    def test_too_many_ids(self):
+        res = self.client.get(BOOK_URL, {'author': '1,2,3'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_book_copies(self):
+        copy = BookInstance.objects.create(book=self.both)
+        copy.user.add(self.user)
+        other_copy = BookInstance.objects.create(book=self.fantasy_only)
+
+        by_house = self.client.get(
+            BOOK_INSTANCE_URL, {'publishing_house': self.other_house.id}
+        )
+        by_author = self.client.get(
+            BOOK_INSTANCE_URL, {'author': self.author.id}
+        )
+        by_user = self.client.get(BOOK_INSTANCE_URL, {'user': self.user.id})
+
+        self.assertEqual(self._ids(by_house), [str(other_copy.id)])
+        self.assertEqual(self._ids(by_author), [str(copy.id)])
+        self.assertEqual(self._ids(by_user), [str(copy.id)])
@@ -0,0 +1,178 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import BookInstance, Hold
+from book.tests.test_loan_api import BORROW_URL, RESERVE_URL, \
+    RETURN_URL, sample_user, complete_book
+
+HOLD_URL = reverse('book:hold-list')
+
+
+def hold_url(hold_id):
+    return reverse('book:hold-detail', args=[hold_id])
+
+
+class HoldAPITests(TestCase):
+    # Test queues of users waiting for a book
+
+    def setUp(self):
+        self.book = complete_book()
+        self.clients = []
+        for i in range(3):
+            client = APIClient()
+            client.force_authenticate(sample_user(f'hold{i}@test.com'))
+            self.clients.append(client)
+
+    def _enqueue(self, i):
+        return self.clients[i].post(HOLD_URL, {'book': self.book.id})
+
+    def _lend_only_copy(self):
+        # First client borrows the only copy, others queue for it
+        copy = BookInstance.objects.create(book=self.book, status='a')
+        self.clients[0].post(BORROW_URL, {'book': self.book.id})
+
+        return copy
+
+    def test_enqueue(self):
+        self._lend_only_copy()
+
+        first = self._enqueue(1)
+        second = self._enqueue(2)
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(first.data['status'], 'w')
+        self.assertEqual(first.data['position'], 1)
+        self.assertEqual(second.data['position'], 2)
+
+    def test_enqueue_twice(self):
+        first = self._enqueue(1)
+
+        res = self._enqueue(1)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], first.data['id'])
+        self.assertEqual(Hold.objects.count(), 1)
+
+    def test_enqueue_available_book(self):
+        copy = BookInstance.objects.create(book=self.book, status='a')
+
+        res = self._enqueue(1)
+
+        self.assertEqual(res.data['status'], 'r')
+        self.assertEqual(res.data['copy'], copy.id)
+        self.assertIsNone(res.data['position'])
+
+    def test_returned_copy_goes_to_head_of_queue(self):
+        copy = self._lend_only_copy()
+        first = self._enqueue(1)
+        second = self._enqueue(2)
+
+        self.clients[0].post(RETURN_URL, {'book': self.book.id})
+
+        res = self.clients[1].get(hold_url(first.data['id']))
+        self.assertEqual(res.data['status'], 'r')
+        self.assertEqual(res.data['copy'], copy.id)
+        res = self.clients[2].get(hold_url(second.data['id']))
+        self.assertEqual(res.data['position'], 1)
+        copy.refresh_from_db()
+        self.assertEqual(copy.status, 'r')
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.copies_reserved, 1)
+        self.assertEqual(self.book.copies_available, 0)
+
+    def test_borrow_ready_hold(self):
+        copy = self._lend_only_copy()
+        hold = self._enqueue(1)
+        self.clients[0].post(RETURN_URL, {'book': self.book.id})
+
+        res = self.clients[1].post(BORROW_URL, {'book': self.book.id})
+
+        self.assertEqual(res.data['id'], str(copy.id))
+        self.assertEqual(Hold.objects.get(pk=hold.data['id']).status, 'f')
+
+    def test_queue_is_not_jumped(self):
+        # Test copies available while users wait go to the head of the
+        # queue only, e.g. ones added before allocate_holds ran
+        self._lend_only_copy()
+        hold = self._enqueue(1)
+        copy = BookInstance.objects.create(book=self.book, status='a')
+
+        for url in (BORROW_URL, RESERVE_URL):
+            res = self.clients[2].post(url, {'book': self.book.id})
+            self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+        res = self.clients[1].post(BORROW_URL, {'book': self.book.id})
+
+        self.assertEqual(res.data['id'], str(copy.id))
+        hold = Hold.objects.get(pk=hold.data['id'])
+        self.assertEqual(hold.status, 'f')
+        self.assertEqual(hold.copy, copy)
+
+    def test_head_of_queue_reserves(self):
+        self._lend_only_copy()
+        hold = self._enqueue(1)
+        self._enqueue(2)
+        copy = BookInstance.objects.create(book=self.book, status='a')
+
+        res = self.clients[1].post(RESERVE_URL, {'book': self.book.id})
+
+        self.assertEqual(res.data['id'], str(copy.id))
+        res = self.clients[1].get(hold_url(hold.data['id']))
+        self.assertEqual(res.data['status'], 'r')
+        self.assertEqual(res.data['copy'], copy.id)
+
+    def test_cancel_ready_hold_passes_copy_on(self):
+        copy = self._lend_only_copy()
+        first = self._enqueue(1)
+        second = self._enqueue(2)
+        self.clients[0].post(RETURN_URL, {'book': self.book.id})
+
+        res = self.clients[1].delete(hold_url(first.data['id']))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(Hold.objects.get(pk=first.data['id']).status, 'c')
+        res = self.clients[2].get(hold_url(second.data['id']))
+        self.assertEqual(res.data['status'], 'r')
+        copy.refresh_from_db()
+        self.assertEqual(
+            [user.email for user in copy.user.all()], ['hold2@test.com']
+        )
+
+    def test_cancel_waiting_hold_moves_queue(self):
+        self._lend_only_copy()
+        first = self._enqueue(1)
+        second = self._enqueue(2)
+
+        self.clients[1].delete(hold_url(first.data['id']))
+
+        res = self.clients[2].get(hold_url(second.data['id']))
+        self.assertEqual(res.data['position'], 1)
+
+    def test_holds_of_other_users_are_hidden(self):
+        hold = self._enqueue(1)
+
+        res = self.clients[2].get(hold_url(hold.data['id']))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_allocate_holds_command(self):
+        holds = [self._enqueue(i).data['id'] for i in range(3)]
+        for _ in range(2):
+            BookInstance.objects.create(book=self.book, status='a')
+
+        out = StringIO()
+        call_command('allocate_holds', '--batch-size=1', stdout=out)
+
+        self.assertEqual(
+            [Hold.objects.get(pk=pk).status for pk in holds],
+            ['r', 'r', 'w']
+        )
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.copies_reserved, 2)
+        self.assertIn('2 copies allocated', out.getvalue())
@@ -0,0 +1,212 @@
+import threading
+from collections import Counter
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Book, BookInstance, Hold
+from book.tests.test_book_api import sample_author, \
+    sample_publishing_house, sample_book
+
+BORROW_URL = reverse('book:bookinstance-borrow')
+RESERVE_URL = reverse('book:bookinstance-reserve')
+RETURN_URL = reverse('book:bookinstance-return')
+
+
+def sample_user(email='loan@test.com'):
+    return get_user_model().objects.create_user(
+        name='TestName',
+        email=email,
+        password='loanpass',
+    )
+
+
+def complete_book():
+    return sample_book(
+        author=sample_author(),
+        publishing_house=sample_publishing_house()
+    )
+
+
+def run_concurrently(target, count):
+    # Call target(i) from count threads started at the same moment,
+    # return results in order of threads
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def run(i):
+        try:
+            barrier.wait()
+            results[i] = target(i)
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=run, args=(i,)) for i in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return results
+
+
+class LoanAPITests(TestCase):
+    # Test borrowing, reserving and returning copies of a book
+
+    def setUp(self):
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.book = complete_book()
+
+    def test_borrow_any_available_copy(self):
+        BookInstance.objects.create(book=self.book, status='o')
+        copy = BookInstance.objects.create(book=self.book, status='a')
+
+        res = self.client.post(BORROW_URL, {'book': self.book.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], str(copy.id))
+        copy.refresh_from_db()
+        self.assertEqual(copy.status, 'o')
+        self.assertEqual(list(copy.user.all()), [self.user])
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.copies_available, 0)
+        self.assertEqual(self.book.copies_on_loan, 2)
+
+    def test_borrow_unavailable_book(self):
+        BookInstance.objects.create(book=self.book, status='r')
+
+        res = self.client.post(BORROW_URL, {'book': self.book.id})
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+    def test_borrow_invalid_book(self):
+        res = self.client.post(BORROW_URL, {'book': 0})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_borrow_reserved_copy(self):
+        reserved = BookInstance.objects.create(book=self.book, status='a')
+        self.client.post(RESERVE_URL, {'book': self.book.id})
+        BookInstance.objects.create(book=self.book, status='a')
+
+        res = self.client.post(BORROW_URL, {'book': self.book.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], str(reserved.id))
+        self.book.refresh_from_db()
+        self.assertEqual(
+            [self.book.copies_available, self.book.copies_on_loan,
+             self.book.copies_reserved],
+            [1, 1, 0]
+        )
+
+    def test_reserve(self):
+        copy = BookInstance.objects.create(book=self.book, status='a')
+
+        res = self.client.post(RESERVE_URL, {'book': self.book.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        copy.refresh_from_db()
+        self.assertEqual(copy.status, 'r')
+        self.assertEqual(
+            self.client.post(RESERVE_URL, {'book': self.book.id}).status_code,
+            status.HTTP_409_CONFLICT
+        )
+
+    def test_return(self):
+        BookInstance.objects.create(book=self.book, status='a')
+        self.client.post(BORROW_URL, {'book': self.book.id})
+
+        res = self.client.post(RETURN_URL, {'book': self.book.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], 'a')
+        self.assertEqual(res.data['user'], [])
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.copies_available, 1)
+
+    def test_return_copy_lent_to_other_user(self):
+        copy = BookInstance.objects.create(book=self.book, status='o')
+        copy.user.add(sample_user('other@test.com'))
+
+        res = self.client.post(RETURN_URL, {'book': self.book.id})
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+
+@skipUnless(
+    connection.features.has_select_for_update_skip_locked,
+    'Database does not support SELECT ... FOR UPDATE SKIP LOCKED'
+)
+class ConcurrentLoanTests(TransactionTestCase):
+    # Hammer a single book from many threads at once
+
+    copies = 5
+    borrowers = 25
+
+    def setUp(self):
+        self.book = complete_book()
+        for _ in range(self.copies):
+            BookInstance.objects.create(book=self.book, status='a')
+        self.users = [
+            sample_user(f'loan{i}@test.com') for i in range(self.borrowers)
+        ]
+
+    def _borrow(self, i):
+        client = APIClient()
+        client.force_authenticate(self.users[i])
+
+        return client.post(BORROW_URL, {'book': self.book.id})
+
+    def test_copy_is_never_lent_twice(self):
+        responses = run_concurrently(self._borrow, self.borrowers)
+
+        codes = Counter(res.status_code for res in responses)
+        self.assertEqual(codes, {
+            status.HTTP_200_OK: self.copies,
+            status.HTTP_409_CONFLICT: self.borrowers - self.copies,
+        })
+        lent = [
+            res.data['id'] for res in responses
+            if res.status_code == status.HTTP_200_OK
+        ]
+        self.assertEqual(len(set(lent)), self.copies)
+        for copy in BookInstance.objects.prefetch_related('user'):
+            self.assertEqual(copy.status, 'o')
+            self.assertEqual(len(copy.user.all()), 1)
+        book = Book.objects.get(pk=self.book.pk)
+        self.assertEqual(book.copies_available, 0)
+        self.assertEqual(book.copies_on_loan, self.copies)
+
+    def test_returned_copies_reach_the_queue(self):
+        # Test copies returned while other users join the queue are
+        # never left available to nobody
+        for i in range(self.copies):
+            self._borrow(i)
+
+        def return_or_enqueue(i):
+            client = APIClient()
+            client.force_authenticate(self.users[i])
+            if i < self.copies:
+                return client.post(RETURN_URL, {'book': self.book.id})
+
+            return client.post(
+                reverse('book:hold-list'), {'book': self.book.id}
+            )
+
+        run_concurrently(return_or_enqueue, self.copies * 2)
+
+        book = Book.objects.get(pk=self.book.pk)
+        self.assertEqual(book.copies_available, 0)
+        self.assertEqual(book.copies_reserved, self.copies)
+        self.assertEqual(Hold.objects.filter(status='r').count(), self.copies)
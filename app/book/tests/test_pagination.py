@@ -0,0 +1,140 @@
+import base64
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Book, BookInstance
+from book.tests.test_book_api import BOOK_URL, BOOK_INSTANCE_URL, \
+    sample_author, sample_publishing_house, sample_book
+
+
+def create_books(count, author, publishing_house, start=0):
+    # Create a number of books with unique isbn
+    return [
+        sample_book(
+            name=f'Book {i}',
+            isbn=f'978-83-{i:07d}',
+            author=author,
+            publishing_house=publishing_house,
+        )
+        for i in range(start, start + count)
+    ]
+
+
+@override_settings(BOOK_PAGE_SIZE=3, BOOK_MAX_PAGE_SIZE=5)
+class BookPaginationTests(TestCase):
+    # Test keyset pagination of books and book copies
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            name='TestName',
+            email='page@test.com',
+            password='pagepass',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.author = sample_author()
+        self.publishing_house = sample_publishing_house()
+
+    def _collect_ids(self, url, params=None):
+        # Walk through all pages and return seen ids
+        ids = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in res.data['results'])
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        return ids
+
+    def test_book_list_is_paginated(self):
+        # Test book list is split into pages ordered by -id
+        books = create_books(7, self.author, self.publishing_house)
+
+        res = self.client.get(BOOK_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 3)
+        self.assertIsNotNone(res.data['next'])
+        self.assertIsNone(res.data['previous'])
+        self.assertEqual(
+            self._collect_ids(BOOK_URL),
+            sorted((book.id for book in books), reverse=True)
+        )
+
+    def test_page_size_is_capped(self):
+        # Test client can not request more than BOOK_MAX_PAGE_SIZE rows
+        create_books(7, self.author, self.publishing_house)
+
+        res = self.client.get(BOOK_URL, {'page_size': 1000})
+
+        self.assertEqual(len(res.data['results']), 5)
+
+    def test_insert_between_pages_is_stable(self):
+        # Test rows created while paginating are neither repeated
+        # nor shift already existing rows between pages
+        books = create_books(6, self.author, self.publishing_house)
+
+        res = self.client.get(BOOK_URL)
+        ids = [item['id'] for item in res.data['results']]
+        create_books(2, self.author, self.publishing_house, start=100)
+        res = self.client.get(res.data['next'])
+        ids.extend(item['id'] for item in res.data['results'])
+
+        self.assertEqual(
+            ids,
+            sorted((book.id for book in books), reverse=True)
+        )
+
+    def test_invalid_cursor(self):
+        # Test tampered cursor is rejected
+        res = self.client.get(BOOK_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_order_by_availability_walks_equal_counts(self):
+        # Test pages of books with the same number of available copies
+        # start after the last (copies_available, id), without offsets
+        books = create_books(8, self.author, self.publishing_house)
+        for book in books[:2]:
+            BookInstance.objects.create(book=book, status='a')
+        params = {'ordering': '-available'}
+        expected = [book.id for book in books[1::-1]] + \
+            [book.id for book in books[:1:-1]]
+
+        self.assertEqual(self._collect_ids(BOOK_URL, params), expected)
+
+        res = self.client.get(BOOK_URL, params)
+        while res.data['next']:
+            cursor = parse_qs(urlparse(res.data['next']).query)['cursor'][0]
+            tokens = parse_qs(base64.b64decode(cursor).decode())
+            self.assertNotIn('o', tokens)
+            res = self.client.get(res.data['next'])
+        # Back to the first page with previous links
+        ids = []
+        while True:
+            ids[:0] = [item['id'] for item in res.data['results']]
+            if not res.data['previous']:
+                break
+            res = self.client.get(res.data['previous'])
+        self.assertEqual(ids, expected)
+
+    def test_book_instance_list_is_paginated(self):
+        # Test every book copy is returned exactly once
+        book = create_books(1, self.author, self.publishing_house)[0]
+        instances = [BookInstance.objects.create(book=book) for _ in range(7)]
+
+        ids = self._collect_ids(BOOK_INSTANCE_URL)
+
+        self.assertEqual(len(ids), 7)
+        self.assertEqual(
+            sorted(ids),
+            sorted(str(instance.id) for instance in instances)
+        )
+        self.assertEqual(Book.objects.count(), 1)
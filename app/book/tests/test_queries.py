@@ -0,0 +1,124 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import BookInstance
+from book.tests.test_book_api import BOOK_URL, BOOK_INSTANCE_URL, \
+    detail_url, sample_author, sample_genre, sample_publishing_house, \
+    sample_book
+
+
+class BookQueryCountTests(TestCase):
+    # Test number of queries does not depend on number of rows
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            name='TestName',
+            email='queries@test.com',
+            password='queriespass',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.genres = [sample_genre(f'Genre {i}') for i in range(3)]
+        self.books = []
+
+    def _create_books(self, count):
+        # Create books, each with its own author, publisher and genres
+        start = len(self.books)
+        for i in range(start, start + count):
+            book = sample_book(
+                name=f'Book {i}',
+                isbn=f'978-83-{i:07d}',
+                author=sample_author(last_name=f'Author {i}'),
+                publishing_house=sample_publishing_house(f'House {i}'),
+            )
+            book.genre.set(self.genres)
+            copy = BookInstance.objects.create(book=book)
+            copy.user.set([self.user])
+            self.books.append(book)
+
+    def _assert_constant_queries(self, num, url, params=None):
+        # Run request on a small and on a bigger data set
+        for count in (2, 10):
+            self._create_books(count)
+            with self.assertNumQueries(num):
+                res = self.client.get(url, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_book_list(self):
+        # Book list: rows of the read model, validators of the page
+        # are read from them
+        self._assert_constant_queries(1, BOOK_URL)
+
+    def test_book_list_filtered_by_genre(self):
+        self._assert_constant_queries(
+            1, BOOK_URL, {'genre': self.genres[0].id}
+        )
+
+    def test_book_list_filtered_by_author(self):
+        self._create_books(1)
+        self._assert_constant_queries(
+            1, BOOK_URL, {'author': self.books[0].author_id}
+        )
+
+    def test_book_retrieve(self):
+        # Book detail: the row of the read model holding author,
+        # publisher and genres, validators are read from it
+        self._create_books(1)
+        self._assert_constant_queries(1, detail_url(self.books[0].id))
+
+    @override_settings(BOOK_READ_MODEL=False)
+    def test_book_list_without_read_model(self):
+        # Book list read from books: books joined with author
+        # and publisher, then one query for all genres
+        self._assert_constant_queries(2, BOOK_URL)
+
+    @override_settings(BOOK_READ_MODEL=False)
+    def test_book_list_filtered_by_genre_without_read_model(self):
+        self._assert_constant_queries(
+            2, BOOK_URL, {'genre': self.genres[0].id}
+        )
+
+    @override_settings(BOOK_READ_MODEL=False)
+    def test_book_list_filtered_by_author_without_read_model(self):
+        self._create_books(1)
+        self._assert_constant_queries(
+            2, BOOK_URL, {'author': self.books[0].author_id}
+        )
+
+    @override_settings(BOOK_READ_MODEL=False)
+    def test_book_retrieve_without_read_model(self):
+        # Book detail read from books: validators, book joined with
+        # author and publisher, then genres
+        self._create_books(1)
+        self._assert_constant_queries(3, detail_url(self.books[0].id))
+
+    def test_book_search(self):
+        # Searches always read books, like lists without the read model
+        self._assert_constant_queries(2, BOOK_URL, {'search': 'Book'})
+
+    def test_book_retrieve_nested_data(self):
+        # Test detail serializer still returns nested objects
+        self._create_books(1)
+        book = self.books[0]
+
+        res = self.client.get(detail_url(book.id))
+
+        self.assertEqual(res.data['author']['id'], book.author_id)
+        self.assertEqual(
+            res.data['publishing_house']['id'],
+            book.publishing_house_id
+        )
+        self.assertEqual(len(res.data['genre']), len(self.genres))
+
+    def test_book_instance_list(self):
+        # Book copies: copies and one query for all users
+        self._assert_constant_queries(2, BOOK_INSTANCE_URL)
+
+    def test_book_instance_list_filtered_by_book(self):
+        self._create_books(1)
+        self._assert_constant_queries(
+            2, BOOK_INSTANCE_URL, {'book': self.books[0].id}
+        )
@@ -0,0 +1,184 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from book import bulk, covers
+from book.synthetic import synthetic_isbn
+from book.tests.test_book_api import BOOK_URL, detail_url
+from core.models import Author, Book, BookInstance, BookReadModel, \
+    Genre, PublishingHouse
+
+
+@override_settings(BOOK_PAGE_SIZE=4)
+class BookReadModelTests(TestCase):
+    # Test lists and details read from the read model are the same
+    # as read from books, and changes of their sources are applied
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            name='TestName', email='read@test.com', password='readpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.genres = [
+            Genre.objects.create(name=f'Genre {i}') for i in range(3)
+        ]
+        self.authors = [
+            Author.objects.create(first_name='Author', last_name=str(i))
+            for i in range(2)
+        ]
+        self.publishing_house = PublishingHouse.objects.create(name='Nowa')
+        self.books = []
+        for i in range(6):
+            book = Book.objects.create(
+                name=f'Book {i}',
+                author=self.authors[i % 2],
+                publishing_house=self.publishing_house,
+                summary='Summary' * i,
+                number_of_pages=100 + i,
+                isbn=synthetic_isbn(i),
+                year_of_publish=f'{1990 + i}-02-03',
+            )
+            # Genres are added in reverse order of their ids
+            book.genre.set(reversed(self.genres[:i % 4]))
+            for _ in range(i % 3):
+                BookInstance.objects.create(book=book)
+            self.books.append(book)
+
+    def _get(self, url, params=None):
+        # Response read from the read model, the same as read from books
+        with override_settings(BOOK_READ_MODEL=False):
+            from_books = self.client.get(url, params)
+        res = self.client.get(url, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, from_books.content)
+
+        return res
+
+    def test_lists_are_the_same(self):
+        genre = self.genres[0]
+        for params in (
+            None,
+            {'genre': f'{genre.id},{self.genres[1].id}', 'genre_mode': 'all'},
+            {'author': self.authors[0].id},
+            {'publishing_house': self.publishing_house.id},
+            {'available': 'true', 'ordering': '-available'},
+            {'fields': 'id,genre,covers'},
+            {'exclude': 'summary'},
+        ):
+            res = self._get(BOOK_URL, params)
+            if res.data['next']:
+                self._get(res.data['next'])
+
+    def test_details_are_the_same(self):
+        for book in self.books:
+            res = self._get(detail_url(book.id))
+
+        self._get(detail_url(book.id), {'fields': 'id,author,genre'})
+        self.assertEqual(
+            [genre['id'] for genre in res.data['genre']],
+            sorted(genre.id for genre in self.genres[:1])
+        )
+
+    def test_book_changes(self):
+        book = self.books[0]
+        book.name = 'Krew elfow'
+        book.save()
+        book.genre.add(*self.genres)
+        BookInstance.objects.create(book=book, status='o')
+
+        res = self._get(detail_url(book.id))
+
+        self.assertEqual(res.data['name'], 'Krew elfow')
+        self.assertEqual(len(res.data['genre']), 3)
+        self.assertEqual(res.data['copies_on_loan'], 1)
+
+        book.delete()
+        self.assertFalse(BookReadModel.objects.filter(pk=book.pk).exists())
+
+    def test_relation_changes(self):
+        author = self.authors[1]
+        author.last_name = 'Lem'
+        author.save()
+        self.publishing_house.name = 'SuperNowa'
+        self.publishing_house.save()
+        genre = self.genres[0]
+        genre.name = 'Fantasy'
+        genre.save()
+
+        res = self._get(detail_url(self.books[1].id))
+
+        self.assertEqual(res.data['author']['last_name'], 'Lem')
+        self.assertEqual(res.data['publishing_house']['name'], 'SuperNowa')
+        self.assertEqual(res.data['genre'][0]['name'], 'Fantasy')
+        self._get(BOOK_URL, {'author': author.id})
+
+    def test_genre_links_changed_from_the_genre(self):
+        genre = self.genres[1]
+        genre.books.remove(self.books[2])
+        self.genres[2].books.clear()
+        self.genres[2].books.add(self.books[0])
+
+        self._get(BOOK_URL, {'page_size': 10})
+
+        genre.delete()
+        res = self._get(BOOK_URL, {'page_size': 10})
+        self.assertNotIn(
+            genre.pk,
+            [pk for book in res.data['results'] for pk in book['genre']]
+        )
+
+    def test_genre_deletion_changes_etag(self):
+        url = detail_url(self.books[1].id)
+        etag = self.client.get(url)['ETag']
+
+        self.genres[0].delete()
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['genre'], [])
+
+    def test_set_based_writes(self):
+        bulk.upsert_books([{
+            'isbn': synthetic_isbn(0), 'name': 'Updated',
+            'author_id': self.authors[1].id,
+            'publishing_house_id': self.publishing_house.id,
+            'summary': '', 'number_of_pages': 1,
+            'year_of_publish': '2000-01-01', 'genre': [self.genres[2].id],
+        }], 100)
+        Book.objects.filter(pk=self.books[1].pk).update(
+            cover='upload/cover/ab/abc.jpg'
+        )
+        covers._save_result(
+            self.books[1].pk, 'upload/cover/ab/abc.jpg', None
+        )
+
+        res = self._get(BOOK_URL, {'page_size': 10})
+
+        self.assertEqual(res.data['results'][-1]['name'], 'Updated')
+        self.assertEqual(res.data['results'][-2]['cover_status'], 'f')
+
+    def test_rebuild_command(self):
+        # Changes made with raw SQL are applied by the rebuild
+        Book.objects.filter(pk=self.books[0].pk).update(name='Raw')
+        BookReadModel.objects.filter(pk=self.books[1].pk).delete()
+        BookReadModel.objects.create(
+            id=self.books[-1].pk + 100, name='Orphan',
+            author_id=self.authors[0].pk,
+            publishing_house_id=self.publishing_house.pk,
+            summary='', number_of_pages=1, isbn='',
+            year_of_publish='2000-01-01',
+        )
+
+        out = StringIO()
+        call_command('rebuild_read_model', '--batch-size=4', stdout=out)
+
+        self.assertIn('6 books refreshed', out.getvalue())
+        self.assertEqual(BookReadModel.objects.count(), 6)
+        res = self._get(BOOK_URL, {'page_size': 10})
+        self.assertEqual(res.data['results'][-1]['name'], 'Raw')
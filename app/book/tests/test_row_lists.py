@@ -0,0 +1,128 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from book import read_model, rows, serializers
+from book.synthetic import synthetic_isbn
+from core.models import Author, Book, BookInstance, Genre, PublishingHouse
+
+BOOK_URL = reverse('book:book-list')
+BOOK_INSTANCE_URL = reverse('book:bookinstance-list')
+GENRE_URL = reverse('book:genre-list')
+AUTHOR_URL = reverse('book:author-list')
+PUBLISHING_HOUSE_URL = reverse('book:publishinghouse-list')
+
+
+@override_settings(BOOK_PAGE_SIZE=4)
+class RowListTests(TestCase):
+    # Test lists read as rows are the same as serialized model instances
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            name='TestName', email='rows@test.com', password='rowspass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        other = get_user_model().objects.create_user(
+            name='Other', email='other@test.com', password='otherpass'
+        )
+        genres = [Genre.objects.create(name=f'Genre {i}') for i in range(3)]
+        authors = [
+            Author.objects.create(first_name='Author', last_name=str(i))
+            for i in range(2)
+        ]
+        publishing_house = PublishingHouse.objects.create(name='SuperNowa')
+        for i in range(6):
+            book = Book.objects.create(
+                name=f'Book {i}',
+                author=authors[i % 2],
+                publishing_house=publishing_house,
+                summary='Summary' * i,
+                number_of_pages=100 + i,
+                isbn=synthetic_isbn(i),
+                year_of_publish=f'{1990 + i}-02-03',
+            )
+            book.genre.set(genres[:i % 4])
+            for copy_status in 'aor'[:i % 4]:
+                copy = BookInstance.objects.create(
+                    book=book, status=copy_status
+                )
+                if copy_status != 'a':
+                    copy.user.set([self.user, other])
+        # Covers, one of them with generated variants
+        Book.objects.filter(name='Book 1').update(
+            cover='upload/cover/ab/abc.jpg', cover_status='p'
+        )
+        Book.objects.filter(name='Book 2').update(
+            cover='upload/cover/cd/cde.jpg', cover_status='r',
+            cover_thumbnail='upload/cover/thumbnail/cd/cde.jpg',
+            cover_medium='upload/cover/medium/cd/cde.jpg',
+            cover_webp='upload/cover/webp/cd/cde.webp',
+        )
+        read_model.refresh(Book.objects.values_list('pk', flat=True))
+
+    def _get(self, url, params=None):
+        # Response as rows and as serialized model instances
+        caches['catalogue'].clear()
+        as_rows = self.client.get(url, params)
+        caches['catalogue'].clear()
+        with patch('book.mixins.compile_rows', return_value=None):
+            serialized = self.client.get(url, params)
+
+        self.assertEqual(as_rows.status_code, status.HTTP_200_OK)
+        self.assertEqual(as_rows.content, serialized.content)
+
+        return as_rows
+
+    def test_book_list(self):
+        res = self._get(BOOK_URL)
+
+        self.assertEqual(len(res.data['results']), 4)
+        self._get(res.data['next'])
+
+    def test_book_list_filtered_and_ordered(self):
+        genre = Genre.objects.get(name='Genre 0')
+
+        self._get(BOOK_URL, {'genre': genre.id, 'available': 'true'})
+        self._get(BOOK_URL, {'ordering': 'available'})
+
+    def test_book_list_covers(self):
+        res = self._get(BOOK_URL, {'page_size': 10})
+
+        covers = {
+            book['name']: book['covers'] for book in res.data['results']
+        }
+        self.assertEqual(covers['Book 0'], {})
+        self.assertEqual(list(covers['Book 1']), ['original'])
+        self.assertEqual(
+            list(covers['Book 2']),
+            ['original', 'thumbnail', 'medium', 'webp']
+        )
+
+    def test_book_instance_list(self):
+        res = self._get(BOOK_INSTANCE_URL, {'page_size': 10})
+
+        self.assertEqual(len(res.data['results']), 7)
+
+    def test_catalogue_lists(self):
+        for url in (GENRE_URL, AUTHOR_URL, PUBLISHING_HOUSE_URL):
+            self._get(url)
+
+    def test_book_list_queries(self):
+        self.client.get(BOOK_URL)
+
+        # Page of the read model, validators are read from its rows
+        with self.assertNumQueries(1):
+            self.client.get(BOOK_URL)
+
+    def test_nested_serializers_are_not_compiled(self):
+        self.assertIsNone(
+            rows.compile_rows(serializers.BookDetailSerializer())
+        )
+        self.assertIsNone(rows.compile_rows(serializers.HoldSerializer()))
+        self.assertIsNotNone(rows.compile_rows(serializers.BookSerializer()))
@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from book.tests.test_book_api import BOOK_URL, sample_author, \
+    sample_publishing_house, sample_book
+
+
+class BookSearchAPITests(TestCase):
+    # Test full-text search of books
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            name='TestName',
+            email='search@test.com',
+            password='searchpass',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.publishing_house = sample_publishing_house()
+        self.author = sample_author()
+        self.other_author = sample_author('Stanislaw', 'Lem')
+
+    def _book(self, name, isbn, author=None, summary='Streszczenie'):
+        return sample_book(
+            name=name,
+            isbn=isbn,
+            summary=summary,
+            author=author or self.author,
+            publishing_house=self.publishing_house,
+        )
+
+    def _search(self, params):
+        res = self.client.get(BOOK_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [item['id'] for item in res.data['results']]
+
+    def test_search_by_name_and_summary(self):
+        # Test both name and summary are searched
+        by_name = self._book('Solaris', '9788308049126')
+        by_summary = self._book(
+            'Inna', '9788308049127', summary='Podroz na planete Solaris'
+        )
+        self._book('Wiedzmin', '9788308049128')
+
+        ids = self._search({'search': 'solaris'})
+
+        self.assertEqual(sorted(ids), sorted([by_name.id, by_summary.id]))
+
+    def test_search_ranked_by_relevance(self):
+        # Test name matches are ranked above summary matches
+        by_summary = self._book(
+            'Inna', '9788308049127', summary='Podroz na planete Solaris'
+        )
+        by_name = self._book('Solaris', '9788308049126')
+
+        ids = self._search({'search': 'solaris'})
+
+        self.assertEqual(ids, [by_name.id, by_summary.id])
+
+    def test_search_by_author_name(self):
+        # Test author name is part of the search document
+        book = self._book('Solaris', '9788308049126', self.other_author)
+        self._book('Wiedzmin', '9788308049128')
+
+        self.assertEqual(self._search({'search': 'lem'}), [book.id])
+
+    def test_search_follows_author_rename(self):
+        # Test renaming the author refreshes search vector of the books
+        book = self._book('Solaris', '9788308049126', self.other_author)
+        self.other_author.last_name = 'Tarkowski'
+        self.other_author.save()
+
+        self.assertEqual(self._search({'search': 'lem'}), [])
+        self.assertEqual(self._search({'search': 'tarkowski'}), [book.id])
+
+    def test_search_with_author_filter(self):
+        # Test search is combined with other filters
+        self._book('Solaris', '9788308049126', self.other_author)
+        book = self._book('Solaris', '9788308049127')
+
+        ids = self._search({'search': 'solaris', 'author': self.author.id})
+
+        self.assertEqual(ids, [book.id])
+
+    @override_settings(BOOK_PAGE_SIZE=2, BOOK_SEARCH_MAX_RESULTS=3)
+    def test_search_pagination(self):
+        # Test search results are paginated up to the results limit
+        for i in range(5):
+            self._book(f'Solaris {i}', f'978830804912{i}')
+
+        res = self.client.get(BOOK_URL, {'search': 'solaris'})
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNone(res.data['previous'])
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertIsNone(res.data['next'])
+
+        res = self.client.get(BOOK_URL, {'search': 'solaris', 'page': 3})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
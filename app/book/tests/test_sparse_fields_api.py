@@ -0,0 +1,125 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from book.synthetic import synthetic_isbn
+from core.models import Author, Book, Genre, PublishingHouse
+
+BOOK_URL = reverse('book:book-list')
+
+
+def detail_url(book_id):
+    return reverse('book:book-detail', args=[book_id])
+
+
+@override_settings(BOOK_PAGE_SIZE=2)
+class SparseFieldsAPITests(TestCase):
+    # Test '?fields=' and '?exclude=' of books
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            name='TestName', email='sparse@test.com', password='sparsepass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        genre = Genre.objects.create(name='Fantasy')
+        author = Author.objects.create(
+            first_name='Andrzej', last_name='Sapkowski'
+        )
+        publishing_house = PublishingHouse.objects.create(name='SuperNowa')
+        self.books = []
+        for i in range(3):
+            book = Book.objects.create(
+                name=f'Book {i}', author=author,
+                publishing_house=publishing_house, summary='Long summary',
+                number_of_pages=100, isbn=synthetic_isbn(i),
+                year_of_publish='2000-01-01',
+            )
+            book.genre.add(genre)
+            self.books.append(book)
+
+    def _get(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, params)
+
+        return res, ' '.join(query['sql'] for query in queries)
+
+    def test_list_fields(self):
+        res, sql = self._get(BOOK_URL, {'fields': 'id,name,author'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for book in res.data['results']:
+            self.assertEqual(list(book), ['id', 'name', 'author'])
+        self.assertNotIn('summary', sql)
+        self.assertNotIn('core_genre', sql)
+
+    def test_list_exclude(self):
+        res, sql = self._get(BOOK_URL, {'exclude': 'summary,genre'})
+
+        book = res.data['results'][0]
+        self.assertNotIn('summary', book)
+        self.assertNotIn('genre', book)
+        self.assertIn('covers', book)
+        self.assertNotIn('summary', sql)
+        self.assertNotIn('core_genre', sql)
+
+    def test_list_of_model_instances(self):
+        params = {'fields': 'id,name,covers,genre'}
+        res = self.client.get(BOOK_URL, params)
+        with patch('book.mixins.compile_rows', return_value=None):
+            serialized, sql = self._get(BOOK_URL, params)
+
+        self.assertEqual(res.content, serialized.content)
+        self.assertNotIn('summary', sql)
+
+    def test_pages_of_other_orderings(self):
+        params = {'fields': 'id,name', 'ordering': 'available'}
+        res = self.client.get(BOOK_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        with patch('book.mixins.compile_rows', return_value=None), \
+                self.assertNumQueries(1):
+            serialized = self.client.get(res.data['next'])
+        self.assertEqual(len(serialized.data['results']), 1)
+
+    def test_detail_fields(self):
+        res, sql = self._get(
+            detail_url(self.books[0].id), {'fields': 'id,name'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'id': self.books[0].id, 'name': 'Book 0'})
+        # Validators join all relations, the book is read alone
+        book_sql = sql.rsplit('SELECT', 1)[1]
+        self.assertNotIn('core_author', book_sql)
+        self.assertNotIn('summary', book_sql)
+
+    def test_detail_nested_fields(self):
+        res = self.client.get(
+            detail_url(self.books[0].id), {'fields': 'id,author'}
+        )
+
+        self.assertEqual(res.data['author']['last_name'], 'Sapkowski')
+        self.assertEqual(list(res.data), ['id', 'author'])
+
+    def test_unknown_fields(self):
+        res = self.client.get(BOOK_URL, {'fields': 'id,password'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', res.data)
+
+    def test_writes_use_all_fields(self):
+        book = self.books[0]
+
+        res = self.client.patch(
+            f'{detail_url(book.id)}?fields=id', {'name': 'New name'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('summary', res.data)
@@ -8,9 +8,15 @@ router.register('author', views.AuthorViewSet)
 router.register('publihouse', views.PublishingHouseViewSet)
 router.register('book', views.BookViewSet)
 router.register('book-instance', views.BookInstanceViewSet)
+router.register('hold', views.HoldViewSet)
 
 app_name = 'book'
 
 urlpatterns = [
+    path(
+        'autocomplete/',
+        views.AutocompleteView.as_view(),
+        name='autocomplete'
+    ),
     path('', include(router.urls))
 ]
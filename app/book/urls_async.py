@@ -0,0 +1,15 @@
+from book import urls, views
+from book.async_views import async_patterns
+
+# Routes of book.urls, reads of the catalogue, books and book copies
+# are served by async views (see book.async_views)
+
+app_name = urls.app_name
+
+urlpatterns = async_patterns(urls.urlpatterns, {
+    views.GenreViewSet: ('list',),
+    views.AuthorViewSet: ('list',),
+    views.PublishingHouseViewSet: ('list',),
+    views.BookViewSet: ('list', 'retrieve'),
+    views.BookInstanceViewSet: ('list', 'retrieve'),
+})
@@ -1,24 +1,52 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, \
+    TrigramWordSimilarity
+from django.core.cache import cache
+from django.db import connections, router, transaction, OperationalError
+from django.db.models import Count, F, Max, Prefetch, Q
+from django.db.models.functions import Greatest
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control
+from django.utils.translation import gettext_lazy as _
 
 from core.models import Book, Author, Genre, PublishingHouse, \
-    BookInstance
-from book import serializers
+    BookInstance, BookReadModel, Hold
+from book import bulk, covers, loans, serializers
+from book.filters import MultiValueFilterBackend
+from book.mixins import CachedListMixin, ConditionalGetMixin, \
+    ExportMixin, RowListMixin, SparseFieldsMixin
+from book.pagination import BookPagination, BookInstancePagination, \
+    KeysetPagination, SearchPagination
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from user.authentication import CachedTokenAuthentication
 
 
-class BaseBookAttrViewSet(viewsets.GenericViewSet,
+class BaseBookAttrViewSet(ConditionalGetMixin,
+                          CachedListMixin,
+                          RowListMixin,
+                          viewsets.GenericViewSet,
                           mixins.ListModelMixin,
                           mixins.CreateModelMixin):
 
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    # Safe requests read from a replica (see core.routers)
+    replica_reads = True
 
     def get_queryset(self):
-        return self.queryset
+        # Fresh queryset, the class attribute would cache its results
+        return self.queryset.all()
+
+    def get_list_validators(self):
+        # Validators change only together with model version
+        return self.get_cached('validators', super().get_list_validators)
 
     def perform_create(self, serializer):
         serializer.save()
@@ -42,43 +70,139 @@ class PublishingHouseViewSet(BaseBookAttrViewSet):
     serializer_class = serializers.PublishingHouseSerializer
 
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(ConditionalGetMixin, SparseFieldsMixin, RowListMixin,
+                  ExportMixin, viewsets.ModelViewSet):
     # Manage books in db
     serializer_class = serializers.BookSerializer
     queryset = Book.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    replica_reads = True
+    pagination_class = BookPagination
+    # Columns of the orderings and of validators of pages
+    pagination_columns = ('id', 'copies_available', 'last_modified')
+    export_fields = ('id', 'isbn', 'name', 'summary',
+                     'number_of_pages', 'year_of_publish',
+                     'author_first_name', 'author_last_name',
+                     'publishing_house', 'genres')
+    # Genres in primary key order, like the serializers list them
+    export_prefetch = (
+        Prefetch('genre', queryset=Genre.objects.order_by('pk')),
+    )
+    export_filename = 'books'
+    filter_backends = (MultiValueFilterBackend,)
+    multi_value_filters = {
+        'genre': 'genre',
+        'author': 'author',
+        'publishing_house': 'publishing_house',
+    }
+
+    # Text search configuration, has to match the one used by
+    # the search vector trigger (core migration 0006)
+    search_config = 'simple'
+
+    @property
+    def paginator(self):
+        # Search results are ordered by rank instead of id
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get('search'):
+                self._paginator = SearchPagination()
+            else:
+                self._paginator = self.pagination_class()
+
+        return self._paginator
+
+    def uses_read_model(self):
+        # Lists and details are read from the read model of books (see
+        # book.read_model), searches need the search vector of books
+        return settings.BOOK_READ_MODEL and \
+            self.action in ('list', 'retrieve') and \
+            not self.request.query_params.get('search')
+
+    def validates_object(self):
+        # Modifications of relations are part of last_modified
+        # of the read model, its row is all the detail needs
+        return self.uses_read_model()
+
+    def get_detail_validators(self):
+        # Detail nests author, publishing house and genres,
+        # any of them being modified changes the response
+        return Book.objects.filter(pk=self.kwargs['pk']).aggregate(
+            last_modified=Max('last_modified'),
+            author_last_modified=Max('author__last_modified'),
+            publishing_house_last_modified=Max(
+                'publishing_house__last_modified'
+            ),
+            genre_last_modified=Max('genre__last_modified'),
+            genre_count=Count('genre'),
+        )
 
-    def _params_to_ints(self, qs):
-        # convert list of ids to a list of int
-        return [int(str_id) for str_id in qs.split(',')]
-
-    def get_queryset(self):
-        # Retrieve books for the auth user
-        genre = self.request.query_params.get('genre')
-        author = self.request.query_params.get('author')
-        publi_house = self.request.query_params.get('publishing_house')
+    def get_export_queryset(self):
+        return super().get_export_queryset().select_related(
+            'author', 'publishing_house'
+        )
 
-        queryset = self.queryset
+    def get_export_row(self, book):
+        # Names instead of ids, columns match import_catalogue
+        return {
+            'id': book.id,
+            'isbn': book.isbn,
+            'name': book.name,
+            'summary': book.summary,
+            'number_of_pages': book.number_of_pages,
+            'year_of_publish': book.year_of_publish,
+            'author_first_name': book.author.first_name,
+            'author_last_name': book.author.last_name,
+            'publishing_house': book.publishing_house.name,
+            'genres': [genre.name for genre in book.genre.all()],
+        }
+
+    def _search(self, queryset, search):
+        # Match books against the indexed search vector, best first
+        query = SearchQuery(
+            search,
+            search_type='websearch',
+            config=self.search_config
+        )
 
-        if genre:
-            genre_ids = self._params_to_ints(genre)
-            queryset = queryset.filter(genre__id__in=genre_ids)
-        if author:
-            author_ids = self._params_to_ints(author)
-            queryset = queryset.filter(author__id__in=author_ids)
-        if publi_house:
-            publi_house_ids = self._params_to_ints(publi_house)
-            queryset = queryset.filter(publi_house__id__in=publi_house_ids)
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', '-id')
 
-        return queryset
+    def get_queryset(self):
+        # Retrieve books for the auth user, filters
+        # by ids are applied by MultiValueFilterBackend
+        search = self.request.query_params.get('search')
+        available = self.request.query_params.get('available')
+
+        if self.uses_read_model():
+            queryset = BookReadModel.objects.all()
+        else:
+            queryset = self.queryset
+
+        # Counters of copies are stored on the book, nothing is aggregated
+        if available == 'true':
+            queryset = queryset.filter(copies_available__gt=0)
+        elif available == 'false':
+            queryset = queryset.filter(copies_available=0)
+        if search:
+            queryset = self._search(queryset, search)
+
+        # Relations and columns required by serializer of the action
+        return self.get_sparse_queryset(queryset)
 
     def get_serializer_class(self):
         # Return appropirate serializer class
-        if self.action == 'retrieve':
+        if self.uses_read_model():
+            if self.action == 'retrieve':
+                return serializers.BookDetailReadModelSerializer
+            return serializers.BookReadModelSerializer
+        elif self.action == 'retrieve':
             return serializers.BookDetailSerializer
         elif self.action == 'upload_image':
             return serializers.BookImageSerializer
+        elif self.action == 'bulk':
+            return serializers.BookBulkSerializer
 
         return self.serializer_class
 
@@ -86,9 +210,87 @@ class BookViewSet(viewsets.ModelViewSet):
         # Create new book
         serializer.save()
 
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        # Create or update many books at once, isbn is the key
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {'detail': _('Expected a list of books.')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > settings.BOOK_BULK_MAX_ITEMS:
+            return Response(
+                {'detail': _('Ensure this list has no more than '
+                             '{max} books.').format(
+                    max=settings.BOOK_BULK_MAX_ITEMS
+                )},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = [None] * len(items)
+        serializer = self.get_serializer()
+        rows = []
+        positions = []
+        seen_isbns = set()
+        for position, item in enumerate(items):
+            try:
+                row = serializer.run_validation(item)
+            except ValidationError as exc:
+                results[position] = {'status': 'error', 'errors': exc.detail}
+                continue
+
+            isbn = bulk.clean_isbn(row['isbn'])
+            if isbn in seen_isbns:
+                results[position] = {
+                    'status': 'error',
+                    'errors': {'isbn': [_('Duplicated isbn in request.')]}
+                }
+                continue
+            seen_isbns.add(isbn)
+            rows.append(row)
+            positions.append(position)
+
+        errors = bulk.relation_errors(rows)
+        for row_position, row_errors in errors.items():
+            results[positions[row_position]] = {
+                'status': 'error',
+                'errors': row_errors
+            }
+        valid = [
+            (position, row)
+            for row_position, (position, row)
+            in enumerate(zip(positions, rows))
+            if row_position not in errors
+        ]
+
+        upserted = bulk.upsert_books(
+            [row for position, row in valid],
+            settings.BOOK_BULK_BATCH_SIZE
+        )
+        for (position, row), (book, created) in zip(valid, upserted):
+            results[position] = {
+                'status': 'created' if created else 'updated',
+                'id': book.pk,
+                'isbn': book.isbn,
+            }
+
+        statuses = [result['status'] for result in results]
+        return Response(
+            {
+                'created': statuses.count('created'),
+                'updated': statuses.count('updated'),
+                'errors': statuses.count('error'),
+                'results': results,
+            },
+            status=status.HTTP_200_OK if valid or not items
+            else status.HTTP_400_BAD_REQUEST
+        )
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
-        # Upload an image to book cover
+        # Upload an image to book cover, variants of the cover
+        # are generated in the background
         book = self.get_object()
         serializer = self.get_serializer(
             book,
@@ -96,11 +298,12 @@ class BookViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
-            serializer.save()
+            book = serializer.save()
+            transaction.on_commit(lambda: covers.schedule(book))
 
             return Response(
                 serializer.data,
-                status=status.HTTP_200_OK
+                status=status.HTTP_202_ACCEPTED
             )
 
         return Response(
@@ -109,40 +312,42 @@ class BookViewSet(viewsets.ModelViewSet):
         )
 
 
-class BookInstanceViewSet(viewsets.ModelViewSet):
+class BookInstanceViewSet(RowListMixin, ExportMixin, viewsets.ModelViewSet):
     # Manage book instances in db
     serializer_class = serializers.BookInstanceSerializer
     queryset = BookInstance.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
-
-    def _params_to_ints(self, qs):
-        # convert list of ids to a list of int
-        return [int(str_id) for str_id in qs.split(',')]
+    replica_reads = True
+    pagination_class = BookInstancePagination
+    export_fields = ('id', 'book', 'isbn', 'name', 'status')
+    export_filename = 'book_instances'
+    filter_backends = (MultiValueFilterBackend,)
+    multi_value_filters = {
+        'book': 'book',
+        'user': 'user',
+        'author': 'book__author',
+        'publishing_house': 'book__publishing_house',
+    }
 
     def get_queryset(self):
-        # Retrieve books for the auth user
-        book = self.request.query_params.get('book')
-        user = self.request.query_params.get('user')
-        author = self.request.query_params.get('author')
-        publi_house = self.request.query_params.get('publishing_house')
-
-        queryset = self.queryset
-
-        if book:
-            book_ids = self._params_to_ints(book)
-            queryset = queryset.filter(book__id__in=book_ids)
-        if author:
-            author_ids = self._params_to_ints(author)
-            queryset = queryset.filter(author__id__in=author_ids)
-        if publi_house:
-            publi_house_ids = self._params_to_ints(publi_house)
-            queryset = queryset.filter(publi_house__id__in=publi_house_ids)
-        if user:
-            user_ids = self._params_to_ints(user)
-            queryset = queryset.filter(user__id__in=user_ids)
-
-        return queryset
+        # Retrieve book copies, filters by ids
+        # are applied by MultiValueFilterBackend
+        return self.get_serializer_class().setup_eager_loading(
+            self.queryset.all()
+        )
+
+    def get_export_queryset(self):
+        return super().get_export_queryset().select_related('book')
+
+    def get_export_row(self, book_instance):
+        return {
+            'id': book_instance.id,
+            'book': book_instance.book_id,
+            'isbn': book_instance.book.isbn,
+            'name': book_instance.book.name,
+            'status': book_instance.status,
+        }
 
     def get_serializer_class(self):
         # Return appropirate serializer class
@@ -151,11 +356,60 @@ class BookInstanceViewSet(viewsets.ModelViewSet):
         return self.serializer_class
 
     def perform_create(self, serializer):
-        # Create new book copy
-        serializer.save()
+        # Create new book copy, availability counters
+        # of its book are updated in the same transaction
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
 
-    # def perform_update(self, serializer):
-    #     serializer.save()
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+
+    def _loan(self, request, lend, error):
+        # Run a loan operation on any suitable copy of the requested book
+        serializer = serializers.LoanSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        copy = lend(serializer.validated_data['book'], request.user)
+        if copy is None:
+            return Response(
+                {'detail': error},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        return Response(
+            self.get_serializer(copy).data,
+            status=status.HTTP_200_OK
+        )
+
+    @action(methods=['POST'], detail=False, url_path='borrow')
+    def borrow(self, request):
+        # Borrow the reserved or any available copy of a book
+        return self._loan(
+            request, loans.borrow,
+            _('No copy of the book is available.')
+        )
+
+    @action(methods=['POST'], detail=False, url_path='reserve')
+    def reserve(self, request):
+        # Reserve any available copy of a book
+        return self._loan(
+            request, loans.reserve,
+            _('No copy of the book is available.')
+        )
+
+    @action(methods=['POST'], detail=False, url_path='return',
+            url_name='return')
+    def return_copy(self, request):
+        # Return a borrowed copy of a book
+        return self._loan(
+            request, loans.return_copy,
+            _('No copy of the book is lent to you.')
+        )
 
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
@@ -178,3 +432,119 @@ class BookInstanceViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+
+class HoldViewSet(viewsets.GenericViewSet,
+                  mixins.ListModelMixin,
+                  mixins.RetrieveModelMixin,
+                  mixins.CreateModelMixin,
+                  mixins.DestroyModelMixin):
+    # Queue for books of the authenticated user
+    serializer_class = serializers.HoldSerializer
+    queryset = Hold.objects.all()
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    replica_reads = True
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        # Holds of the user, with positions of waiting ones
+        return loans.with_positions(
+            self.queryset.filter(user=self.request.user)
+        )
+
+    def create(self, request, *args, **kwargs):
+        # Join the queue for a book, joining twice returns the same hold
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        hold, created = loans.enqueue(
+            serializer.validated_data['book'], request.user
+        )
+
+        return Response(
+            self.get_serializer(self.get_queryset().get(pk=hold.pk)).data,
+            status=status.HTTP_201_CREATED if created
+            else status.HTTP_200_OK
+        )
+
+    def perform_destroy(self, instance):
+        # Hold is cancelled, not deleted
+        loans.cancel(instance)
+
+
+class AutocompleteView(APIView):
+    # Search-as-you-type suggestions of authors and book titles.
+    # Matching uses trigram word similarity, so prefixes and misspelled
+    # fragments are found through the trigram indexes.
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    replica_reads = True
+
+    def _get_limit(self):
+        # Number of suggestions of each kind, capped by settings
+        try:
+            limit = int(self.request.query_params.get(
+                'limit', settings.AUTOCOMPLETE_DEFAULT_RESULTS
+            ))
+        except ValueError:
+            limit = settings.AUTOCOMPLETE_DEFAULT_RESULTS
+
+        return max(1, min(limit, settings.AUTOCOMPLETE_MAX_RESULTS))
+
+    def _get_suggestions(self, term, limit):
+        # Query both tables within the latency budget. The transaction
+        # of the timeout is opened on the database chosen for reads,
+        # reads inside one on the primary would never reach a replica.
+        alias = router.db_for_read(Book)
+        authors = Author.objects.using(alias).filter(
+            Q(first_name__trigram_word_similar=term) |
+            Q(last_name__trigram_word_similar=term)
+        ).annotate(
+            similarity=Greatest(
+                TrigramWordSimilarity(term, 'first_name'),
+                TrigramWordSimilarity(term, 'last_name'),
+            )
+        ).order_by(
+            '-similarity', 'last_name', 'first_name'
+        ).values('id', 'first_name', 'last_name')[:limit]
+        books = Book.objects.using(alias).filter(
+            name__trigram_word_similar=term
+        ).annotate(
+            similarity=TrigramWordSimilarity(term, 'name')
+        ).order_by('-similarity', '-id').values('id', 'name')[:limit]
+
+        with transaction.atomic(using=alias):
+            with connections[alias].cursor() as cursor:
+                cursor.execute(
+                    'SET LOCAL statement_timeout = %s',
+                    [settings.AUTOCOMPLETE_TIMEOUT_MS]
+                )
+
+            return {'authors': list(authors), 'books': list(books)}
+
+    def get(self, request):
+        term = ' '.join(request.query_params.get('q', '').split()).lower()
+        if len(term) < settings.AUTOCOMPLETE_MIN_LENGTH:
+            return Response({'authors': [], 'books': []})
+
+        limit = self._get_limit()
+        digest = hashlib.md5(term.encode()).hexdigest()
+        cache_key = f'book:autocomplete:{limit}:{digest}'
+        data = cache.get(cache_key)
+        if data is None:
+            try:
+                data = self._get_suggestions(term, limit)
+            except OperationalError:
+                # Latency budget exceeded, next keystroke will try again
+                return Response({'authors': [], 'books': []})
+            cache.set(cache_key, data, settings.AUTOCOMPLETE_CACHE_TIMEOUT)
+
+        response = Response(data)
+        patch_cache_control(
+            response,
+            private=True,
+            max_age=settings.AUTOCOMPLETE_CACHE_TIMEOUT
+        )
+
+        return response
@@ -0,0 +1,40 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers import asgi
+
+_END = object()
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    # Django 4.0 iterates streaming responses in the event loop, exports
+    # read the database while they stream, so their parts are produced
+    # in the thread of the request (as newer Django versions do)
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        headers = [
+            (header.encode('ascii'), value.encode('latin1'))
+            for header, value in response.items()
+        ]
+        headers += [
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()
+        ]
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+
+        parts = iter(response)
+        next_part = sync_to_async(next, thread_sensitive=True)
+        while (part := await next_part(parts, _END)) is not _END:
+            for chunk, last in self.chunk_bytes(part):
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Content encodings of responses (see core.middleware.CompressionMiddleware).
+# The client lists the ones it accepts in Accept-Encoding, the server
+# picks the first of COMPRESSION_ENCODINGS among them. Brotli is offered
+# only when the brotli package is installed.
+
+# Quality of brotli, 4-5 is about as fast as gzip and smaller
+BROTLI_QUALITY = 5
+
+
+def available():
+    # Configured encodings this process can produce
+    return [
+        encoding for encoding in settings.COMPRESSION_ENCODINGS
+        if encoding == 'gzip' or (encoding == 'br' and brotli is not None)
+    ]
+
+
+def _accepted(header):
+    # Quality values of codings listed in Accept-Encoding
+    accepted = {}
+    for coding in header.split(','):
+        name, *params = coding.strip().lower().split(';')
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip()] = quality
+
+    return accepted
+
+
+def negotiate(header):
+    # Encoding to compress the response with, None for the identity
+    accepted = _accepted(header)
+    for encoding in available():
+        quality = accepted.get(encoding, accepted.get('*', 0))
+        if quality > 0:
+            return encoding
+
+    return None
+
+
+def compress(encoding, content):
+    if encoding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+
+    return compress_string(content)
+
+
+def compress_stream(encoding, parts):
+    # Every part is flushed, so clients get them as they are produced
+    if encoding == 'gzip':
+        yield from compress_sequence(parts)
+        return
+
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    for part in parts:
+        yield compressor.process(part) + compressor.flush()
+    yield compressor.finish()
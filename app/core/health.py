@@ -0,0 +1,45 @@
+import threading
+import time
+
+from django.db import connections
+
+# Per process counters of requests and opened database connections,
+# reported by the /health and /ready endpoints (see core.views)
+
+_lock = threading.Lock()
+
+_stats = {
+    'requests': 0,
+    'connections_opened': 0,
+    'health_checks_failed': 0,
+}
+
+
+def record(name, count=1):
+    with _lock:
+        _stats[name] += count
+
+
+def get_stats():
+    # Counters and the share of requests served without a new connection
+    with _lock:
+        stats = dict(_stats)
+    if stats['requests']:
+        stats['connection_reuse'] = round(
+            max(1 - stats['connections_opened'] / stats['requests'], 0), 3
+        )
+    else:
+        stats['connection_reuse'] = None
+
+    return stats
+
+
+def round_trip(alias):
+    # Milliseconds of a trivial query, connecting first when needed,
+    # raises DatabaseError when the database does not answer
+    started = time.perf_counter()
+    with connections[alias].cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+    return (time.perf_counter() - started) * 1000
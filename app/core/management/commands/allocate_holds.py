@@ -0,0 +1,40 @@
+from django.core.management import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from book import loans
+from core.models import Book, Hold
+
+
+class Command(BaseCommand):
+    # Hand out available copies to waiting holds, e.g. after copies were
+    # returned in bulk or added to books with a queue
+    help = 'Allocate available book copies to queued holds'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Copies allocated in one transaction'
+        )
+
+    def handle(self, *args, **options):
+        # Availability counter avoids looking at books without copies
+        books = Book.objects.filter(copies_available__gt=0).filter(
+            Exists(Hold.objects.filter(book=OuterRef('pk'), status='w'))
+        ).order_by('id').values_list('id', flat=True)
+
+        allocated = 0
+        last_id = 0
+        while True:
+            batch = list(books.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            for book_id in batch:
+                while True:
+                    count = loans.allocate(book_id, options['batch_size'])
+                    allocated += count
+                    if count < options['batch_size']:
+                        break
+            last_id = batch[-1]
+            self.stdout.write(f'Allocated {allocated} copies')
+
+        self.stdout.write(self.style.SUCCESS(f'{allocated} copies allocated'))
@@ -0,0 +1,333 @@
+import json
+import math
+import os
+import random
+import time
+from contextlib import ExitStack
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from book import synthetic
+from core.models import Book, BookInstance
+
+# Queries per request may not grow at all, latency is noisy
+QUERIES_TOLERANCE = 0.01
+
+
+def percentile(values, share):
+    # Nearest rank percentile of sorted values
+    if not values:
+        return 0
+
+    return values[max(math.ceil(share * len(values)) - 1, 0)]
+
+
+def _sample_ids(model, count, rng):
+    # Ids of random rows without ordering the whole table randomly,
+    # rows after random points of the id range (ids may have gaps)
+    if model is BookInstance:
+        points = [
+            f'{rng.getrandbits(128):032x}' for _ in range(count)
+        ]
+    else:
+        bounds = model.objects.order_by('pk').values_list('pk', flat=True)
+        if not bounds.exists():
+            return []
+        first, last = bounds.first(), bounds.last()
+        points = [rng.randint(first, last) for _ in range(count)]
+
+    ids = []
+    for point in points:
+        row = model.objects.filter(pk__gte=point).order_by('pk') \
+            .values_list('pk', flat=True).first()
+        if row is not None:
+            ids.append(str(row))
+
+    return ids
+
+
+class Command(BaseCommand):
+    # Measure latency and queries of the API endpoints on the current
+    # database (see generate_catalogue). Requests go through the whole
+    # middleware stack in this process, one at a time. Results are
+    # written as JSON, a run compared with an earlier one reports
+    # regressions and the files show them as diffs:
+    #   manage.py benchmark_api --output benchmarks/main.json
+    #   manage.py benchmark_api --baseline benchmarks/main.json \
+    #       --output benchmarks/branch.json --fail-on-regression
+    help = 'Benchmark latency and queries of the book and user API'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help='Measured requests per scenario'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=5,
+            help='Requests per scenario before measuring'
+        )
+        parser.add_argument(
+            '--scenarios', default='',
+            help='Comma separated scenarios to run, all by default'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write results to this file')
+        parser.add_argument(
+            '--baseline', help='Compare results with this file'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.25,
+            help='Growth of p95 latency reported as regression'
+        )
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        baseline = self._load(options['baseline'])
+
+        # Test client host, no queries are logged by the debug cursor
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with override_settings(ALLOWED_HOSTS=hosts, DEBUG=False):
+            self._prepare()
+            scenarios = self._scenarios()
+            if options['scenarios']:
+                names = options['scenarios'].split(',')
+                unknown = set(names) - set(scenarios)
+                if unknown:
+                    raise CommandError(
+                        f'Unknown scenarios: {", ".join(sorted(unknown))}.'
+                    )
+                scenarios = {name: scenarios[name] for name in names}
+
+            self.stdout.write(
+                f'{"scenario":<24}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}'
+                f'{"queries":>9}{"req/s":>9}{"errors":>8}'
+            )
+            results = {}
+            for name, request in scenarios.items():
+                results[name] = self._run(request, options)
+                self._write_row(name, results[name])
+
+        report = {
+            'dataset': self._dataset(),
+            'repeat': options['repeat'],
+            'scenarios': results,
+        }
+        if options['output']:
+            directory = os.path.dirname(options['output'])
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, sort_keys=True)
+                output.write('\n')
+
+        if baseline is not None:
+            regressions = self._compare(baseline, report, options)
+            if regressions and options['fail_on_regression']:
+                raise CommandError(
+                    f'Regressions in: {", ".join(regressions)}.'
+                )
+
+    def _load(self, path):
+        if not path:
+            return None
+        try:
+            with open(path) as baseline:
+                return json.load(baseline)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Cannot read baseline {path}: {exc}')
+
+    def _prepare(self):
+        # Synthetic user with a token and random rows to request
+        if not synthetic.synthetic_users().exists():
+            for _ in synthetic.generate_users(1):
+                pass
+        self.user = synthetic.synthetic_users().order_by('pk').first()
+        token = Token.objects.get(user=self.user).key
+        # Errors are counted, not raised
+        self.client = Client(
+            raise_request_exception=False,
+            HTTP_AUTHORIZATION=f'Token {token}',
+        )
+        self.book_ids = _sample_ids(Book, 100, self.rng)
+        self.copy_ids = _sample_ids(BookInstance, 100, self.rng)
+        if not self.book_ids:
+            raise CommandError(
+                'There are no books, run generate_catalogue first.'
+            )
+
+        # Two most popular genres, filters by them match the most books
+        self.genre_ids = list(
+            Book.genre.through.objects.values('genre_id').annotate(
+                books=Count('book_id')
+            ).order_by('-books').values_list('genre_id', flat=True)[:2]
+        )
+
+        response = self.client.get(reverse('book:book-list'))
+        self.next_page = None
+        if response.status_code == 200 and response.json().get('next'):
+            parts = urlsplit(response.json()['next'])
+            self.next_page = f'{parts.path}?{parts.query}'
+
+    def _scenarios(self):
+        # Name: function returning method, path and data of a request
+        book_list = reverse('book:book-list')
+        genres = ','.join(str(genre) for genre in self.genre_ids)
+
+        def book_detail():
+            book = self.rng.choice(self.book_ids)
+            return 'get', reverse('book:book-detail', args=[book]), None
+
+        def copy_detail():
+            copy = self.rng.choice(self.copy_ids)
+            return (
+                'get', reverse('book:bookinstance-detail', args=[copy]), None
+            )
+
+        def search():
+            words = ' '.join(self.rng.sample(synthetic.TITLE_WORDS, 2))
+            return 'get', book_list, {'search': words}
+
+        def autocomplete():
+            word = self.rng.choice(synthetic.TITLE_WORDS)
+            return 'get', reverse('book:autocomplete'), {'q': word[:3]}
+
+        def get(path, data=None):
+            return lambda: ('get', path, data)
+
+        scenarios = {
+            'book-list': get(book_list),
+            'book-list-available': get(book_list, {'available': 'true'}),
+            'book-detail': book_detail,
+            'genre-list': get(reverse('book:genre-list')),
+            'author-list': get(reverse('book:author-list')),
+            'publishing-house-list': get(
+                reverse('book:publishinghouse-list')
+            ),
+            'copy-list': get(reverse('book:bookinstance-list')),
+            'hold-list': get(reverse('book:hold-list')),
+            'user-me': get(reverse('user:me')),
+            'user-token': lambda: ('post', reverse('user:token'), {
+                'email': self.user.email,
+                'password': synthetic.SYNTHETIC_PASSWORD,
+            }),
+        }
+        if self.genre_ids:
+            scenarios['book-list-genre'] = get(book_list, {'genre': genres})
+            scenarios['book-list-genres-all'] = get(
+                book_list, {'genre': genres, 'genre_mode': 'all'}
+            )
+        if self.next_page:
+            scenarios['book-list-next-page'] = get(self.next_page)
+        if self.copy_ids:
+            scenarios['copy-detail'] = copy_detail
+        # Full-text and trigram search are PostgreSQL only
+        if connections[DEFAULT_DB_ALIAS].vendor == 'postgresql':
+            scenarios['book-search'] = search
+            scenarios['autocomplete'] = autocomplete
+
+        return scenarios
+
+    def _request(self, request):
+        # Milliseconds, number of queries and status of one request
+        method, path, data = request()
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count))
+            started = time.perf_counter()
+            response = getattr(self.client, method)(path, data)
+            elapsed = (time.perf_counter() - started) * 1000
+
+        return elapsed, queries, response.status_code
+
+    def _run(self, request, options):
+        for _ in range(options['warmup']):
+            self._request(request)
+
+        timings = []
+        queries = []
+        errors = 0
+        for _ in range(options['repeat']):
+            elapsed, count, status = self._request(request)
+            timings.append(elapsed)
+            queries.append(count)
+            if status >= 400:
+                errors += 1
+        timings.sort()
+        total = sum(timings)
+
+        return {
+            'p50_ms': round(percentile(timings, 0.5), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+            'queries': round(sum(queries) / len(queries), 2)
+            if queries else 0,
+            'max_queries': max(queries, default=0),
+            'throughput': round(len(timings) * 1000 / total, 1)
+            if total else 0,
+            'errors': errors,
+        }
+
+    def _write_row(self, name, result):
+        self.stdout.write(
+            f'{name:<24}{result["p50_ms"]:>9.2f}{result["p95_ms"]:>9.2f}'
+            f'{result["p99_ms"]:>9.2f}{result["queries"]:>9.2f}'
+            f'{result["throughput"]:>9.1f}{result["errors"]:>8}'
+        )
+
+    def _dataset(self):
+        return {
+            'database': connections[DEFAULT_DB_ALIAS].vendor,
+            'books': Book.objects.count(),
+            'copies': BookInstance.objects.count(),
+            'users': synthetic.synthetic_users().count(),
+        }
+
+    def _compare(self, baseline, report, options):
+        # Print changes against the baseline, return regressed scenarios
+        if baseline.get('dataset') != report['dataset']:
+            self.stdout.write(self.style.WARNING(
+                f'Datasets differ: {baseline.get("dataset")} and '
+                f'{report["dataset"]}'
+            ))
+
+        self.stdout.write(
+            f'{"scenario":<24}{"p95 ms":>18}{"change":>9}{"queries":>14}'
+        )
+        regressions = []
+        before = baseline.get('scenarios', {})
+        for name, result in report['scenarios'].items():
+            if name not in before:
+                continue
+            old = before[name]
+            change = (result['p95_ms'] - old['p95_ms']) / old['p95_ms'] \
+                if old['p95_ms'] else 0
+            regressed = change > options['threshold'] or \
+                result['queries'] > old['queries'] + QUERIES_TOLERANCE
+            line = (
+                f'{name:<24}'
+                f'{old["p95_ms"]:>8.2f} ->{result["p95_ms"]:>8.2f}'
+                f'{change:>+9.0%}'
+                f'{old["queries"]:>6.2f} ->{result["queries"]:>6.2f}'
+            )
+            if regressed:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+
+        return regressions
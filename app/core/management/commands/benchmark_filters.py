@@ -0,0 +1,102 @@
+import statistics
+import time
+
+from django.core.management import BaseCommand
+from django.db import connection
+from django.db.models import Count
+
+from book import synthetic
+from book.filters import multi_value_conditions
+from core.models import Author, Book, BookInstance, PublishingHouse
+
+
+class Command(BaseCommand):
+    # Compare filtering by joins with the EXISTS filters of
+    # book.filters, on a dataset of e.g. 1M books:
+    #   manage.py benchmark_filters --books 1000000 --explain
+    help = 'Benchmark multi-value filters of books and book copies'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--books', type=int, default=0,
+            help='Create synthetic books until there are this many'
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument(
+            '--explain', action='store_true',
+            help='Print query plans (PostgreSQL)'
+        )
+
+    def handle(self, *args, **options):
+        if options['books']:
+            self._seed(options['books'])
+
+        genres = self._most_used_genres(2)
+        authors = list(Author.objects.values_list('id', flat=True)[:3])
+        publishing_houses = list(
+            PublishingHouse.objects.values_list('id', flat=True)[:2]
+        )
+        exists = multi_value_conditions
+
+        scenarios = [
+            ('books, any genre, join', Book.objects.filter(
+                genre__in=genres
+            ).distinct()),
+            ('books, any genre, exists', Book.objects.filter(
+                *exists(Book, 'genre', genres)
+            )),
+            ('books, all genres, join', Book.objects.filter(
+                genre__in=genres
+            ).annotate(matched=Count('genre')).filter(
+                matched=len(genres)
+            )),
+            ('books, all genres, exists', Book.objects.filter(
+                *exists(Book, 'genre', genres, 'all')
+            )),
+            ('books, author', Book.objects.filter(
+                *exists(Book, 'author', authors)
+            )),
+            ('copies, publishing house, join', BookInstance.objects.filter(
+                book__publishing_house__in=publishing_houses
+            )),
+            ('copies, publishing house, exists', BookInstance.objects.filter(
+                *exists(BookInstance, 'book__publishing_house',
+                        publishing_houses)
+            )),
+        ]
+
+        self.stdout.write(
+            f'{Book.objects.count()} books, '
+            f'{BookInstance.objects.count()} copies'
+        )
+        self.stdout.write(f'{"scenario":<36}{"page ms":>10}{"count ms":>10}')
+        for name, queryset in scenarios:
+            page = queryset.order_by('-pk')[:options['page_size']]
+            page_ms = self._time(lambda: list(page.all()), options['repeat'])
+            count_ms = self._time(queryset.count, options['repeat'])
+            self.stdout.write(f'{name:<36}{page_ms:>10.2f}{count_ms:>10.2f}')
+            if options['explain'] and connection.vendor == 'postgresql':
+                self.stdout.write(page.explain(analyze=True, buffers=True))
+
+    def _time(self, run, repeat):
+        # Median of wall clock milliseconds
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+
+        return statistics.median(timings)
+
+    def _most_used_genres(self, count):
+        return list(
+            Book.genre.through.objects.values('genre_id').annotate(
+                books=Count('book_id')
+            ).order_by('-books').values_list('genre_id', flat=True)[:count]
+        )
+
+    def _seed(self, books):
+        # Books get one to three of 20 genres and up to three copies
+        for created in synthetic.generate_books(books):
+            self.stdout.write(f'Created {created} books')
@@ -0,0 +1,83 @@
+import io
+import statistics
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from book import serializers
+from core import compression
+from core.models import Book
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    # Compare rendering and parsing a page of book details with
+    # JSONRenderer and FastJSONRenderer (see core.renderers), then
+    # compressing it with the encodings available (see core.compression):
+    #   manage.py generate_catalogue --books 1000
+    #   manage.py benchmark_renderers --rows 1000
+    help = 'Benchmark JSON renderers, parsers and response compression'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        context = {'request': RequestFactory().get('/')}
+        queryset = serializers.BookDetailSerializer.setup_eager_loading(
+            Book.objects.order_by('pk')
+        )[:options['rows']]
+        data = serializers.BookDetailSerializer(
+            queryset, many=True, context=context
+        ).data
+        if not data:
+            raise CommandError('There are no books, see generate_catalogue.')
+
+        content = JSONRenderer().render(data)
+        if FastJSONRenderer().render(data) != content:
+            raise CommandError('Renderers differ.')
+        if orjson is None:
+            self.stdout.write('orjson is not installed, both are the same.')
+
+        repeat = options['repeat']
+        self.stdout.write(
+            f'{len(data)} books, {len(content)} bytes\n'
+            f'{"":<10}{"JSONRenderer ms":>18}{"FastJSONRenderer ms":>22}'
+            f'{"speedup":>10}'
+        )
+        for name, before, after in (
+            ('render', lambda: JSONRenderer().render(data),
+             lambda: FastJSONRenderer().render(data)),
+            ('parse', lambda: JSONParser().parse(io.BytesIO(content)),
+             lambda: FastJSONParser().parse(io.BytesIO(content))),
+        ):
+            before = self._time(before, repeat)
+            after = self._time(after, repeat)
+            self.stdout.write(
+                f'{name:<10}{before * 1000:>18.2f}{after * 1000:>22.2f}'
+                f'{before / after:>9.1f}x'
+            )
+
+        self.stdout.write(f'{"encoding":<10}{"bytes":>10}{"ms":>10}')
+        for encoding in compression.available():
+            size = len(compression.compress(encoding, content))
+            seconds = self._time(
+                lambda: compression.compress(encoding, content), repeat
+            )
+            self.stdout.write(
+                f'{encoding:<10}{size:>10}{seconds * 1000:>10.2f}'
+            )
+
+    def _time(self, run, repeat):
+        # Median of wall clock seconds
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+
+        return statistics.median(timings)
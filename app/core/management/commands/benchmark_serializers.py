@@ -0,0 +1,75 @@
+import statistics
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from book import serializers
+from book.rows import compile_rows
+from core.models import Author, Book, BookInstance, Genre
+
+SCENARIOS = (
+    ('books', Book, serializers.BookSerializer),
+    ('copies', BookInstance, serializers.BookInstanceSerializer),
+    ('genres', Genre, serializers.GenreSerializer),
+    ('authors', Author, serializers.AuthorSerializer),
+)
+
+
+class Command(BaseCommand):
+    # Compare serializing lists of model instances with reading them
+    # as rows (see book.rows), both include their queries:
+    #   manage.py benchmark_serializers --rows 1000
+    help = 'Benchmark list serializers against lists read as rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        context = {'request': RequestFactory().get('/')}
+        renderer = JSONRenderer()
+
+        self.stdout.write(
+            f'{"list":<10}{"rows":>8}{"serializer rows/s":>20}'
+            f'{"rows rows/s":>14}{"speedup":>10}'
+        )
+        for name, model, serializer_class in SCENARIOS:
+            queryset = model.objects.order_by('pk')
+            if hasattr(serializer_class, 'setup_eager_loading'):
+                queryset = serializer_class.setup_eager_loading(queryset)
+            queryset = queryset[:options['rows']]
+            rows = compile_rows(serializer_class(context=context))
+
+            def serialize():
+                return renderer.render(serializer_class(
+                    queryset.all(), many=True, context=context
+                ).data)
+
+            def read_rows():
+                return renderer.render(
+                    rows.serialize(rows.values(queryset.all()))
+                )
+
+            if serialize() != read_rows():
+                raise CommandError(f'Lists of {name} differ.')
+            count = queryset.count()
+            if not count:
+                continue
+            before = count / self._time(serialize, options['repeat'])
+            after = count / self._time(read_rows, options['repeat'])
+            self.stdout.write(
+                f'{name:<10}{count:>8}{before:>20.0f}{after:>14.0f}'
+                f'{after / before:>9.1f}x'
+            )
+
+    def _time(self, run, repeat):
+        # Median of wall clock seconds
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+
+        return statistics.median(timings)
@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from book import covers
+from core.models import Book, CoverImage
+from core.storage import cover_storage
+
+
+class Command(BaseCommand):
+    # Delete cover images which no book refers to anymore. Images are
+    # kept for a grace period, an upload of an identical cover may be
+    # about to refer to them again. Such an upload touches the file
+    # (see core.storage), files saved within the grace period are kept.
+    help = 'Delete unreferenced cover images and their variants'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--grace-period', type=int,
+            default=settings.COVER_GC_GRACE_PERIOD,
+            help='Seconds an image stays unreferenced before deletion'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report images which would be deleted'
+        )
+
+    def _collect_batch(self, images, last_id, batch_size, dry_run, since):
+        # Return ids of the batch and names of deleted images
+        with transaction.atomic():
+            batch = list(
+                images.filter(id__gt=last_id).select_for_update(
+                    skip_locked=True
+                )[:batch_size]
+            )
+            # Counts may be off, e.g. after books were changed with
+            # queryset updates, so references are checked once more
+            references = dict(
+                Book.objects.filter(
+                    cover__in=[image.name for image in batch]
+                ).values_list('cover').annotate(Count('id')).order_by()
+            )
+            garbage = [
+                image for image in batch if image.name not in references
+                and not cover_storage.saved_since(image.name, since)
+            ]
+            if not dry_run:
+                for image in batch:
+                    if image.name in references:
+                        CoverImage.objects.filter(id=image.id).update(
+                            ref_count=references[image.name]
+                        )
+                CoverImage.objects.filter(
+                    id__in=[image.id for image in garbage]
+                ).delete()
+
+        return [image.id for image in batch], [image.name for image in garbage]
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options['grace_period'])
+        since = cutoff.timestamp()
+        images = CoverImage.objects.filter(
+            ref_count=0, last_modified__lt=cutoff
+        ).order_by('id')
+
+        deleted = 0
+        last_id = 0
+        while True:
+            ids, names = self._collect_batch(
+                images, last_id, options['batch_size'], options['dry_run'],
+                since
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+            # Files are deleted once their rows are gone for good
+            kept = []
+            for name in names:
+                if options['dry_run']:
+                    self.stdout.write(name)
+                elif not covers.delete_files(name, since):
+                    kept.append(name)
+            # Saved again meanwhile, the next run checks them once more
+            CoverImage.objects.bulk_create(
+                [CoverImage(name=name) for name in kept],
+                ignore_conflicts=True
+            )
+            deleted += len(names) - len(kept)
+
+        verb = 'would be deleted' if options['dry_run'] else 'deleted'
+        self.stdout.write(self.style.SUCCESS(f'{deleted} cover images {verb}'))
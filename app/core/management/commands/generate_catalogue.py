@@ -0,0 +1,61 @@
+import time
+
+from django.core.management import BaseCommand
+
+from book import synthetic
+from core.models import Book, BookInstance
+
+
+class Command(BaseCommand):
+    # Fill the database with a synthetic catalogue for benchmarks, sizes
+    # are totals, so running it again only adds what is missing:
+    #   manage.py generate_catalogue --books 2000000 --users 50000
+    help = 'Generate a synthetic catalogue of books, copies and users'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=100000)
+        parser.add_argument('--genres', type=int, default=50)
+        parser.add_argument('--authors', type=int, default=20000)
+        parser.add_argument('--publishing-houses', type=int, default=500)
+        parser.add_argument(
+            '--users', type=int, default=1000,
+            help='Users with tokens, they borrow copies which are not '
+                 'available'
+        )
+        parser.add_argument(
+            '--max-copies', type=int, default=3,
+            help='Every book gets up to this many copies'
+        )
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Exponent of popularity of genres, authors and '
+                 'publishing houses'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        # Users first, copies on loan are given to them
+        for users in synthetic.generate_users(
+            options['users'], options['batch_size']
+        ):
+            self.stdout.write(f'Created {users} users')
+        for books in synthetic.generate_books(
+            options['books'],
+            genres=options['genres'],
+            authors=options['authors'],
+            publishing_houses=options['publishing_houses'],
+            max_copies=options['max_copies'],
+            exponent=options['zipf'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+        ):
+            self.stdout.write(f'Created {books} books')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{Book.objects.count()} books, '
+            f'{BookInstance.objects.count()} copies, '
+            f'{synthetic.synthetic_users().count()} synthetic users '
+            f'in {time.monotonic() - started:.0f} s'
+        ))
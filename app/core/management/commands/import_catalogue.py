@@ -0,0 +1,319 @@
+import csv
+import io
+import json
+import os
+import time
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+
+from book import availability, bulk, cache
+from core.models import Author, Book, BookInstance, Genre, \
+    PublishingHouse
+
+# Every row describes one book:
+# isbn, name, summary, number_of_pages, year_of_publish, author_first_name,
+# author_last_name, publishing_house, genres (names separated by '|' in CSV,
+# a list in JSONL) and optional copies - wanted number of book copies
+REQUIRED_FIELDS = (
+    'isbn', 'name', 'summary', 'number_of_pages', 'year_of_publish',
+    'author_first_name', 'author_last_name', 'publishing_house',
+)
+
+# Model fields columns are stored in, values are cleaned by them
+COLUMN_FIELDS = {
+    'isbn': Book._meta.get_field('isbn'),
+    'name': Book._meta.get_field('name'),
+    'summary': Book._meta.get_field('summary'),
+    'number_of_pages': Book._meta.get_field('number_of_pages'),
+    'year_of_publish': Book._meta.get_field('year_of_publish'),
+    'author_first_name': Author._meta.get_field('first_name'),
+    'author_last_name': Author._meta.get_field('last_name'),
+    'publishing_house': PublishingHouse._meta.get_field('name'),
+}
+GENRE_FIELD = Genre._meta.get_field('name')
+
+
+def clean_value(field, value):
+    # Value as the field stores it, ValidationError when the database
+    # would reject it. Text fields do not check their max_length.
+    value = field.clean(value, None)
+    if field.max_length is not None and len(value) > field.max_length:
+        raise ValidationError('Value is too long.')
+
+    return value
+
+
+def read_lines(file):
+    # Yield lines with readline, so file.tell() stays usable
+    while True:
+        line = file.readline()
+        if not line:
+            return
+        yield line
+
+
+def read_jsonl(lines):
+    # Yield an object per line, broken lines become empty rows
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = {}
+        yield row if isinstance(row, dict) else {}
+
+
+class Command(BaseCommand):
+    # Stream a catalogue file into the database in batches,
+    # the file is never loaded into memory as a whole
+    help = 'Import books, authors, publishing houses, genres and ' \
+           'book copies from a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=('csv', 'jsonl'),
+            help='File format, guessed from the extension by default'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Checkpoint file, <path>.checkpoint by default'
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Continue after the last committed batch'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+        )
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('Batch size must be a positive integer')
+        checkpoint_path = options['checkpoint'] or f'{path}.checkpoint'
+
+        self._load_maps()
+        self.created_catalogue = set()
+        self.stats = {'rows': 0, 'books': 0, 'copies': 0, 'skipped': 0}
+
+        with open(path, newline='', encoding='utf-8') as file:
+            if file_format == 'csv':
+                header = next(csv.reader([file.readline()]))
+            offset = self._read_checkpoint(checkpoint_path, options['resume'])
+            if offset is not None:
+                file.seek(offset)
+                self.stdout.write(
+                    f'Resuming after {self.stats["rows"]} rows'
+                )
+
+            lines = read_lines(file)
+            if file_format == 'csv':
+                rows = csv.DictReader(lines, fieldnames=header)
+            else:
+                rows = read_jsonl(lines)
+
+            started = time.monotonic()
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    self._import_batch(batch, batch_size)
+                    self._write_checkpoint(checkpoint_path, file.tell())
+                    self._report(started)
+                    batch = []
+            if batch:
+                self._import_batch(batch, batch_size)
+                self._write_checkpoint(checkpoint_path, file.tell())
+                self._report(started)
+
+        # Bulk inserts do not send signals, invalidate cached lists here
+        for model in self.created_catalogue:
+            cache.bump_version(model)
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        self.stdout.write(self.style.SUCCESS(
+            'Imported {rows} rows: {books} books, {copies} new copies, '
+            '{skipped} skipped'.format(**self.stats)
+        ))
+
+    def _load_maps(self):
+        # Natural key -> primary key maps of the catalogue tables
+        self.authors = {
+            (first_name, last_name): pk
+            for pk, first_name, last_name in Author.objects.values_list(
+                'pk', 'first_name', 'last_name'
+            ).iterator()
+        }
+        self.publishing_houses = dict(
+            PublishingHouse.objects.values_list('name', 'pk')
+        )
+        self.genres = dict(Genre.objects.values_list('name', 'pk'))
+
+    def _read_checkpoint(self, checkpoint_path, resume):
+        # Return file offset to continue from, if resuming
+        if not resume or not os.path.exists(checkpoint_path):
+            return None
+        with open(checkpoint_path) as checkpoint:
+            state = json.load(checkpoint)
+        self.stats.update(state['stats'])
+
+        return state['offset']
+
+    def _write_checkpoint(self, checkpoint_path, offset):
+        # Written after the batch is committed, atomically replaced
+        tmp_path = f'{checkpoint_path}.tmp'
+        with open(tmp_path, 'w') as checkpoint:
+            json.dump({'offset': offset, 'stats': self.stats}, checkpoint)
+        os.replace(tmp_path, checkpoint_path)
+
+    def _report(self, started):
+        elapsed = time.monotonic() - started
+        self.stdout.write('{rows} rows, {books} books, {copies} copies, '
+                          '{skipped} skipped ({rate:.0f} rows/s)'.format(
+                              rate=self.stats['rows'] / elapsed
+                              if elapsed else 0,
+                              **self.stats
+                          ))
+
+    def _resolve(self, model, key_map, keys, build):
+        # Create missing catalogue rows in one query, update the map
+        missing = [key for key in dict.fromkeys(keys) if key not in key_map]
+        if missing:
+            objs = model.objects.bulk_create([build(key) for key in missing])
+            key_map.update(zip(missing, (obj.pk for obj in objs)))
+            self.created_catalogue.add(model)
+
+    def _parse(self, row):
+        # Return cleaned row or None when it can not be imported
+        if any(not row.get(field) for field in REQUIRED_FIELDS):
+            return None
+        genres = row.get('genres') or []
+        if isinstance(genres, str):
+            genres = genres.split('|')
+        try:
+            values = {
+                column: clean_value(field, row[column])
+                for column, field in COLUMN_FIELDS.items()
+            }
+            genres = [
+                clean_value(GENRE_FIELD, str(genre).strip())
+                for genre in genres if str(genre).strip()
+            ]
+            copies = int(row.get('copies') or 0)
+        except (ValidationError, ValueError, TypeError):
+            return None
+        if copies < 0:
+            return None
+
+        return {
+            'isbn': bulk.clean_isbn(values['isbn']),
+            'name': values['name'],
+            'summary': values['summary'],
+            'number_of_pages': values['number_of_pages'],
+            'year_of_publish': values['year_of_publish'],
+            'author': (
+                values['author_first_name'], values['author_last_name']
+            ),
+            'publishing_house': values['publishing_house'],
+            'genres': genres,
+            'copies': copies,
+        }
+
+    def _import_batch(self, batch, batch_size):
+        parsed = [self._parse(row) for row in batch]
+        self.stats['rows'] += len(batch)
+        self.stats['skipped'] += parsed.count(None)
+        # Later rows of the same isbn win
+        rows = list({
+            row['isbn']: row for row in parsed if row is not None
+        }.values())
+
+        with transaction.atomic():
+            self._resolve(
+                Author, self.authors,
+                [row['author'] for row in rows],
+                lambda key: Author(first_name=key[0], last_name=key[1])
+            )
+            self._resolve(
+                PublishingHouse, self.publishing_houses,
+                [row['publishing_house'] for row in rows],
+                lambda name: PublishingHouse(name=name)
+            )
+            self._resolve(
+                Genre, self.genres,
+                [genre for row in rows for genre in row['genres']],
+                lambda name: Genre(name=name)
+            )
+
+            books = bulk.upsert_books([
+                {
+                    'isbn': row['isbn'],
+                    'name': row['name'],
+                    'summary': row['summary'],
+                    'number_of_pages': row['number_of_pages'],
+                    'year_of_publish': row['year_of_publish'],
+                    'author_id': self.authors[row['author']],
+                    'publishing_house_id':
+                        self.publishing_houses[row['publishing_house']],
+                    'genre': [self.genres[name] for name in row['genres']],
+                }
+                for row in rows
+            ], batch_size)
+            self.stats['books'] += len(books)
+
+            copies = self._missing_copies(
+                [(book.pk, row['copies']) for (book, created), row
+                 in zip(books, rows)]
+            )
+            self._insert_copies(copies)
+            # Copies are bulk inserted without signals
+            availability.change_counts(
+                added=[(book_id, 'a') for pk, book_id in copies]
+            )
+            self.stats['copies'] += len(copies)
+
+    def _missing_copies(self, wanted):
+        # Only copies above the current number are created,
+        # so importing the same feed again adds nothing
+        current = dict(
+            BookInstance.objects.filter(
+                book_id__in=[book_id for book_id, count in wanted if count]
+            ).values('book_id').annotate(
+                count=Count('id')
+            ).values_list('book_id', 'count')
+        )
+
+        return [
+            (uuid.uuid4(), book_id)
+            for book_id, count in wanted
+            for _ in range(count - current.get(book_id, 0))
+        ]
+
+    def _insert_copies(self, copies):
+        # PostgreSQL COPY is the fastest way to load plain new rows
+        if not copies:
+            return
+        if connection.vendor != 'postgresql':
+            BookInstance.objects.bulk_create([
+                BookInstance(id=pk, book_id=book_id, status='a')
+                for pk, book_id in copies
+            ])
+            return
+
+        buffer = io.StringIO(''.join(
+            f'{pk}\t{book_id}\ta\n' for pk, book_id in copies
+        ))
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {BookInstance._meta.db_table} '
+                f'(id, book_id, status) FROM STDIN',
+                buffer
+            )
@@ -0,0 +1,250 @@
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+# Servers under test, both run by gunicorn with the same number of worker
+# processes: sync workers for app.wsgi, uvicorn workers for app.asgi
+SERVERS = {
+    'wsgi': ['app.wsgi:application'],
+    'asgi': ['app.asgi:application', '-k', 'uvicorn.workers.UvicornWorker'],
+}
+
+LOAD_TEST_EMAIL = 'load-test@example.com'
+
+
+def process_tree(pid):
+    # Pid and pids of all descendants, read from /proc (Linux)
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as stat:
+                ppid = int(stat.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    pids = [pid]
+    for parent in pids:
+        pids.extend(children.get(parent, []))
+
+    return pids
+
+
+def rss_kb(pid):
+    # Resident memory of the process and its descendants in KiB
+    total = 0
+    for tree_pid in process_tree(pid):
+        try:
+            with open(f'/proc/{tree_pid}/status') as status:
+                for line in status:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+        except OSError:
+            continue
+
+    return total
+
+
+class Command(BaseCommand):
+    # Compare the WSGI and ASGI applications under the same closed loop
+    # load: every in-flight request is a client waiting for its response
+    # before sending the next one. Slow clients trickle their request
+    # byte by byte, like clients on bad networks, for the whole run.
+    #   manage.py load_test --concurrency 10,100,500 --slow-clients 20
+    help = 'Load test read endpoints served by WSGI and ASGI workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--servers', default='wsgi,asgi',
+            help='Comma separated servers to test (wsgi, asgi)'
+        )
+        parser.add_argument(
+            '--concurrency', default='10,50,200',
+            help='Comma separated numbers of requests in flight'
+        )
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument(
+            '--slow-clients', type=int, default=0,
+            help='Connections sending one byte of a request at a time'
+        )
+        parser.add_argument(
+            '--slow-interval', type=float, default=0.5,
+            help='Seconds between bytes sent by slow clients'
+        )
+        parser.add_argument('--path', default='/api/book/book/')
+        parser.add_argument('--port', type=int, default=8100)
+
+    def handle(self, *args, **options):
+        if not sys.platform.startswith('linux'):
+            raise CommandError('Memory is measured through /proc (Linux).')
+
+        request = (
+            f'GET {options["path"]} HTTP/1.1\r\n'
+            f'Host: 127.0.0.1\r\n'
+            f'Authorization: Token {self._token()}\r\n'
+            f'Accept: application/json\r\n'
+            f'Connection: close\r\n\r\n'
+        ).encode()
+        levels = [int(value) for value in options['concurrency'].split(',')]
+
+        self.stdout.write(
+            f'{"server":<8}{"in flight":>10}{"req/s":>10}{"p50 ms":>10}'
+            f'{"p99 ms":>10}{"errors":>8}{"idle MB":>10}{"peak MB":>10}'
+            f'{"KB/req":>10}'
+        )
+        for name in options['servers'].split(','):
+            if name not in SERVERS:
+                raise CommandError(f'Unknown server {name}.')
+            server = self._start(name, options)
+            try:
+                # Workers import and connect on their first requests
+                warm_up = {**options, 'duration': 2, 'slow_clients': 0}
+                asyncio.run(self._run(
+                    request, server.pid, options['workers'], warm_up
+                ))
+                for concurrency in levels:
+                    idle = rss_kb(server.pid)
+                    result = asyncio.run(self._run(
+                        request, server.pid, concurrency, options
+                    ))
+                    in_flight = concurrency + options['slow_clients']
+                    per_request = max(result['peak'] - idle, 0) / in_flight
+                    self.stdout.write(
+                        f'{name:<8}{concurrency:>10}'
+                        f'{result["rate"]:>10.1f}{result["p50"]:>10.1f}'
+                        f'{result["p99"]:>10.1f}{result["errors"]:>8}'
+                        f'{idle / 1024:>10.1f}{result["peak"] / 1024:>10.1f}'
+                        f'{per_request:>10.1f}'
+                    )
+            finally:
+                server.terminate()
+                server.wait()
+
+    def _token(self):
+        # Token of a dedicated user, requests pass authentication
+        users = get_user_model().objects
+        user = users.filter(email=LOAD_TEST_EMAIL).first()
+        if user is None:
+            user = users.create_user(
+                name='Load test', email=LOAD_TEST_EMAIL
+            )
+
+        return Token.objects.get_or_create(user=user)[0].key
+
+    def _start(self, name, options):
+        # Start the server and wait until it accepts connections
+        server = subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn', *SERVERS[name],
+                '--workers', str(options['workers']),
+                '--bind', f'127.0.0.1:{options["port"]}',
+                '--chdir', os.getcwd(),
+                '--log-level', 'warning',
+            ]
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'{name} server exited.')
+            try:
+                socket.create_connection(
+                    ('127.0.0.1', options['port']), timeout=1
+                ).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+
+        server.terminate()
+        raise CommandError(f'{name} server did not start.')
+
+    async def _run(self, request, pid, concurrency, options):
+        port = options['port']
+        deadline = time.monotonic() + options['duration']
+        latencies = []
+        errors = 0
+        peak = 0
+
+        async def fetch():
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            try:
+                writer.write(request)
+                await writer.drain()
+                response = await reader.read()
+            finally:
+                writer.close()
+
+            return response[9:12] == b'200'
+
+        async def client():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                started = time.monotonic()
+                try:
+                    ok = await fetch()
+                except OSError:
+                    ok = False
+                if ok:
+                    latencies.append((time.monotonic() - started) * 1000)
+                else:
+                    errors += 1
+
+        async def slow_client():
+            while time.monotonic() < deadline:
+                try:
+                    reader, writer = await asyncio.open_connection(
+                        '127.0.0.1', port
+                    )
+                except OSError:
+                    await asyncio.sleep(options['slow_interval'])
+                    continue
+                try:
+                    for byte in request:
+                        if time.monotonic() >= deadline:
+                            break
+                        writer.write(bytes([byte]))
+                        await writer.drain()
+                        await asyncio.sleep(options['slow_interval'])
+                    else:
+                        await reader.read()
+                except OSError:
+                    pass
+                finally:
+                    writer.close()
+
+        async def sample():
+            nonlocal peak
+            while time.monotonic() < deadline:
+                peak = max(peak, rss_kb(pid))
+                await asyncio.sleep(0.2)
+
+        tasks = [asyncio.create_task(sample())]
+        tasks += [
+            asyncio.create_task(slow_client())
+            for _ in range(options['slow_clients'])
+        ]
+        # Slow clients occupy their connections before the load starts
+        await asyncio.sleep(min(1, options['duration'] / 10))
+        load_started = time.monotonic()
+        tasks += [asyncio.create_task(client()) for _ in range(concurrency)]
+        await asyncio.gather(*tasks)
+
+        latencies.sort()
+
+        return {
+            'rate': len(latencies) / (deadline - load_started),
+            'p50': statistics.median(latencies) if latencies else 0,
+            'p99': latencies[int(len(latencies) * 0.99)] if latencies else 0,
+            'errors': errors,
+            'peak': peak,
+        }
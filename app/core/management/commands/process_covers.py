@@ -0,0 +1,37 @@
+from django.core.management import BaseCommand
+
+from book import covers
+from core.models import Book
+
+
+class Command(BaseCommand):
+    # Generate variants of covers left pending, e.g. when the
+    # processing pool was full or the server was restarted
+    help = 'Generate size variants of pending book covers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Process failed covers again'
+        )
+
+    def handle(self, *args, **options):
+        statuses = ['p', 'f'] if options['retry_failed'] else ['p']
+        books = Book.objects.filter(
+            cover_status__in=statuses
+        ).exclude(cover='').only('id', 'cover').order_by('id')
+
+        processed = 0
+        last_id = 0
+        while True:
+            batch = list(books.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            for book in batch:
+                covers.process_cover(book)
+            processed += len(batch)
+            last_id = batch[-1].id
+            self.stdout.write(f'Processed {processed} covers')
+
+        self.stdout.write(self.style.SUCCESS(f'{processed} covers processed'))
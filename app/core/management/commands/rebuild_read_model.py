@@ -0,0 +1,22 @@
+from django.core.management import BaseCommand
+
+from book import read_model
+
+
+class Command(BaseCommand):
+    # Refresh the read model of all books from their sources, e.g. after
+    # books, authors or genres were changed with raw SQL (see
+    # book.read_model). Rows are locked one batch at a time.
+    help = 'Rebuild the read model of books in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        refreshed = 0
+        for refreshed in read_model.rebuild(options['batch_size']):
+            self.stdout.write(f'Refreshed {refreshed} books')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{refreshed} books refreshed'
+        ))
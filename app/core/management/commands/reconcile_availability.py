@@ -0,0 +1,32 @@
+from django.core.management import BaseCommand
+
+from book import availability
+from core.models import Book
+
+
+class Command(BaseCommand):
+    # Recount copies of all books and fix availability counters
+    # which drifted, e.g. after copies were changed with raw SQL
+    help = 'Fix availability counters of books in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        books = Book.objects.order_by('id').values_list('id', flat=True)
+
+        checked = 0
+        fixed = 0
+        last_id = 0
+        while True:
+            batch = list(books.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            fixed += availability.reconcile(batch)
+            checked += len(batch)
+            last_id = batch[-1]
+            self.stdout.write(f'Checked {checked} books, fixed {fixed}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{checked} books checked, {fixed} fixed'
+        ))
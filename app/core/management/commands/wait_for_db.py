@@ -1,19 +1,54 @@
 import time
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
 from django.db import connections, OperationalError
 
 
 class Command(BaseCommand):
-    # Will pause execution until db is available
+    # Will pause execution until db answers a query, retrying with
+    # exponential backoff for at most --timeout seconds
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='Seconds to wait before giving up'
+        )
+        parser.add_argument(
+            '--max-delay', type=float, default=5,
+            help='Longest pause between attempts in seconds'
+        )
+
+    def _probe(self, alias):
+        # Getting the connection object does not connect, a query does.
+        # A failed connection is closed, so the next probe reconnects.
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except OperationalError:
+            connections[alias].close()
+            raise
 
     def handle(self, *args, **options):
         self.stdout.write('Waiting for DB...')
-        db_conn = None
-        while not db_conn:
+        alias = options['database']
+        deadline = time.monotonic() + options['timeout']
+        delay = 0.1
+        while True:
             try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write('Database is unavailable, waiting 1 second...')
-                time.sleep(1)
+                self._probe(alias)
+                break
+            except OperationalError as exc:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f'DB is unavailable after {options["timeout"]} '
+                        f'seconds: {exc}'
+                    )
+                pause = min(delay, remaining)
+                self.stdout.write(
+                    f'Database is unavailable, waiting {pause:.1f} seconds...'
+                )
+                time.sleep(pause)
+                delay = min(delay * 2, options['max_delay'])
 
         self.stdout.write(self.style.SUCCESS('DB is available'))
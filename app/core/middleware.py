@@ -0,0 +1,152 @@
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+from core import compression, routers, timing
+
+STICKY_SALT = 'core.middleware.sticky'
+
+
+def stick_to_primary(response):
+    # Send reads of the client to the primary for REPLICA_STICKY_SECONDS.
+    # The signed cookie carries its own age, any worker can check it
+    # without asking a database or a cache.
+    response.set_signed_cookie(
+        settings.REPLICA_STICKY_COOKIE, '1', salt=STICKY_SALT,
+        max_age=settings.REPLICA_STICKY_SECONDS, httponly=True,
+        samesite='Lax'
+    )
+
+
+def is_sticky(request):
+    return request.get_signed_cookie(
+        settings.REPLICA_STICKY_COOKIE, default=None, salt=STICKY_SALT,
+        max_age=settings.REPLICA_STICKY_SECONDS
+    ) is not None
+
+
+def _streamed_from(alias, content):
+    # Streamed parts are produced after the response left the
+    # middleware, reads of every part go to the same replica
+    parts = iter(content)
+    while True:
+        routers.set_read_alias(alias)
+        try:
+            part = next(parts)
+        except StopIteration:
+            return
+        finally:
+            routers.set_read_alias(None)
+        yield part
+
+
+class ReplicaReadMiddleware(MiddlewareMixin):
+    # Read from a replica in safe requests to views with 'replica_reads'.
+    # A client which wrote something reads from the primary until
+    # the write has surely been replicated, so it sees its own writes.
+    # Clients keeping no cookies get no such guarantee.
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routers.set_read_alias(None)
+        if not settings.DATABASE_REPLICAS or \
+                request.method not in SAFE_METHODS:
+            return None
+        view_class = getattr(view_func, 'cls', None) or \
+            getattr(view_func, 'view_class', None)
+        if not getattr(view_class, 'replica_reads', False):
+            return None
+        if is_sticky(request):
+            return None
+
+        routers.set_read_alias(routers.choose_replica())
+
+        return None
+
+    def process_response(self, request, response):
+        alias = routers.get_read_alias()
+        routers.set_read_alias(None)
+        if alias is not None and response.streaming:
+            response.streaming_content = _streamed_from(
+                alias, response.streaming_content
+            )
+        if settings.DATABASE_REPLICAS and \
+                request.method not in SAFE_METHODS and \
+                response.status_code < 400:
+            stick_to_primary(response)
+
+        return response
+
+
+class RequestTimingMiddleware(MiddlewareMixin):
+    # Measure every request when REQUEST_TIMING is on (see core.timing),
+    # first in MIDDLEWARE, so the total includes all other middleware
+
+    def process_request(self, request):
+        if settings.REQUEST_TIMING:
+            request.timing = timing.start()
+
+    def process_response(self, request, response):
+        measured = getattr(request, 'timing', None)
+        if measured is None:
+            return response
+        total = timing.finish(measured)
+        size = None if response.streaming else len(response.content)
+        match = request.resolver_match
+        timing.record(
+            match.view_name if match else 'unmatched',
+            request.method, measured, total, size
+        )
+        # Users authenticated by a token are set by the view
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            response['Server-Timing'] = measured.server_timing(total, size)
+
+        return response
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    # Compress responses of COMPRESSION_CONTENT_TYPES with the encoding
+    # negotiated from Accept-Encoding (see core.compression). Bodies
+    # under COMPRESSION_MIN_SIZE bytes are not worth it, streamed ones
+    # are always compressed. Placed before middleware which reads
+    # or changes the body, right after RequestTimingMiddleware, which
+    # then measures the compressed size.
+
+    def process_response(self, request, response):
+        if not settings.COMPRESSION_ENCODINGS or \
+                response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0]
+        if not content_type.startswith(settings.COMPRESSION_CONTENT_TYPES):
+            return response
+        if not response.streaming and \
+                len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = compression.negotiate(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compression.compress_stream(
+                encoding, response.streaming_content
+            )
+            del response['Content-Length']
+        else:
+            content = compression.compress(encoding, response.content)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+
+        # The compressed body differs from the one the ETag was made for
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+        response['Content-Encoding'] = encoding
+
+        return response
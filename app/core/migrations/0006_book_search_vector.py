@@ -0,0 +1,80 @@
+# Generated by Django 4.0.10 on 2026-10-18 06:35
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# The search vector is computed by the database, so it stays current for
+# every write path (ORM saves, bulk inserts and COPY). Author name lives in
+# another table, so renaming an author refreshes vectors of their books.
+SEARCH_TRIGGERS_SQL = '''
+CREATE OR REPLACE FUNCTION core_book_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce((
+            SELECT first_name || ' ' || last_name
+            FROM core_author WHERE id = NEW.author_id
+        ), '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW.summary, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_book_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, summary, author_id ON core_book
+    FOR EACH ROW EXECUTE FUNCTION core_book_search_vector_update();
+
+CREATE OR REPLACE FUNCTION core_author_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    UPDATE core_book SET author_id = author_id WHERE author_id = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_author_search_vector_trigger
+    AFTER UPDATE OF first_name, last_name ON core_author
+    FOR EACH ROW
+    WHEN (OLD.first_name IS DISTINCT FROM NEW.first_name
+          OR OLD.last_name IS DISTINCT FROM NEW.last_name)
+    EXECUTE FUNCTION core_author_search_vector_update();
+
+UPDATE core_book SET author_id = author_id;
+'''
+
+DROP_SEARCH_TRIGGERS_SQL = '''
+DROP TRIGGER IF EXISTS core_author_search_vector_trigger ON core_author;
+DROP FUNCTION IF EXISTS core_author_search_vector_update();
+DROP TRIGGER IF EXISTS core_book_search_vector_trigger ON core_book;
+DROP FUNCTION IF EXISTS core_book_search_vector_update();
+'''
+
+
+def create_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(SEARCH_TRIGGERS_SQL)
+
+
+def drop_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SEARCH_TRIGGERS_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_bookinstance_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='book_search_vector_idx'),
+        ),
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.10 on 2026-10-18 06:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publishinghouse',
+            name='created_date',
+            field=models.DateTimeField(auto_now_add=True, null=True, verbose_name='created date'),
+        ),
+        migrations.AddField(
+            model_name='publishinghouse',
+            name='last_modified',
+            field=models.DateTimeField(auto_now=True, null=True, verbose_name='last modified'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.0.10 on 2026-10-18 06:49
+
+from django.db import migrations, models
+
+
+def mark_existing_covers(apps, schema_editor):
+    # Existing covers get their variants from the process_covers command
+    Book = apps.get_model('core', 'Book')
+    Book.objects.exclude(cover='').exclude(cover__isnull=True).update(
+        cover_status='p'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_publishinghouse_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='cover_medium',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='cover_status',
+            field=models.CharField(blank=True, choices=[('', 'No cover'), ('p', 'Pending'), ('r', 'Ready'), ('f', 'Failed')], default='', max_length=1),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='cover_thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='cover_webp',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to=''),
+        ),
+        migrations.RunPython(mark_existing_covers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.0.10 on 2026-10-18 06:54
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+def count_existing_covers(apps, schema_editor):
+    # Existing covers keep their names and are counted like new ones
+    Book = apps.get_model('core', 'Book')
+    CoverImage = apps.get_model('core', 'CoverImage')
+    counts = Book.objects.exclude(cover='').exclude(
+        cover__isnull=True
+    ).values('cover').annotate(ref_count=models.Count('id')).order_by()
+    CoverImage.objects.bulk_create(
+        (
+            CoverImage(name=row['cover'], ref_count=row['ref_count'])
+            for row in counts.iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_book_cover_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoverImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateTimeField(auto_now_add=True, null=True, verbose_name='created date')),
+                ('last_modified', models.DateTimeField(auto_now=True, null=True, verbose_name='last modified')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'cover image',
+                'verbose_name_plural': 'cover images',
+            },
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='cover',
+            field=models.ImageField(null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.cover_image_file_path),
+        ),
+        migrations.AddIndex(
+            model_name='coverimage',
+            index=models.Index(condition=models.Q(('ref_count', 0)), fields=['last_modified'], name='cover_image_unreferenced_idx'),
+        ),
+        migrations.RunPython(count_existing_covers, migrations.RunPython.noop),
+    ]
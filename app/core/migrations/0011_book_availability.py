@@ -0,0 +1,58 @@
+# Generated by Django 4.0.10 on 2026-10-18 06:58
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_copies(apps, schema_editor):
+    Book = apps.get_model('core', 'Book')
+    BookInstance = apps.get_model('core', 'BookInstance')
+
+    def count(**filters):
+        copies = BookInstance.objects.filter(
+            book=models.OuterRef('pk'), **filters
+        ).order_by().values('book').annotate(count=models.Count('pk'))
+
+        return Coalesce(models.Subquery(copies.values('count')), 0)
+
+    Book.objects.update(
+        copies_total=count(),
+        copies_available=count(status='a'),
+        copies_on_loan=count(status='o'),
+        copies_reserved=count(status='r'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_cover_images'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='copies_available',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_on_loan',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_reserved',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_total',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['copies_available', 'id'], name='book_availability_idx'),
+        ),
+        migrations.RunPython(count_copies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Filters by genre and by user are EXISTS subqueries on many to many
+    # tables (see book.filters). Unique (book_id, genre_id) index serves
+    # them per book, these indexes let the planner start from the
+    # filtered ids, both without reading the tables themselves.
+
+    dependencies = [
+        ('core', '0012_holds'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX book_genre_genre_book_idx '
+            'ON core_book_genre (genre_id, book_id)',
+            'DROP INDEX book_genre_genre_book_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX bookinstance_user_user_copy_idx '
+            'ON core_bookinstance_user (user_id, bookinstance_id)',
+            'DROP INDEX bookinstance_user_user_copy_idx',
+        ),
+    ]
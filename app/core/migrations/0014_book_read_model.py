@@ -0,0 +1,110 @@
+# Generated by Django 4.0.10 on 2026-10-18 07:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Columns copied from books as they are
+COLUMNS = (
+    'id', 'name', 'author_id', 'publishing_house_id', 'summary',
+    'number_of_pages', 'isbn', 'year_of_publish', 'cover', 'cover_status',
+    'cover_thumbnail', 'cover_medium', 'cover_webp', 'copies_total',
+    'copies_available', 'copies_on_loan', 'copies_reserved',
+)
+
+
+def fill_read_model(apps, schema_editor):
+    # Rows of existing books in batches, later changes are applied
+    # by book.read_model
+    Book = apps.get_model('core', 'Book')
+    BookReadModel = apps.get_model('core', 'BookReadModel')
+    through = Book.genre.through
+
+    books = Book.objects.order_by('id').values(
+        *COLUMNS,
+        author_first_name=models.F('author__first_name'),
+        author_last_name=models.F('author__last_name'),
+        publishing_house_name=models.F('publishing_house__name'),
+        book_modified=models.F('last_modified'),
+        author_modified=models.F('author__last_modified'),
+        publishing_house_modified=models.F('publishing_house__last_modified'),
+    )
+    last_id = 0
+    while True:
+        batch = list(books.filter(id__gt=last_id)[:1000])
+        if not batch:
+            break
+        last_id = batch[-1]['id']
+        genres = {}
+        for book_id, genre_id, name, modified in through.objects.filter(
+            book_id__in=[book['id'] for book in batch]
+        ).order_by('book_id', 'genre_id').values_list(
+            'book_id', 'genre_id', 'genre__name', 'genre__last_modified'
+        ):
+            genres.setdefault(book_id, []).append((genre_id, name, modified))
+
+        rows = []
+        for book in batch:
+            book_genres = genres.get(book['id'], [])
+            modified = [
+                book.pop('book_modified'), book.pop('author_modified'),
+                book.pop('publishing_house_modified'),
+                *(modified for _, _, modified in book_genres),
+            ]
+            rows.append(BookReadModel(
+                genre=[genre_id for genre_id, _, _ in book_genres],
+                genre_names=[name for _, name, _ in book_genres],
+                last_modified=max(
+                    (value for value in modified if value is not None),
+                    default=None
+                ),
+                **book
+            ))
+        BookReadModel.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookReadModel',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('author_first_name', models.CharField(max_length=70)),
+                ('author_last_name', models.CharField(max_length=70)),
+                ('publishing_house_name', models.CharField(max_length=60)),
+                ('summary', models.TextField()),
+                ('number_of_pages', models.IntegerField()),
+                ('isbn', models.CharField(max_length=28)),
+                ('year_of_publish', models.DateField()),
+                ('cover', models.CharField(max_length=100, null=True)),
+                ('cover_status', models.CharField(blank=True, default='', max_length=1)),
+                ('cover_thumbnail', models.CharField(max_length=100, null=True)),
+                ('cover_medium', models.CharField(max_length=100, null=True)),
+                ('cover_webp', models.CharField(max_length=100, null=True)),
+                ('genre', models.JSONField(default=list)),
+                ('genre_names', models.JSONField(default=list)),
+                ('copies_total', models.IntegerField(default=0)),
+                ('copies_available', models.IntegerField(default=0)),
+                ('copies_on_loan', models.IntegerField(default=0)),
+                ('copies_reserved', models.IntegerField(default=0)),
+                ('last_modified', models.DateTimeField(null=True)),
+                ('author', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.author')),
+                ('publishing_house', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.publishinghouse')),
+            ],
+            options={
+                'verbose_name': 'book read model',
+                'verbose_name_plural': 'book read models',
+                'ordering': ('-id',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='bookreadmodel',
+            index=models.Index(fields=['copies_available', 'id'], name='book_read_availability_idx'),
+        ),
+        migrations.RunPython(fill_read_model, migrations.RunPython.noop),
+    ]
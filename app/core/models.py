@@ -3,11 +3,14 @@ import uuid
 
 from django.contrib.auth.base_user import BaseUserManager, AbstractBaseUser
 from django.contrib.auth.models import PermissionsMixin
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from isbn_field import ISBNField
 
 from app import settings
+from core.storage import cover_storage, file_digest
 
 
 class TimeStampedMixin(models.Model):
@@ -59,11 +62,22 @@ class CatalogueMixin(TimeStampedMixin):
 
 
 def cover_image_file_path(instance, filename):
-    # Generate file path for new cover image
-    ext = filename.split('.')[-1]
-    filename = f'{uuid.uuid4()}.{ext}'
+    # Generate file path for new cover image, named by hash of its
+    # content, so identical covers are stored only once
+    ext = filename.split('.')[-1].lower()
+    digest = file_digest(instance.cover.file)
 
-    return os.path.join('upload/cover/', filename)
+    return os.path.join('upload/cover/', digest[:2], f'{digest}.{ext}')
+
+
+def cover_variant_file_path(cover_name, variant, ext):
+    # Generate file path for a resized cover image,
+    # every cover image has exactly one file per variant
+    digest = os.path.splitext(os.path.basename(cover_name))[0]
+
+    return os.path.join(
+        'upload/cover/', variant, digest[:2], f'{digest}.{ext}'
+    )
 
 
 class Author(TimeStampedMixin):
@@ -74,12 +88,24 @@ class Author(TimeStampedMixin):
         ordering = ['last_name', 'first_name']
         verbose_name = _('author')
         verbose_name_plural = _('authors')
+        indexes = [
+            GinIndex(
+                fields=['first_name'],
+                name='author_first_name_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+            GinIndex(
+                fields=['last_name'],
+                name='author_last_name_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ]
 
     def __str__(self):
         return f'{self.first_name} {self.last_name}'
 
 
-class PublishingHouse(models.Model):
+class PublishingHouse(TimeStampedMixin):
     name = models.CharField(max_length=60, unique=True)
 
     def __str__(self):
@@ -108,17 +134,138 @@ class Book(CatalogueMixin):
     number_of_pages = models.IntegerField()
     isbn = ISBNField(unique=True)
     year_of_publish = models.DateField()
-    cover = models.ImageField(null=True, upload_to=cover_image_file_path)
+    cover = models.ImageField(
+        null=True, upload_to=cover_image_file_path, storage=cover_storage
+    )
+    COVER_STATUS = (
+        ('', 'No cover'),
+        ('p', 'Pending'),
+        ('r', 'Ready'),
+        ('f', 'Failed')
+    )
+    cover_status = models.CharField(
+        max_length=1, choices=COVER_STATUS, blank=True, default=''
+    )
+    # Variants are generated from the cover in the background
+    cover_thumbnail = models.ImageField(null=True, blank=True, editable=False)
+    cover_medium = models.ImageField(null=True, blank=True, editable=False)
+    cover_webp = models.ImageField(null=True, blank=True, editable=False)
     genre = models.ManyToManyField(
         Genre,
         related_name='books',
         related_query_name='book',
     )
+    # Number of copies by loan status, kept up to date from book
+    # copies (see book.availability)
+    copies_total = models.IntegerField(default=0, editable=False)
+    copies_available = models.IntegerField(default=0, editable=False)
+    copies_on_loan = models.IntegerField(default=0, editable=False)
+    copies_reserved = models.IntegerField(default=0, editable=False)
+    # Weighted full-text document of name, author and summary,
+    # kept up to date by a database trigger (see migration 0006)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ('-id',)
         verbose_name = _('book')
         verbose_name_plural = _('books')
+        indexes = [
+            GinIndex(fields=['search_vector'], name='book_search_vector_idx'),
+            GinIndex(
+                fields=['name'],
+                name='book_name_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+            models.Index(
+                fields=['copies_available', 'id'],
+                name='book_availability_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class BookReadModel(models.Model):
+    # Denormalized book served by book lists and details: columns of the
+    # book, names of its author, publishing house and genres and counters
+    # of its copies in one row, read without joins. Rows share ids with
+    # books and are kept up to date by the application (see
+    # book.read_model), relations are plain columns without constraints.
+
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=255)
+    author = models.ForeignKey(
+        Author,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    author_first_name = models.CharField(max_length=70)
+    author_last_name = models.CharField(max_length=70)
+    publishing_house = models.ForeignKey(
+        PublishingHouse,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    publishing_house_name = models.CharField(max_length=60)
+    summary = models.TextField()
+    number_of_pages = models.IntegerField()
+    isbn = models.CharField(max_length=28)
+    year_of_publish = models.DateField()
+    # Names of cover files, stored by the storages of Book fields
+    cover = models.CharField(max_length=100, null=True)
+    cover_status = models.CharField(max_length=1, blank=True, default='')
+    cover_thumbnail = models.CharField(max_length=100, null=True)
+    cover_medium = models.CharField(max_length=100, null=True)
+    cover_webp = models.CharField(max_length=100, null=True)
+    # Arrays of ids and names of genres, both ordered by id
+    genre = models.JSONField(default=list)
+    genre_names = models.JSONField(default=list)
+    copies_total = models.IntegerField(default=0)
+    copies_available = models.IntegerField(default=0)
+    copies_on_loan = models.IntegerField(default=0)
+    copies_reserved = models.IntegerField(default=0)
+    # Newest modification of the book, its author, publishing house
+    # and genres, validator of conditional requests
+    last_modified = models.DateTimeField(null=True)
+
+    # Filters by relations are those of books (see book.filters)
+    source_model = Book
+
+    class Meta:
+        ordering = ('-id',)
+        verbose_name = _('book read model')
+        verbose_name_plural = _('book read models')
+        indexes = [
+            models.Index(
+                fields=['copies_available', 'id'],
+                name='book_read_availability_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class CoverImage(TimeStampedMixin):
+    # Stored cover image shared by all books with an identical cover.
+    # Images no book refers to are deleted by the collect_covers command.
+
+    name = models.CharField(max_length=255, unique=True)
+    ref_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _('cover image')
+        verbose_name_plural = _('cover images')
+        indexes = [
+            models.Index(
+                fields=['last_modified'],
+                name='cover_image_unreferenced_idx',
+                condition=models.Q(ref_count=0),
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -155,6 +302,62 @@ class BookInstance(models.Model):
         return f'{self.id} {self.book.name}'
 
 
+class Hold(TimeStampedMixin):
+    # Place of a user in the queue for a book, queues are served
+    # in order of ids (see book.loans)
+
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.CASCADE,
+        related_name='holds',
+        related_query_name='hold'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='holds'
+    )
+    HOLD_STATUS = (
+        ('w', 'Waiting'),
+        ('r', 'Ready'),
+        ('f', 'Fulfilled'),
+        ('c', 'Cancelled')
+    )
+    status = models.CharField(
+        max_length=1, choices=HOLD_STATUS, default='w'
+    )
+    # Copy reserved for the user once the hold is ready
+    copy = models.ForeignKey(
+        BookInstance,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='+'
+    )
+
+    class Meta:
+        verbose_name = _('hold')
+        verbose_name_plural = _('holds')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['book', 'user'],
+                condition=models.Q(status__in=['w', 'r']),
+                name='hold_one_active_per_user',
+            ),
+        ]
+        indexes = [
+            # Head of a queue and holds ahead of a position are
+            # read from this index only
+            models.Index(
+                fields=['book', 'id'],
+                name='hold_queue_idx',
+                condition=models.Q(status='w'),
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.book}'
+
+
 class UserManager(BaseUserManager):
 
     def create_user(self, name, email, password=None, **extra_fields):
@@ -0,0 +1,42 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# JSON of the API encoded by orjson, when it is installed. Responses are
+# byte for byte the ones of JSONRenderer: types orjson would write
+# differently (dates, decimals, lazy strings, ...) are passed to the
+# encoder of JSONRenderer, indented and ASCII only output is left to it.
+# Without orjson both classes behave as the ones of rest_framework.
+
+_encoder = JSONEncoder()
+
+OPTIONS = 0 if orjson is None else \
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | \
+    orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.ensure_ascii or \
+                self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_encoder.default, option=OPTIONS)
+        except orjson.JSONEncodeError:
+            # e.g. integers above 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escaped by JSONRenderer, they end lines in JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028') \
+                .replace(b'\xe2\x80\xa9', b'\\u2029')
+
+        return ret
@@ -0,0 +1,113 @@
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# Reads of safe requests to views with 'replica_reads' go to one of
+# DATABASE_REPLICAS (chosen by core.middleware.ReplicaReadMiddleware),
+# writes and all queries outside of such requests go to the primary.
+
+_read_alias = ContextVar('read_alias', default=None)
+
+# Models always read from the primary, a token created a moment
+# ago has to authenticate the next request and a revoked one must not
+# (see user.authentication, its generations are in the database cache)
+PRIMARY_MODELS = ('authtoken.token', 'django_cache.cacheentry')
+
+# Seconds since the last transaction replayed by a PostgreSQL standby,
+# 0 when it replayed everything it received or is not a standby
+LAG_SQL = '''
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery()
+            OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+        THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+'''
+
+_lag = {}
+
+
+def set_read_alias(alias):
+    # Database of reads in the current request, None for the primary
+    _read_alias.set(alias)
+
+
+def get_read_alias():
+    return _read_alias.get()
+
+
+def _measure_lag(alias):
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            return float(cursor.fetchone()[0])
+    except DatabaseError:
+        # Unreachable replica is never used
+        return None
+
+
+def replica_lag(alias):
+    # Replication lag of the replica in seconds (None when unreachable),
+    # measured at most once per REPLICA_LAG_CHECK_INTERVAL by a process
+    now = time.monotonic()
+    checked = _lag.get(alias)
+    if checked is None or now - checked[0] >= \
+            settings.REPLICA_LAG_CHECK_INTERVAL:
+        checked = (now, _measure_lag(alias))
+        _lag[alias] = checked
+
+    return checked[1]
+
+
+def choose_replica():
+    # Any replica behind the primary by at most REPLICA_MAX_LAG seconds,
+    # None falls back to the primary
+    replicas = [
+        alias for alias in settings.DATABASE_REPLICAS
+        if (lag := replica_lag(alias)) is not None
+        and lag <= settings.REPLICA_MAX_LAG
+    ]
+
+    return random.choice(replicas) if replicas else None
+
+
+class ReplicaRouter:
+    # Route reads to the replica chosen for the current request
+
+    def db_for_read(self, model, **hints):
+        alias = get_read_alias()
+        # Entries of the database cache have no label, only its parts
+        label = f'{model._meta.app_label}.{model._meta.model_name}'
+        if alias is None or label in PRIMARY_MODELS:
+            return None
+        # Reads inside a transaction see its own writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get the schema through replication
+        if db in settings.DATABASE_REPLICAS:
+            return False
+
+        return None
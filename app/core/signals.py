@@ -0,0 +1,27 @@
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from core import health
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    health.record('connections_opened')
+
+
+@receiver(request_started)
+def check_connections(sender, **kwargs):
+    # Backport of CONN_HEALTH_CHECKS of Django 4.1: persistent connections
+    # which died while idle (e.g. the server restarted) are closed before
+    # the request, its first query opens a new one instead of failing
+    health.record('requests')
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        if not connection.settings_dict.get('CONN_HEALTH_CHECKS'):
+            continue
+        if not connection.is_usable():
+            health.record('health_checks_failed')
+            connection.close()
@@ -0,0 +1,114 @@
+import hashlib
+import os
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import MemoryFileUploadHandler, \
+    TemporaryFileUploadHandler
+
+# Covers are stored under a SHA-256 hash of their content. The hash is
+# taken by the upload handlers while the request body is streamed, so
+# naming an upload does not read it once more.
+
+
+def file_digest(file):
+    # Hex SHA-256 of the file, computed here only when the file
+    # did not come through one of the hashing upload handlers
+    digest = getattr(file, 'content_hash', None)
+    if digest is None:
+        hasher = hashlib.sha256()
+        for chunk in file.chunks():
+            hasher.update(chunk)
+        file.seek(0)
+        digest = hasher.hexdigest()
+
+    return digest
+
+
+class HashingUploadMixin:
+    # Hash the chunks this handler stores and
+    # attach the digest to the uploaded file
+
+    def new_file(self, *args, **kwargs):
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        # Data returned is passed on to the next handler, not stored here
+        data = super().receive_data_chunk(raw_data, start)
+        if data is None:
+            self.hasher.update(raw_data)
+
+        return data
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.content_hash = self.hasher.hexdigest()
+
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin,
+                                     MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin,
+                                        TemporaryFileUploadHandler):
+    pass
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    # File system storage for files named by a hash of their content.
+    # Saving a file which is already stored does not write anything,
+    # it only touches the file: its modification time tells
+    # delete_unused the file is in use again.
+
+    def get_available_name(self, name, max_length=None):
+        # Same name means same content, the existing file can be reused
+        return name
+
+    def _save(self, name, content):
+        try:
+            os.utime(self.path(name))
+            return name
+        except FileNotFoundError:
+            pass
+
+        # Written under a unique name and moved into place, so readers
+        # never see a partial file and concurrent saves do not clash
+        part_name = super()._save(f'{name}.{uuid.uuid4().hex}.part', content)
+        os.replace(self.path(part_name), self.path(name))
+
+        return name
+
+    def saved_since(self, name, since):
+        # Whether the file was saved (or saved again) at or after since,
+        # a timestamp. Missing files were not.
+        try:
+            return os.stat(self.path(name)).st_mtime >= since
+        except FileNotFoundError:
+            return False
+
+    def delete_unused(self, name, since):
+        # Delete the file unless it was saved again at or after since,
+        # return whether it is gone. It is moved aside before the check:
+        # a save touching it before finds it in place and it is kept,
+        # a save after finds it missing and writes it once more.
+        path = self.path(name)
+        aside = f'{path}.{uuid.uuid4().hex}.deleted'
+        try:
+            os.rename(path, aside)
+        except FileNotFoundError:
+            return True
+        if os.stat(aside).st_mtime >= since:
+            # Same name, same content as a file written meanwhile
+            os.replace(aside, path)
+            return False
+        os.remove(aside)
+
+        return True
+
+
+cover_storage = ContentAddressedStorage()
@@ -1,23 +1,320 @@
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 from django.db import OperationalError
+from django.db.models import Count
 from django.test import TestCase
-from django.core.management import call_command
+from django.core.management import call_command, CommandError
+
+from rest_framework.authtoken.models import Token
+
+from book import availability
+from core.models import Author, Book, BookInstance, Genre, PublishingHouse
 
 class CommandTests(TestCase):
-    
-    moduleName = 'django.db.utils.ConnectionHandler.__getitem__'
+
+    probe = 'core.management.commands.wait_for_db.Command._probe'
 
     def test_wait_for_db_ready(self):
         # Test waiting for db, when db is ready
-        with patch(self.moduleName) as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
-    
+        with patch(self.probe) as probe:
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(probe.call_count, 1)
+
+    def test_wait_for_db_queries(self):
+        # Test db is probed with a query, not only looked up
+        with patch('django.db.backends.utils.CursorWrapper.execute') as ex:
+            call_command('wait_for_db', stdout=StringIO())
+            ex.assert_called_once_with('SELECT 1')
+
+    def test_wait_for_db_reconnects(self):
+        # Test a failed connection is closed before the next probe
+        with patch(
+            'core.management.commands.wait_for_db.connections'
+        ) as connections:
+            connection = connections.__getitem__.return_value
+            connection.cursor.side_effect = OperationalError
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', '--timeout=0', stdout=StringIO())
+            connection.close.assert_called_once_with()
+
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
-        
-        with patch(self.moduleName) as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+        # Test retrying with exponential backoff
+        with patch(self.probe) as probe:
+            probe.side_effect = [OperationalError] * 5 + [None]
+            call_command('wait_for_db', '--max-delay=1', stdout=StringIO())
+            self.assertEqual(probe.call_count, 6)
+            self.assertEqual(
+                [call.args[0] for call in ts.call_args_list],
+                [0.1, 0.2, 0.4, 0.8, 1]
+            )
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        # Test giving up when db does not come up in time
+        with patch(self.probe, side_effect=OperationalError('down')), \
+                patch('time.monotonic', side_effect=[0, 1, 2, 3]):
+            with self.assertRaises(CommandError):
+                call_command(
+                    'wait_for_db', '--timeout=2', stdout=StringIO()
+                )
+            self.assertEqual(ts.call_count, 1)
+
+
+CATALOGUE_ROWS = [
+    {
+        'isbn': '978-83-7578-063-5', 'name': 'Wiedzmin',
+        'summary': 'Streszczenie', 'number_of_pages': '300',
+        'year_of_publish': '2000-11-11', 'author_first_name': 'Andrzej',
+        'author_last_name': 'Sapkowski', 'publishing_house': 'SuperNowa',
+        'genres': 'Fantasy|Przygodowa', 'copies': '2',
+    },
+    {
+        'isbn': '9780000000019', 'name': 'Solaris',
+        'summary': 'Streszczenie', 'number_of_pages': '200',
+        'year_of_publish': '1961-01-01', 'author_first_name': 'Stanislaw',
+        'author_last_name': 'Lem', 'publishing_house': 'SuperNowa',
+        'genres': 'Fantasy', 'copies': '1',
+    },
+    {
+        'isbn': 'not an isbn', 'name': 'Broken',
+        'summary': 'Streszczenie', 'number_of_pages': '200',
+        'year_of_publish': '1961-01-01', 'author_first_name': 'Stanislaw',
+        'author_last_name': 'Lem', 'publishing_house': 'SuperNowa',
+        'genres': '', 'copies': '1',
+    },
+]
+
+
+class ImportCatalogueCommandTests(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _write_csv(self, rows):
+        path = os.path.join(self.dir.name, 'catalogue.csv')
+        with open(path, 'w') as file:
+            file.write(','.join(rows[0]) + '\n')
+            for row in rows:
+                file.write(','.join(row.values()) + '\n')
+
+        return path
+
+    def _write_jsonl(self, rows):
+        path = os.path.join(self.dir.name, 'catalogue.jsonl')
+        with open(path, 'w') as file:
+            for row in rows:
+                row = dict(row, genres=row['genres'].split('|'))
+                file.write(json.dumps(row) + '\n')
+
+        return path
+
+    def _import(self, path, *args):
+        out = StringIO()
+        call_command('import_catalogue', path, *args, stdout=out)
+
+        return out.getvalue()
+
+    def _assert_imported(self):
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(PublishingHouse.objects.count(), 1)
+        self.assertEqual(Genre.objects.count(), 2)
+        self.assertEqual(BookInstance.objects.count(), 3)
+        book = Book.objects.get(isbn='9788375780635')
+        self.assertEqual(str(book.author), 'Andrzej Sapkowski')
+        self.assertEqual(
+            sorted(book.genre.values_list('name', flat=True)),
+            ['Fantasy', 'Przygodowa']
+        )
+        self.assertEqual(book.copies_total, book.books.count())
+        self.assertEqual(book.copies_available, book.books.count())
+
+    def test_import_csv(self):
+        out = self._import(self._write_csv(CATALOGUE_ROWS), '--batch-size=2')
+
+        self._assert_imported()
+        self.assertIn('1 skipped', out)
+        self.assertIn('rows/s', out)
+
+    def test_invalid_columns_are_skipped(self):
+        # Test rows the database would reject are reported, not imported
+        rows = CATALOGUE_ROWS[:2] + [
+            dict(CATALOGUE_ROWS[0], isbn='9780306406157',
+                 year_of_publish='not-a-date'),
+            dict(CATALOGUE_ROWS[0], isbn='9780306406157', name='N' * 256),
+            dict(CATALOGUE_ROWS[0], isbn='9780306406157',
+                 summary='S' * 1001),
+            dict(CATALOGUE_ROWS[0], isbn='9780306406157',
+                 number_of_pages='many'),
+            dict(CATALOGUE_ROWS[0], isbn='9780306406157',
+                 genres='G' * 256),
+        ]
+
+        out = self._import(self._write_csv(rows))
+
+        self._assert_imported()
+        self.assertIn('5 skipped', out)
+
+    def test_import_jsonl(self):
+        self._import(self._write_jsonl(CATALOGUE_ROWS))
+
+        self._assert_imported()
+
+    def test_import_again_is_idempotent(self):
+        # Test existing books are updated and no copies are duplicated
+        path = self._write_csv(CATALOGUE_ROWS)
+        self._import(path)
+        rows = [dict(CATALOGUE_ROWS[0], name='Ostatnie zyczenie')]
+        self._import(self._write_csv(rows))
+
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(BookInstance.objects.count(), 3)
+        self.assertTrue(Book.objects.filter(name='Ostatnie zyczenie').exists())
+
+    def test_resume_from_checkpoint(self):
+        # Test import continues after the last committed batch
+        path = self._write_csv(CATALOGUE_ROWS)
+        checkpoint = os.path.join(self.dir.name, 'checkpoint')
+
+        with patch(
+            'core.management.commands.import_catalogue.Command._report',
+            side_effect=[None, KeyboardInterrupt]
+        ):
+            with self.assertRaises(KeyboardInterrupt):
+                self._import(
+                    path, '--batch-size=1', f'--checkpoint={checkpoint}'
+                )
+        self.assertEqual(Book.objects.count(), 2)
+
+        Book.objects.get(isbn='9788375780635').delete()
+        self._import(
+            path, '--batch-size=1', f'--checkpoint={checkpoint}', '--resume'
+        )
+
+        self.assertFalse(Book.objects.filter(isbn='9788375780635').exists())
+        self.assertFalse(os.path.exists(checkpoint))
+
+
+class ReconcileAvailabilityCommandTests(TestCase):
+
+    def test_drifted_counters_are_fixed(self):
+        author = Author.objects.create(first_name='Stanislaw', last_name='Lem')
+        publishing_house = PublishingHouse.objects.create(name='SuperNowa')
+        books = [
+            Book.objects.create(
+                name=f'Book {i}',
+                author=author,
+                publishing_house=publishing_house,
+                summary='',
+                number_of_pages=100,
+                isbn=isbn,
+                year_of_publish='2000-01-01',
+            )
+            for i, isbn in enumerate(['9788375780635', '9780000000019'])
+        ]
+        BookInstance.objects.create(book=books[0], status='a')
+        BookInstance.objects.create(book=books[0], status='o')
+        Book.objects.filter(pk=books[0].pk).update(
+            copies_total=5, copies_on_loan=0
+        )
+
+        out = StringIO()
+        call_command('reconcile_availability', '--batch-size=1', stdout=out)
+
+        books[0].refresh_from_db()
+        self.assertEqual(books[0].copies_total, 2)
+        self.assertEqual(books[0].copies_available, 1)
+        self.assertEqual(books[0].copies_on_loan, 1)
+        self.assertIn('2 books checked, 1 fixed', out.getvalue())
+
+
+class GenerateCatalogueCommandTests(TestCase):
+
+    def _generate(self, books, *args):
+        call_command(
+            'generate_catalogue', f'--books={books}', '--genres=5',
+            '--authors=10', '--publishing-houses=3', '--batch-size=25',
+            *args, stdout=StringIO()
+        )
+
+    def test_generate_catalogue(self):
+        self._generate(60, '--users=5')
+
+        self.assertEqual(Book.objects.count(), 60)
+        self.assertEqual(Genre.objects.count(), 5)
+        self.assertEqual(Token.objects.count(), 5)
+        # Counters match the generated copies
+        self.assertEqual(
+            availability.reconcile(Book.objects.values_list('pk')), 0
+        )
+        # Copies which are not available are borrowed by someone
+        self.assertFalse(
+            BookInstance.objects.exclude(status='a')
+            .filter(user__isnull=True).exists()
+        )
+        # The most popular genre has more books than the least popular
+        books = Genre.objects.annotate(count=Count('book')) \
+            .order_by('pk').values_list('count', flat=True)
+        self.assertGreater(books[0], books[4])
+
+    def test_generate_again_adds_missing(self):
+        self._generate(30)
+        self._generate(50)
+
+        self.assertEqual(Book.objects.count(), 50)
+        self.assertEqual(Author.objects.count(), 10)
+        self.assertEqual(Genre.objects.count(), 5)
+
+
+class BenchmarkApiCommandTests(TestCase):
+
+    def setUp(self):
+        call_command(
+            'generate_catalogue', '--books=30', '--genres=3', '--authors=5',
+            '--publishing-houses=2', '--users=2', stdout=StringIO()
+        )
+        self.dir = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.dir.name, 'api.json')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _benchmark(self, *args):
+        out = StringIO()
+        call_command(
+            'benchmark_api', '--repeat=2', '--warmup=0',
+            f'--output={self.output}', *args, stdout=out
+        )
+        with open(self.output) as output:
+            return json.load(output), out.getvalue()
+
+    def test_results_are_written(self):
+        report, _ = self._benchmark()
+
+        self.assertEqual(report['dataset']['books'], 30)
+        for name in ('book-list', 'book-detail', 'book-list-genre',
+                     'copy-list', 'user-me', 'user-token'):
+            result = report['scenarios'][name]
+            self.assertEqual(result['errors'], 0, name)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertGreater(report['scenarios']['book-list']['queries'], 0)
+
+    def test_regression_against_baseline(self):
+        report, _ = self._benchmark('--scenarios=book-list')
+        report['scenarios']['book-list']['queries'] -= 1
+        baseline = os.path.join(self.dir.name, 'baseline.json')
+        with open(baseline, 'w') as output:
+            json.dump(report, output)
+
+        with self.assertRaisesMessage(CommandError, 'book-list'):
+            self._benchmark(
+                '--scenarios=book-list', f'--baseline={baseline}',
+                '--fail-on-regression'
+            )
@@ -0,0 +1,106 @@
+import gzip
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import compression
+from core.models import Author, Book, PublishingHouse
+
+BOOK_URL = reverse('book:book-list')
+BOOK_EXPORT_URL = reverse('book:book-export')
+
+
+@override_settings(COMPRESSION_ENCODINGS=['br', 'gzip'])
+@patch('core.compression.brotli', object())
+class NegotiateTests(SimpleTestCase):
+
+    def test_first_accepted_encoding_of_the_server(self):
+        self.assertEqual(compression.negotiate('gzip, deflate, br'), 'br')
+        self.assertEqual(compression.negotiate('*'), 'br')
+
+    def test_quality_values(self):
+        self.assertEqual(compression.negotiate('br;q=0, gzip;q=0.5'), 'gzip')
+        self.assertIsNone(compression.negotiate('gzip;q=0, *;q=0'))
+        self.assertIsNone(compression.negotiate('gzip;q=zero'))
+
+    def test_identity(self):
+        self.assertIsNone(compression.negotiate(''))
+        self.assertIsNone(compression.negotiate('identity, deflate'))
+
+    def test_brotli_needs_its_package(self):
+        with patch('core.compression.brotli', None):
+            self.assertEqual(compression.negotiate('br, gzip'), 'gzip')
+            self.assertIsNone(compression.negotiate('br'))
+
+
+@override_settings(COMPRESSION_ENCODINGS=['gzip'], COMPRESSION_MIN_SIZE=512)
+class CompressionMiddlewareTests(TestCase):
+    # Test responses are compressed when it is worth it
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            name='TestName', email='gzip@test.com', password='gzippass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        author = Author.objects.create(first_name='Andrzej', last_name='S')
+        publishing_house = PublishingHouse.objects.create(name='SuperNowa')
+        for i, isbn in enumerate(
+            ['9788375780635', '9780000000019', '9780306406157']
+        ):
+            Book.objects.create(
+                name=f'Book {i}', author=author,
+                publishing_house=publishing_house, summary='Summary ' * 50,
+                number_of_pages=100, isbn=isbn, year_of_publish='2000-01-01',
+            )
+
+    def test_accepted_encoding_is_used(self):
+        plain = self.client.get(BOOK_URL)
+
+        res = self.client.get(BOOK_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertEqual(res['Content-Length'], str(len(res.content)))
+        self.assertLess(len(res.content), len(plain.content))
+        self.assertEqual(gzip.decompress(res.content), plain.content)
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+    def test_etag_is_weak(self):
+        res = self.client.get(BOOK_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertTrue(res['ETag'].startswith('W/"'))
+        res = self.client.get(
+            BOOK_URL, HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=res['ETag']
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(COMPRESSION_MIN_SIZE=1024 * 1024)
+    def test_small_responses_are_not_compressed(self):
+        res = self.client.get(BOOK_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertNotIn('Content-Encoding', res)
+
+    @override_settings(COMPRESSION_ENCODINGS=[])
+    def test_compression_can_be_turned_off(self):
+        res = self.client.get(BOOK_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertNotIn('Content-Encoding', res)
+
+    def test_streamed_responses_are_compressed(self):
+        res = self.client.get(BOOK_EXPORT_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        content = gzip.decompress(b''.join(res.streaming_content))
+        self.assertEqual(
+            {json.loads(line)['name'] for line in content.splitlines()},
+            {'Book 0', 'Book 1', 'Book 2'}
+        )
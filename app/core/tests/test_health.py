@@ -0,0 +1,129 @@
+from unittest.mock import MagicMock, patch
+
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+
+from core import health, signals
+
+HEALTH_URL = reverse('health')
+READY_URL = reverse('ready')
+
+
+def sample_connection(usable=True, health_checks=True):
+    # Open connection outside of a transaction
+    connection = MagicMock(in_atomic_block=False)
+    connection.settings_dict = {'CONN_HEALTH_CHECKS': health_checks}
+    connection.is_usable.return_value = usable
+
+    return connection
+
+
+class HealthEndpointTests(TestCase):
+    # Test liveness and readiness probes
+
+    def test_health(self):
+        res = self.client.get(HEALTH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['status'], 'ok')
+        self.assertIn('connection_reuse', res.json()['connections'])
+
+    def test_requests_are_counted(self):
+        before = health.get_stats()['requests']
+
+        res = self.client.get(HEALTH_URL)
+
+        self.assertEqual(
+            res.json()['connections']['requests'], before + 1
+        )
+
+    def test_ready(self):
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        default = res.json()['databases']['default']
+        self.assertTrue(default['ok'])
+        self.assertGreaterEqual(default['latency_ms'], 0)
+        self.assertTrue(default['reused_connection'])
+
+    @patch('core.views.round_trip', side_effect=OperationalError)
+    def test_not_ready_without_database(self, round_trip):
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.json()['databases']['default'], {
+            'ok': False, 'error': 'OperationalError'
+        })
+
+    @override_settings(READY_MAX_LATENCY_MS=100)
+    @patch('core.views.round_trip', return_value=150.0)
+    def test_not_ready_when_database_is_slow(self, round_trip):
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    @patch('core.routers.replica_lag', return_value=0.5)
+    def test_replica_down_does_not_fail_readiness(self, replica_lag):
+        def round_trip(alias):
+            if alias == 'replica':
+                raise OperationalError
+            return 1.0
+
+        with patch('core.views.round_trip', side_effect=round_trip), \
+                patch('core.views.connections', MagicMock()):
+            res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(res.json()['databases']['replica']['ok'])
+
+
+class ConnectionHealthCheckTests(TestCase):
+    # Test persistent connections are checked before requests
+
+    def _check(self, *connections):
+        with patch('core.signals.connections') as handler:
+            handler.all.return_value = connections
+            signals.check_connections(sender=None)
+
+    def test_dead_connection_is_closed(self):
+        connection = sample_connection(usable=False)
+        before = health.get_stats()['health_checks_failed']
+
+        self._check(connection)
+
+        connection.close.assert_called_once()
+        self.assertEqual(
+            health.get_stats()['health_checks_failed'], before + 1
+        )
+
+    def test_usable_connection_is_kept(self):
+        connection = sample_connection()
+
+        self._check(connection)
+
+        connection.close.assert_not_called()
+
+    def test_connections_without_health_checks_are_skipped(self):
+        connection = sample_connection(usable=False, health_checks=False)
+
+        self._check(connection)
+
+        connection.is_usable.assert_not_called()
+
+    def test_connection_in_transaction_is_skipped(self):
+        connection = sample_connection(usable=False)
+        connection.in_atomic_block = True
+
+        self._check(connection)
+
+        connection.is_usable.assert_not_called()
+
+    def test_connection_reuse(self):
+        with patch.dict(health._stats, {
+            'requests': 10, 'connections_opened': 2
+        }):
+            self.assertEqual(health.get_stats()['connection_reuse'], 0.8)
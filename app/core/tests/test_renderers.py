@@ -0,0 +1,94 @@
+import datetime
+import decimal
+import io
+import uuid
+from collections import OrderedDict
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+DATA = OrderedDict([
+    ('id', 1),
+    ('name', 'Wiedźmin "Ostatnie życzenie"'),
+    ('separators', 'line\u2028paragraph\u2029'),
+    ('price', decimal.Decimal('12.50')),
+    ('ratio', 0.25),
+    ('uuid', uuid.UUID('12345678-1234-5678-1234-567812345678')),
+    ('created', datetime.datetime(2022, 5, 1, 12, 30, 15, 123456)),
+    ('date', datetime.date(2022, 5, 1)),
+    ('time', datetime.time(8, 15)),
+    ('lazy', gettext_lazy('This field is required.')),
+    ('numbers', {1: 'one', 2: 'two'}),
+    ('nested', [{'genre': [1, 2]}, None, True, (3, 4)]),
+])
+
+
+class FastJSONRendererTests(TestCase):
+    # Test responses are the same as rendered by JSONRenderer
+
+    def test_same_bytes_as_json_renderer(self):
+        self.assertEqual(
+            FastJSONRenderer().render(DATA), JSONRenderer().render(DATA)
+        )
+
+    def test_indented_output_is_left_to_json_renderer(self):
+        media_type = 'application/json; indent=2'
+
+        self.assertEqual(
+            FastJSONRenderer().render(DATA, media_type),
+            JSONRenderer().render(DATA, media_type)
+        )
+
+    def test_large_integers(self):
+        data = {'big': 2 ** 70}
+
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_none_is_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_without_orjson(self):
+        with patch('core.renderers.orjson', None):
+            self.assertEqual(
+                FastJSONRenderer().render(DATA), JSONRenderer().render(DATA)
+            )
+
+
+class FastJSONParserTests(TestCase):
+
+    def test_same_data_as_json_parser(self):
+        content = JSONRenderer().render(DATA)
+
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(content)),
+            JSONParser().parse(io.BytesIO(content))
+        )
+
+    def test_invalid_json(self):
+        for content in (b'{"name": ', b'{"ratio": NaN}', b'\xff'):
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(io.BytesIO(content))
+
+    def test_other_charsets_are_left_to_json_parser(self):
+        content = '{"name": "Wiedźmin"}'.encode('utf-16')
+
+        data = FastJSONParser().parse(
+            io.BytesIO(content), parser_context={'encoding': 'utf-16'}
+        )
+
+        self.assertEqual(data, {'name': 'Wiedźmin'})
+
+    def test_without_orjson(self):
+        with patch('core.parsers.orjson', None):
+            data = FastJSONParser().parse(io.BytesIO(b'{"id": 1}'))
+
+        self.assertEqual(data, {'id': 1})
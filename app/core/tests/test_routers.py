@@ -0,0 +1,197 @@
+from unittest.mock import patch
+
+from http.cookies import SimpleCookie
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TransactionTestCase, \
+    override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from book import views as book_views
+from core import middleware, routers
+from core.models import Book
+from user import views as user_views
+from user.authentication import CachedTokenAuthentication, token_cache
+
+BOOK_LIST = book_views.BookViewSet.as_view({'get': 'list', 'post': 'create'})
+CREATE_TOKEN = user_views.CreateTokenView.as_view()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_MAX_LAG=1)
+class ReplicaRoutingTests(TransactionTestCase):
+    # Test choice of the database for reads, no query reaches a replica.
+    # Tests run outside of a transaction, reads inside one use the primary.
+
+    def setUp(self):
+        routers._lag.clear()
+        # Replica in sync unless a test says otherwise
+        patcher = patch('core.routers._measure_lag', return_value=0.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+        self.middleware = middleware.ReplicaReadMiddleware(
+            lambda request: HttpResponse()
+        )
+        self.router = routers.ReplicaRouter()
+
+    def tearDown(self):
+        routers.set_read_alias(None)
+
+    def _read_alias(self, method='get', view=BOOK_LIST):
+        # Database of reads while the middleware handles the request,
+        # the factory sends cookies set by earlier responses
+        request = getattr(self.factory, method)('/')
+        self.middleware.process_view(request, view, (), {})
+
+        return self.router.db_for_read(Book)
+
+    def _write(self, status=201):
+        request = self.factory.post('/')
+        self.middleware.process_view(request, BOOK_LIST, (), {})
+        response = self.middleware.process_response(
+            request, HttpResponse(status=status)
+        )
+        self.factory.cookies.update(response.cookies)
+
+    def test_safe_request_reads_from_replica(self):
+        self.assertEqual(self._read_alias(), 'replica')
+
+    def test_unsafe_request_reads_from_primary(self):
+        self.assertIsNone(self._read_alias('post'))
+
+    def test_views_without_replica_reads_use_primary(self):
+        self.assertIsNone(self._read_alias(view=CREATE_TOKEN))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        self.assertIsNone(self._read_alias())
+
+    def test_client_sticks_to_primary_after_write(self):
+        self._write()
+
+        self.assertIsNone(self._read_alias())
+        self.factory.cookies = SimpleCookie()
+        self.assertEqual(self._read_alias(), 'replica')
+
+    def test_forged_stickiness_is_ignored(self):
+        self.factory.cookies['db_primary'] = '1'
+
+        self.assertEqual(self._read_alias(), 'replica')
+
+    def test_routed_read_does_not_query_primary(self):
+        # Test neither stickiness nor a cached token costs a query
+        # of the primary before reads go to the replica
+        user = get_user_model().objects.create_user(
+            name='TestName', email='routed@test.com', password='routedpass'
+        )
+        token = Token.objects.create(user=user)
+        token_cache.clear()
+        self._write()
+        self.factory.cookies = SimpleCookie()
+        request = self.factory.get(
+            '/', HTTP_AUTHORIZATION=f'Token {token.key}'
+        )
+        CachedTokenAuthentication().authenticate(request)
+
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+            self.middleware.process_view(request, BOOK_LIST, (), {})
+            CachedTokenAuthentication().authenticate(request)
+
+        self.assertEqual(self.router.db_for_read(Book), 'replica')
+        self.assertEqual(len(queries), 0)
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    def test_stickiness_expires(self):
+        self._write()
+
+        self.assertEqual(self._read_alias(), 'replica')
+
+    def test_failed_write_does_not_stick(self):
+        self._write(status=400)
+
+        self.assertEqual(self._read_alias(), 'replica')
+
+    def test_alias_is_reset_after_response(self):
+        request = self.factory.get('/')
+        self.middleware.process_view(request, BOOK_LIST, (), {})
+
+        self.middleware.process_response(request, HttpResponse())
+
+        self.assertIsNone(self.router.db_for_read(Book))
+
+    def test_streamed_response_reads_from_replica(self):
+        request = self.factory.get('/')
+        self.middleware.process_view(request, BOOK_LIST, (), {})
+        response = StreamingHttpResponse(
+            str(self.router.db_for_read(Book)) for _ in range(2)
+        )
+
+        response = self.middleware.process_response(request, response)
+
+        self.assertIsNone(self.router.db_for_read(Book))
+        self.assertEqual(b''.join(response), b'replicareplica')
+        self.assertIsNone(self.router.db_for_read(Book))
+
+    @patch('core.routers._measure_lag', return_value=5.0)
+    def test_lagging_replica_falls_back_to_primary(self, measure_lag):
+        self.assertIsNone(self._read_alias())
+
+    @patch('core.routers._measure_lag', return_value=None)
+    def test_unreachable_replica_falls_back_to_primary(self, measure_lag):
+        self.assertIsNone(self._read_alias())
+
+    @override_settings(DATABASE_REPLICAS=['replica', 'lagging'])
+    def test_lagging_replica_is_skipped(self):
+        lags = {'replica': 0.1, 'lagging': 30.0}
+        with patch('core.routers._measure_lag', side_effect=lags.get):
+            aliases = {self._read_alias() for _ in range(20)}
+
+        self.assertEqual(aliases, {'replica'})
+
+    @override_settings(REPLICA_LAG_CHECK_INTERVAL=60)
+    def test_lag_is_measured_once_per_interval(self):
+        with patch('core.routers._measure_lag', return_value=0.0) as measure:
+            for _ in range(5):
+                self._read_alias()
+
+        self.assertEqual(measure.call_count, 1)
+
+    def test_reads_in_transaction_use_primary(self):
+        routers.set_read_alias('replica')
+
+        with transaction.atomic():
+            self.assertIsNone(self.router.db_for_read(Book))
+
+    def test_tokens_are_read_from_primary(self):
+        routers.set_read_alias('replica')
+
+        self.assertIsNone(self.router.db_for_read(Token))
+        self.assertEqual(
+            self.router.db_for_read(get_user_model()), 'replica'
+        )
+
+    def test_writes_and_migrations_use_primary(self):
+        routers.set_read_alias('replica')
+
+        self.assertEqual(self.router.db_for_write(Book), 'default')
+        self.assertFalse(self.router.allow_migrate('replica', 'core'))
+        self.assertIsNone(self.router.allow_migrate('default', 'core'))
+
+    def test_api_write_sticks_client_to_primary(self):
+        user = get_user_model().objects.create_user(
+            name='TestName', email='router@test.com', password='routerpass'
+        )
+        token = Token.objects.create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        res = client.post(reverse('book:genre-list'), {'name': 'Fantasy'})
+
+        self.assertEqual(res.status_code, 201)
+        self.factory.cookies = client.cookies
+        self.assertTrue(middleware.is_sticky(self.factory.get('/')))
@@ -0,0 +1,125 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import timing
+from core.models import Author, Book, Genre, PublishingHouse
+
+BOOK_URL = reverse('book:book-list')
+METRICS_URL = reverse('metrics')
+
+
+def server_timing(res):
+    # Metrics of the Server-Timing header by name
+    metrics = {}
+    for metric in res['Server-Timing'].split(', '):
+        name, *params = metric.split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+
+    return metrics
+
+
+class RequestTimingTests(TestCase):
+    # Test Server-Timing headers and histograms of /metrics
+
+    def setUp(self):
+        timing.reset()
+        self.user = get_user_model().objects.create_user(
+            name='Staff', email='staff@test.com', password='staffpass',
+            is_staff=True,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        genre = Genre.objects.create(name='Fantasy')
+        for i in range(3):
+            book = Book.objects.create(
+                name=f'Book {i}',
+                author=Author.objects.get_or_create(
+                    first_name='Andrzej', last_name='Sapkowski'
+                )[0],
+                publishing_house=PublishingHouse.objects.get_or_create(
+                    name='SuperNowa'
+                )[0],
+                summary='',
+                number_of_pages=100,
+                isbn=['9788375780635', '9780000000019', '9780306406157'][i],
+                year_of_publish='2000-01-01',
+            )
+            book.genre.add(genre)
+
+    def test_staff_get_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(BOOK_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        metrics = server_timing(res)
+        self.assertEqual(
+            metrics['db']['desc'], f'"{len(queries)} queries"'
+        )
+        self.assertGreater(float(metrics['serialize']['dur']), 0)
+        self.assertGreaterEqual(
+            float(metrics['total']['dur']),
+            float(metrics['db']['dur']) + float(metrics['serialize']['dur'])
+        )
+        self.assertEqual(
+            metrics['size']['desc'], f'"{len(res.content)} bytes"'
+        )
+
+    def test_other_users_do_not_get_server_timing(self):
+        self.user.is_staff = False
+        self.user.save()
+
+        res = self.client.get(BOOK_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Server-Timing', res)
+
+    def test_requests_are_aggregated_by_route(self):
+        self.client.get(BOOK_URL)
+        self.client.get(BOOK_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        body = res.content.decode()
+        labels = 'route="book:book-list",method="GET"'
+        self.assertIn(
+            f'http_request_duration_seconds_count{{{labels}}} 2', body
+        )
+        self.assertIn(f'http_request_queries_bucket{{{labels},le=', body)
+        self.assertIn(f'http_response_size_bytes_sum{{{labels}}}', body)
+        # Buckets are cumulative, +Inf holds all requests
+        self.assertIn(
+            f'http_request_serialize_seconds_bucket{{{labels},le="+Inf"}} 2',
+            body
+        )
+
+    @override_settings(REQUEST_TIMING=False)
+    def test_timing_can_be_turned_off(self):
+        res = self.client.get(BOOK_URL)
+
+        self.assertNotIn('Server-Timing', res)
+        self.assertNotIn('book:book-list', timing.render())
+
+
+class HistogramTests(TestCase):
+
+    def test_buckets_are_cumulative(self):
+        histogram = timing.Histogram('latency', 'Latency.', (1, 5))
+        for value in (0.5, 1, 3, 7):
+            histogram.observe(('route',), value)
+
+        lines = histogram.render(('name',))
+
+        counts = [
+            int(line.rsplit(' ', 1)[1]) for line in lines
+            if line.startswith('latency_bucket')
+        ]
+        self.assertEqual(counts, [2, 3, 4])
+        self.assertIn('latency_sum{name="route"} 11.5', lines)
+        self.assertIn('latency_count{name="route"} 4', lines)
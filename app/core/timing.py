@@ -0,0 +1,210 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from rest_framework import serializers
+
+# Per request measurements: total time, time and number of database
+# queries, serialization time and size of the response. Staff get them
+# in the Server-Timing header (see core.middleware), all requests are
+# aggregated per route into histograms of this process, served in the
+# Prometheus text format by the /metrics endpoint (see core.views).
+
+_current = ContextVar('request_timing', default=None)
+
+_lock = threading.Lock()
+
+# Upper bounds of histogram buckets
+SECONDS_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class RequestTiming:
+    # Measurements of the current request, times in seconds
+    __slots__ = ('started', 'db', 'queries', 'serialize')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db = 0.0
+        self.queries = 0
+        self.serialize = 0.0
+
+    def execute(self, execute, sql, params, many, context):
+        # Execute wrapper of database connections
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+    def server_timing(self, total, size):
+        # Value of the Server-Timing header, durations in milliseconds
+        metrics = [
+            f'db;dur={self.db * 1000:.2f};desc="{self.queries} queries"',
+            f'serialize;dur={self.serialize * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ]
+        if size is not None:
+            metrics.append(f'size;desc="{size} bytes"')
+
+        return ', '.join(metrics)
+
+
+def start():
+    # Measure queries of all connections from now on
+    timing = RequestTiming()
+    _current.set(timing)
+    for connection in connections.all():
+        connection.execute_wrappers.append(timing.execute)
+
+    return timing
+
+
+def finish(timing):
+    # Stop measuring, return total seconds of the request
+    for connection in connections.all():
+        if timing.execute in connection.execute_wrappers:
+            connection.execute_wrappers.remove(timing.execute)
+    _current.set(None)
+
+    return time.perf_counter() - timing.started
+
+
+@contextmanager
+def serializing():
+    # Count the time as serialization, except for queries made meanwhile
+    # (e.g. lazily loaded relations), those are database time
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    db = timing.db
+    try:
+        yield
+    finally:
+        timing.serialize += time.perf_counter() - started - (timing.db - db)
+
+
+class TimedSerializerMixin:
+    # Time of producing .data is reported as serialization time, lists
+    # of the serializer need TimedListSerializer in Meta to be timed
+    # as a whole
+
+    @property
+    def data(self):
+        with serializing():
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class Histogram:
+    # Counts of observed values by labels, one counter per bucket
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            # Buckets, the +Inf bucket and the sum
+            series = self.series[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self, label_names):
+        lines = [
+            f'# HELP {self.name} {self.description}',
+            f'# TYPE {self.name} histogram',
+        ]
+        for labels, series in sorted(self.series.items()):
+            names = ','.join(
+                f'{name}="{_escape(value)}"'
+                for name, value in zip(label_names, labels)
+            )
+            cumulative = 0
+            bounds = [*(f'{bound:g}' for bound in self.buckets), '+Inf']
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{{names},le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'{self.name}_sum{{{names}}} {series[-1]}')
+            lines.append(f'{self.name}_count{{{names}}} {cumulative}')
+
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"') \
+        .replace('\n', '\\n')
+
+
+LABELS = ('route', 'method')
+
+HISTOGRAMS = {
+    'total': Histogram(
+        'http_request_duration_seconds',
+        'Time from the first to the last middleware.', SECONDS_BUCKETS
+    ),
+    'db': Histogram(
+        'http_request_db_seconds',
+        'Time spent in database queries.', SECONDS_BUCKETS
+    ),
+    'serialize': Histogram(
+        'http_request_serialize_seconds',
+        'Time spent in serializers, without their queries.', SECONDS_BUCKETS
+    ),
+    'queries': Histogram(
+        'http_request_queries',
+        'Number of database queries.', QUERIES_BUCKETS
+    ),
+    'size': Histogram(
+        'http_response_size_bytes',
+        'Size of response bodies, streamed ones are not measured.',
+        BYTES_BUCKETS
+    ),
+}
+
+
+def record(route, method, timing, total, size):
+    # Add measurements of a request to histograms of its route
+    labels = (route, method)
+    with _lock:
+        HISTOGRAMS['total'].observe(labels, total)
+        HISTOGRAMS['db'].observe(labels, timing.db)
+        HISTOGRAMS['serialize'].observe(labels, timing.serialize)
+        HISTOGRAMS['queries'].observe(labels, timing.queries)
+        if size is not None:
+            HISTOGRAMS['size'].observe(labels, size)
+
+
+def render():
+    # All histograms in the Prometheus text format
+    with _lock:
+        lines = [
+            line for histogram in HISTOGRAMS.values()
+            for line in histogram.render(LABELS)
+        ]
+
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    with _lock:
+        for histogram in HISTOGRAMS.values():
+            histogram.series.clear()
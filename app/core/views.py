@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.cache import never_cache
+from rest_framework import status
+
+from book import cache as catalogue_cache
+from core import routers, timing
+from core.health import get_stats, round_trip
+
+
+@never_cache
+def health(request):
+    # Liveness, the process answers without touching the database
+    return JsonResponse({'status': 'ok', 'connections': get_stats()})
+
+
+@never_cache
+def ready(request):
+    # Readiness, the primary has to answer within READY_MAX_LATENCY_MS.
+    # Replicas are reported but never fail readiness, reads of a replica
+    # which is down fall back to the primary.
+    databases = {}
+    is_ready = True
+    for alias in [DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS]:
+        reused = connections[alias].connection is not None
+        try:
+            latency = round_trip(alias)
+        except DatabaseError as exc:
+            databases[alias] = {'ok': False, 'error': type(exc).__name__}
+            is_ready = is_ready and alias != DEFAULT_DB_ALIAS
+            continue
+
+        databases[alias] = {
+            'ok': True,
+            'latency_ms': round(latency, 2),
+            'reused_connection': reused,
+        }
+        if alias == DEFAULT_DB_ALIAS:
+            is_ready = latency <= settings.READY_MAX_LATENCY_MS
+        else:
+            databases[alias]['lag_seconds'] = routers.replica_lag(alias)
+
+    return JsonResponse(
+        {
+            'status': 'ready' if is_ready else 'unavailable',
+            'databases': databases,
+            'connections': get_stats(),
+        },
+        status=status.HTTP_200_OK if is_ready
+        else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+
+@never_cache
+def metrics(request):
+    # Histograms of request timings of this process by route and
+    # counters of the catalogue cache
+    return HttpResponse(
+        timing.render() + catalogue_cache.render_stats(),
+        content_type='text/plain; version=0.0.4'
+    )
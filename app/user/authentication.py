@@ -0,0 +1,119 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+# Token -> user resolutions are kept in a bounded, per process LRU.
+# Every entry remembers the revocation generation of its token, stored in
+# a shared cache. Deleting the token or saving its user bumps the
+# generation (see user.signals). The process which revoked the token
+# drops the entry at once, others when they check the generation again,
+# at most TOKEN_REVOCATION_CHECK_INTERVAL seconds later. Hits between
+# checks do not touch the shared cache, which may be the database.
+
+
+def _generation_key(key):
+    return f'auth:token:{key}:generation'
+
+
+def _get_shared_cache():
+    return caches[settings.TOKEN_CACHE_ALIAS]
+
+
+def get_generation(key):
+    # Current revocation generation of the token, created when missing
+    cache = _get_shared_cache()
+    generation = cache.get(_generation_key(key))
+    if generation is None:
+        cache.add(_generation_key(key), time.time_ns(), timeout=None)
+        generation = cache.get(_generation_key(key))
+
+    return generation
+
+
+def revoke_token(key):
+    # Make every cached resolution of the token invalid
+    cache = _get_shared_cache()
+    try:
+        cache.incr(_generation_key(key))
+    except ValueError:
+        cache.set(_generation_key(key), time.time_ns(), timeout=None)
+    token_cache.discard(key)
+
+
+class TokenCache:
+    # Bounded LRU of (user, token) pairs with time to live
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[3] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+
+        user, token, generation, expires, checked = entry
+        if now - checked >= settings.TOKEN_REVOCATION_CHECK_INTERVAL:
+            if get_generation(key) != generation:
+                self.discard(key)
+                return None
+            with self._lock:
+                if key in self._entries:
+                    self._entries[key] = (
+                        user, token, generation, expires, now
+                    )
+
+        return user, token
+
+    def set(self, key, user, token, generation):
+        now = time.monotonic()
+        expires = now + settings.TOKEN_CACHE_TTL
+        with self._lock:
+            self._entries[key] = (user, token, generation, expires, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.TOKEN_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    # Drop-in replacement of TokenAuthentication,
+    # skips the token and user query for recently seen tokens
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            # Generation is read before the query, so a revocation
+            # happening meanwhile makes the new entry invalid
+            generation = get_generation(key)
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user, token, generation)
+        else:
+            user, token = cached
+
+        # Every request gets its own copy, views may change request.user
+        return copy.copy(user), token
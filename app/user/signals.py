@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import revoke_token
+
+
+def _revoke(key):
+    # Revoke right away and once more after commit, a request between
+    # both could cache the user as it was before the commit
+    revoke_token(key)
+    transaction.on_commit(lambda: revoke_token(key))
+
+
+@receiver(post_delete, sender=Token)
+def revoke_deleted_token(sender, instance, **kwargs):
+    _revoke(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def revoke_user_tokens(sender, instance, **kwargs):
+    # Deactivation or password change must apply to the next request
+    keys = Token.objects.filter(user=instance).values_list('key', flat=True)
+    for key in keys:
+        _revoke(key)
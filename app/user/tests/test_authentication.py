@@ -0,0 +1,143 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import token_cache
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    # Test caching of token -> user resolution
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='token@test.com',
+            password='test12345',
+            name='TestName'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_is_cached(self):
+        # Test second request makes no query at all, neither of
+        # token and user nor of the shared cache of generations
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_is_revoked(self):
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_revoked(self):
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_refreshes_user(self):
+        # Test next request sees the changed user
+        self.client.get(ME_URL)
+
+        self.client.patch(
+            ME_URL, {'name': 'NewName', 'password': 'newpass123'}
+        )
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'NewName')
+        user = res.wsgi_request.user
+        self.assertTrue(user.check_password('newpass123'))
+
+    def test_cached_user_is_not_shared(self):
+        # Test changes of request.user do not leak into the cache
+        res = self.client.get(ME_URL)
+        res.wsgi_request.user.name = 'Changed'
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'TestName')
+
+    @override_settings(TOKEN_CACHE_SIZE=1)
+    def test_cache_is_bounded(self):
+        other = get_user_model().objects.create_user(
+            email='other@test.com',
+            password='test12345',
+            name='Other'
+        )
+        other_token = Token.objects.create(user=other)
+        self.client.get(ME_URL)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {other_token.key}')
+        self.client.get(ME_URL)
+
+        self.assertEqual(len(token_cache), 1)
+
+    @override_settings(TOKEN_CACHE_TTL=0)
+    def test_expired_entry_is_reloaded(self):
+        # Generation and token are read again
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(2):
+            self.client.get(ME_URL)
+
+    @override_settings(TOKEN_REVOCATION_CHECK_INTERVAL=0)
+    def test_revocation_is_shared(self):
+        # Test revocations of other workers drop the cached entry,
+        # they bump generations in the same cache
+        cache = caches[settings.TOKEN_CACHE_ALIAS]
+        self.assertNotIsInstance(cache, LocMemCache)
+        self.client.get(ME_URL)
+
+        cache.incr(f'auth:token:{self.token.key}:generation')
+
+        # The checked generation, then generation and token of the reload
+        with self.assertNumQueries(3):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(TOKEN_REVOCATION_CHECK_INTERVAL=0)
+    def test_generation_is_checked_after_interval(self):
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+    def test_revocation_by_other_workers_waits_for_interval(self):
+        # Test generations are not read between checks
+        self.client.get(ME_URL)
+
+        caches[settings.TOKEN_CACHE_ALIAS].incr(
+            f'auth:token:{self.token.key}:generation'
+        )
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)